@@ -1,31 +1,74 @@
-import os
-import yaml
 import importlib
+import json
+import os
+
+from agent_system import tracing
 
 
 class AgentRegistry:
     """
     Loads agent class mappings from a YAML config and instantiates agents by name.
+    Nothing is read until the first lookup; the merged agents/plugins manifest
+    is then cached as JSON, keyed by the configs' paths, sizes and mtimes, so
+    YAML is only parsed again after a config file changes.
     """
-    def __init__(self, config_path: str = None, plugins_path: str = None):
-        # Load core agents
+    def __init__(self, config_path: str = None, plugins_path: str = None, cache_path: str = None):
         self.config_path = config_path or os.getenv(
             'AGENTS_CONFIG_PATH', 'config/agents.yaml'
         )
+        self.plugins_path = plugins_path or os.getenv(
+            'PLUGINS_CONFIG_PATH', 'config/plugins.yaml'
+        )
+        self.cache_path = cache_path or os.getenv(
+            'AGENTS_MANIFEST_CACHE', os.path.join('.obelisk', 'registry.json')
+        )
+        self._registry = None
+
+    @property
+    def registry(self) -> dict:
+        if self._registry is None:
+            self._registry = self._load()
+        return self._registry
+
+    def _stamp(self) -> list:
+        stamp = []
+        for path in (self.config_path, self.plugins_path):
+            st = os.stat(path)
+            stamp.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+        return stamp
+
+    def _load(self) -> dict:
+        stamp = self._stamp()
+        try:
+            with open(self.cache_path, 'r') as f:
+                cached = json.load(f)
+            if cached.get('stamp') == stamp:
+                return cached['registry']
+        except (OSError, ValueError):
+            pass
+        import yaml
+
+        # Load core agents
         with open(self.config_path, 'r') as f:
-            self.registry = yaml.safe_load(f) or {}
+            registry = yaml.safe_load(f) or {}
         # Load plugin agents
         from agent_system.plugin_manager import PluginManager
 
-        pm = PluginManager(config_path=plugins_path)
+        pm = PluginManager(config_path=self.plugins_path)
         for name in pm.list_plugins():
-            self.registry[name] = pm.plugins[name]
+            registry[name] = pm.plugins[name]
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            tmp = f'{self.cache_path}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'stamp': stamp, 'registry': registry}, f)
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+        return registry
 
-    def get_agent(self, name: str, **kwargs):
-        """
-        Instantiate and return the agent with the given name.
-        Additional kwargs are passed to the agent constructor.
-        """
+    def get_class(self, name: str):
+        """Import and return the class of the agent with the given name."""
         if name not in self.registry:
             raise KeyError(f"Agent '{name}' not found in registry")
         entry = self.registry[name]
@@ -33,4 +76,13 @@ class AgentRegistry:
         class_name = entry['class']
         module = importlib.import_module(module_name)
         cls = getattr(module, class_name)
-        return cls(**kwargs)
+        # Every public agent method is timed as an ``agent`` span
+        tracing.instrument(cls)
+        return cls
+
+    def get_agent(self, name: str, **kwargs):
+        """
+        Instantiate and return the agent with the given name.
+        Additional kwargs are passed to the agent constructor.
+        """
+        return self.get_class(name)(**kwargs)
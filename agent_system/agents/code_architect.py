@@ -1,5 +1,6 @@
 import os
 import anthropic
+from agent_system import rate_limit, tracing
 from agent_system.prompt_system import PromptSystem
 
 
@@ -19,22 +20,32 @@ class CodeArchitect:
         """
         Generates an architecture plan for the given project.
         """
-        tmpl = self.prompt_sys.get("Claude", "generate_architecture")
+        tmpl = self.prompt_sys.get(
+            "Claude", "generate_architecture", project=project_name, requirements=requirements
+        )
         if tmpl:
-            prompt = tmpl.format(project=project_name, requirements=requirements)
+            prompt = tmpl
         else:
             prompt = (
                 f"You are a software architect. Design a complete software stack for a project named '{project_name}' "
                 f"with the following requirements:\n{requirements}\n"
                 "Provide a structured plan including components, technologies, and high-level overview."
             )
+        context = self.prompt_sys.get(
+            "CodeArchitect", "context", project=project_name, requirements=requirements
+        ).strip()
+        if context:
+            prompt = f"{context}\n\n{prompt}"
         try:
-            response = self.client.completions.create(
-                model=self.model,
-                prompt=anthropic.HUMAN_PROMPT + prompt + anthropic.AI_PROMPT,
-                max_tokens=1000,
-                stop_sequences=[anthropic.HUMAN_PROMPT],
-            )
+            rate_limit.acquire("anthropic")
+            with tracing.llm_call("anthropic", self.model, prompt) as call:
+                response = self.client.completions.create(
+                    model=self.model,
+                    prompt=anthropic.HUMAN_PROMPT + prompt + anthropic.AI_PROMPT,
+                    max_tokens_to_sample=1000,
+                    stop_sequences=[anthropic.HUMAN_PROMPT],
+                )
+                call.record(response)
         except Exception as e:
             raise RuntimeError(f"Anthropic API error: {e}") from e
 
@@ -1,56 +1,181 @@
+import asyncio
+import json
 import os
-import subprocess
+import shutil
+import tempfile
+import time
+
+from agent_system.components import (MergeReport, component_spec,
+                                     merge_components, split_components)
+from agent_system.subprocess_runner import ProcessTimeout, run_process, run_sync
 
 
 class CodeGenerator:
     """
     Uses Codex CLI to generate code based on architecture plans.
+
+    The specification is handed over through a private temp file
+    (``--spec-file``) or stdin (``--spec -``) rather than argv, so large specs
+    neither hit ARG_MAX nor show up in ``ps``. Select with ``spec_transport``
+    or CODEX_SPEC_TRANSPORT ("file" or "stdin").
     """
-    def __init__(self, codex_cli_path: str = None):
+    def __init__(
+        self,
+        codex_cli_path: str = None,
+        timeout: float = None,
+        spec_transport: str = None,
+        memory=None,
+        on_progress=None,
+    ):
         self.codex_cli = codex_cli_path or os.getenv("CODEX_CLI_PATH")
         if not self.codex_cli:
             raise ValueError("CODEX_CLI_PATH not set")
+        self.timeout = timeout or float(os.getenv("CODEX_TIMEOUT", "1800"))
+        self.spec_transport = spec_transport or os.getenv("CODEX_SPEC_TRANSPORT", "file")
+        if self.spec_transport not in ("file", "stdin"):
+            raise ValueError(f"Unsupported spec transport: {self.spec_transport}")
+        self.memory = memory
+        self.on_progress = on_progress
 
-    def generate_code(self, architecture_spec: str, output_dir: str) -> None:
+    async def agenerate_code(
+        self, architecture_spec: str, output_dir: str, on_progress=None, timeout=None
+    ) -> float:
         """
         Generates code by invoking Codex CLI with the given specification.
+        Progress lines are passed to ``on_progress``; returns the duration in
+        seconds. Raises RuntimeError on failure or on exceeding ``timeout``
+        (default: the generator's timeout).
         """
+        spec_path = None
         try:
-            subprocess.run(
-                [
-                    self.codex_cli,
-                    "generate",
-                    "--spec",
-                    architecture_spec,
-                    "--out",
-                    output_dir,
-                ],
-                check=True,
-                text=True,
-            )
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(
-                f"Codex CLI failed (exit {e.returncode}): {e}"
-            ) from e
+            if self.spec_transport == "file":
+                fd, spec_path = tempfile.mkstemp(prefix="obelisk-spec-", suffix=".md")
+                with os.fdopen(fd, "w") as f:
+                    f.write(architecture_spec)
+                argv = [self.codex_cli, "generate", "--spec-file", spec_path,
+                        "--out", output_dir]
+                stdin = None
+            else:
+                argv = [self.codex_cli, "generate", "--spec", "-", "--out", output_dir]
+                stdin = architecture_spec
+            result = await self._run(argv, stdin, on_progress, "generate", timeout)
+        finally:
+            if spec_path:
+                os.remove(spec_path)
+        if self.memory:
+            self.memory.add("generator", "generate_duration", json.dumps({
+                "output_dir": output_dir,
+                "duration": result.duration,
+                "spec_bytes": len(architecture_spec.encode()),
+            }))
+        return result.duration
+
+    def generate_code(self, architecture_spec: str, output_dir: str) -> None:
+        """
+        Generates code by invoking Codex CLI with the given specification.
+        """
+        run_sync(self.agenerate_code(architecture_spec, output_dir))
+
+    async def agenerate_components(
+        self,
+        architecture_spec: str,
+        output_dir: str,
+        max_workers: int = 4,
+        component_timeout: float = None,
+    ) -> MergeReport:
+        """
+        Split the spec into components (see agent_system.components), generate
+        each into its own staging directory with at most ``max_workers`` Codex
+        processes at once and ``component_timeout`` seconds per component, then
+        merge them into ``output_dir/<component>``. Falls back to a single
+        generation when the spec does not split into two or more components.
+        Raises RuntimeError naming every component that failed.
+        """
+        shared, components = split_components(architecture_spec)
+        if len(components) < 2:
+            await self.agenerate_code(architecture_spec, output_dir)
+            return MergeReport()
+        staging = os.path.join(output_dir, ".obelisk", "staging")
+        if os.path.isdir(staging):
+            shutil.rmtree(staging)
+        os.makedirs(staging)
+        limit = asyncio.Semaphore(max(1, max_workers))
+
+        async def build(component):
+            async with limit:
+                target = os.path.join(staging, component.slug)
+                os.makedirs(target, exist_ok=True)
+                spec = component_spec(shared, component, components)
+                await self.agenerate_code(
+                    spec,
+                    target,
+                    on_progress=self._component_progress(component.slug),
+                    timeout=component_timeout,
+                )
+
+        results = await asyncio.gather(
+            *(build(c) for c in components), return_exceptions=True
+        )
+        failures = [
+            f"{c.slug}: {r}" for c, r in zip(components, results)
+            if isinstance(r, BaseException)
+        ]
+        if failures:
+            raise RuntimeError("Component generation failed:\n" + "\n".join(failures))
+        report = merge_components(staging, output_dir, components)
+        shutil.rmtree(staging, ignore_errors=True)
+        return report
+
+    def generate_components(
+        self,
+        architecture_spec: str,
+        output_dir: str,
+        max_workers: int = 4,
+        component_timeout: float = None,
+    ) -> MergeReport:
+        """Blocking wrapper around agenerate_components."""
+        return run_sync(self.agenerate_components(
+            architecture_spec, output_dir, max_workers, component_timeout
+        ))
+
+    def _component_progress(self, slug: str):
+        if not self.on_progress:
+            return None
+        return lambda line: self.on_progress(f"[{slug}] {line}")
 
     def apply_analysis(self, report_path: str, output_dir: str) -> None:
         """
         Applies analysis suggestions via Codex CLI based on a JSON report.
         """
+        argv = [self.codex_cli, "improve", "--report", report_path, "--out", output_dir]
+        run_sync(self._run(argv, None, None, "improve"))
+
+    async def _run(self, argv, stdin, on_progress, command, timeout=None):
+        start = time.monotonic()
+        timeout = timeout or self.timeout
         try:
-            subprocess.run(
-                [
-                    self.codex_cli,
-                    "improve",
-                    "--report",
-                    report_path,
-                    "--out",
-                    output_dir,
-                ],
-                check=True,
-                text=True,
+            result = await run_process(
+                argv,
+                input_text=stdin,
+                timeout=timeout,
+                on_line=on_progress or self.on_progress,
+                log_prefix=f"codex {command}",
             )
-        except subprocess.CalledProcessError as e:
+        except ProcessTimeout as e:
+            self._record_failure(command, time.monotonic() - start, "timeout")
             raise RuntimeError(
-                f"Codex CLI improve failed (exit {e.returncode}): {e}"
+                f"Codex CLI {command} timed out after {timeout}s"
             ) from e
+        if result.returncode != 0:
+            self._record_failure(command, result.duration, result.returncode)
+            raise RuntimeError(
+                f"Codex CLI {command} failed (exit {result.returncode}):\n"
+                + "\n".join(result.tail)
+            )
+        return result
+
+    def _record_failure(self, command, duration, reason) -> None:
+        if self.memory:
+            self.memory.add("generator", f"{command}_failure", json.dumps({
+                "duration": duration, "reason": reason,
+            }))
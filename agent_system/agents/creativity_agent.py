@@ -1,6 +1,8 @@
 import os
 import anthropic
 
+from agent_system import rate_limit, tracing
+
 
 class CreativityAgent:
     """
@@ -24,12 +26,15 @@ class CreativityAgent:
             "Return a refined list with annotations."
         )
         try:
-            response = self.client.completions.create(
-                model=self.model,
-                prompt=anthropic.HUMAN_PROMPT + prompt + anthropic.AI_PROMPT,
-                max_tokens=500,
-                stop_sequences=[anthropic.HUMAN_PROMPT],
-            )
+            rate_limit.acquire("anthropic")
+            with tracing.llm_call("anthropic", self.model, prompt) as call:
+                response = self.client.completions.create(
+                    model=self.model,
+                    prompt=anthropic.HUMAN_PROMPT + prompt + anthropic.AI_PROMPT,
+                    max_tokens_to_sample=500,
+                    stop_sequences=[anthropic.HUMAN_PROMPT],
+                )
+                call.record(response)
         except Exception as e:
             raise RuntimeError(f"Anthropic Creativity API error: {e}") from e
 
@@ -1,5 +1,7 @@
 import os
 import openai
+from agent_system import rate_limit, tracing
+from agent_system.prompt_system import PromptSystem
 
 
 class IdeasAgent:
@@ -12,6 +14,7 @@ class IdeasAgent:
             raise ValueError("OPENAI_API_KEY not set")
         openai.api_key = self.api_key
         self.model = model
+        self.prompt_sys = PromptSystem()
 
     def generate_ideas(self, project_name: str, architecture_spec: str) -> str:
         """
@@ -23,12 +26,20 @@ class IdeasAgent:
             f"{architecture_spec}\n\n"
             "Provide your ideas as a numbered or bulleted list."
         )
+        context = self.prompt_sys.get(
+            "IdeasAgent", "context", project=project_name, spec=architecture_spec
+        ).strip()
+        if context:
+            prompt = f"{context}\n\n{prompt}"
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.9,
-            )
+            rate_limit.acquire("openai")
+            with tracing.llm_call("openai", self.model, prompt) as call:
+                response = openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.9,
+                )
+                call.record(response)
         except Exception as e:
             raise RuntimeError(f"OpenAI Ideas API error: {e}") from e
 
@@ -29,11 +29,13 @@ class MetaAgent:
                 score = float(score_data.get('score', 0))
                 if score < self.threshold:
                     # Resubmit via Celery for the same agent; params not preserved currently
-                    from service.celery_app import celery_app
+                    # Coalesced with any identical task still in flight
+                    from service.idempotency import submit_task
 
-                    new_id = celery_app.send_task(
-                        'service.api.process_task', args=[entry.agent, {}]
-                    ).id
-                    self.rl.log('MetaAgent', 'resubmit', f'{entry.id}->{new_id}')
+                    new_id = submit_task(entry.agent, {})[0].id
+                    self.rl.log(
+                        'MetaAgent', 'resubmit', f'{entry.id}->{new_id}',
+                        metadata={'memory_id': entry.id, 'task_id': new_id, 'score': score},
+                    )
             except Exception:
                 continue
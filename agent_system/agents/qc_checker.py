@@ -1,5 +1,7 @@
 import os
 import openai
+from agent_system import rate_limit, tracing
+from agent_system.prompt_system import PromptSystem
 
 
 class QCChecker:
@@ -12,10 +14,13 @@ class QCChecker:
             raise ValueError("OPENAI_API_KEY not set")
         openai.api_key = self.api_key
         self.model = model
+        self.prompt_sys = PromptSystem()
 
-    def check_directory(self, code_dir: str) -> str:
+    def check_directory(self, code_dir: str, lint_report: dict = None) -> str:
         """
         Checks code quality for all code under code_dir and returns a report.
+        If a ValidationEngine report is given, its findings are passed along so
+        the model can skip style issues the linters already caught.
         """
         report_parts = []
         for root, dirs, files in os.walk(code_dir):
@@ -30,12 +35,28 @@ class QCChecker:
             "best practices, and potential improvements, and provide a concise report:\n\n"
             + "\n".join(report_parts)
         )
-        try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0,
+        if lint_report:
+            from agent_system.validation import format_issues
+
+            prompt += (
+                "\n\nStatic analysis (pylint, black) already reported the findings below. "
+                "Do not repeat style or formatting issues; focus on bugs, design and "
+                "security:\n" + (format_issues(lint_report) or "No findings.")
             )
+        context = self.prompt_sys.get(
+            "QCChecker", "context", code_dir=code_dir, code="\n".join(report_parts)
+        ).strip()
+        if context:
+            prompt = f"{context}\n\n{prompt}"
+        try:
+            rate_limit.acquire("openai")
+            with tracing.llm_call("openai", self.model, prompt) as call:
+                response = openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0,
+                )
+                call.record(response)
         except Exception as e:
             raise RuntimeError(f"OpenAI QC API error: {e}") from e
 
@@ -2,6 +2,8 @@ import os
 import json
 import openai
 
+from agent_system import rate_limit, tracing
+
 
 class SelfScoringAgent:
     """
@@ -32,11 +34,14 @@ class SelfScoringAgent:
             f"{content}\n```\n\n"
             "Respond in JSON format with keys: score, confidence, suggestions."
         )
-        response = openai.ChatCompletion.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-        )
+        rate_limit.acquire("openai")
+        with tracing.llm_call("openai", self.model, prompt) as call:
+            response = openai.ChatCompletion.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+            )
+            call.record(response)
         msg = response.choices[0].message.get("content", "").strip()
         try:
             result = json.loads(msg)
@@ -2,6 +2,8 @@ import os
 import glob
 import openai
 
+from agent_system import rate_limit, tracing
+
 
 class TestHarnessAgent:
     """
@@ -36,11 +38,14 @@ class TestHarnessAgent:
                 "Module content below:\n```python\n"
                 f"{source}\n```"
             )
-            resp = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0,
-            )
+            rate_limit.acquire("openai")
+            with tracing.llm_call("openai", self.model, prompt) as call:
+                resp = openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0,
+                )
+                call.record(resp)
             code = resp.choices[0].message.get("content", "").strip()
             if code:
                 test_fname = os.path.splitext(os.path.basename(path))[0]
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from typing import Any, Dict, Iterator, Optional, Union
+
+CHUNK_SIZE = 64 * 1024
+REF_KEY = "artifact"
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for large task outputs on the local filesystem.
+    Blobs are zlib-compressed and stored once per SHA-256 digest under
+    ``root/ab/cd/<digest>.z`` with a small JSON sidecar holding the original
+    size. Callers keep a reference dict (see ``ref``) instead of the content.
+    """
+    def __init__(self, root: str = None, threshold: int = None, summary_chars: int = 200):
+        self.root = root or os.getenv("ARTIFACT_STORE_PATH", "./artifacts")
+        self.threshold = threshold if threshold is not None else int(
+            os.getenv("ARTIFACT_THRESHOLD", "16384")
+        )
+        self.summary_chars = summary_chars
+
+    def _path(self, digest: str) -> str:
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise KeyError(f"Invalid artifact id: {digest}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, data: Union[str, bytes]) -> str:
+        """Store data (deduplicated by hash) and return its digest."""
+        raw = data.encode() if isinstance(data, str) else data
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path + ".z"):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            compressor = zlib.compressobj(6)
+            for i in range(0, len(raw), CHUNK_SIZE):
+                f.write(compressor.compress(raw[i:i + CHUNK_SIZE]))
+            f.write(compressor.flush())
+        with open(path + ".json", "w") as f:
+            json.dump({"size": len(raw), "encoding": "zlib"}, f)
+        os.replace(tmp, path + ".z")
+        return digest
+
+    def exists(self, digest: str) -> bool:
+        try:
+            return os.path.exists(self._path(digest) + ".z")
+        except KeyError:
+            return False
+
+    def size(self, digest: str) -> int:
+        """Uncompressed size in bytes."""
+        try:
+            with open(self._path(digest) + ".json", "r") as f:
+                return json.load(f)["size"]
+        except FileNotFoundError:
+            raise KeyError(digest) from None
+
+    def iter_bytes(
+        self, digest: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        Stream the uncompressed bytes ``[start, end)`` without materialising
+        the whole artifact.
+        """
+        try:
+            f = open(self._path(digest) + ".z", "rb")
+        except FileNotFoundError:
+            raise KeyError(digest) from None
+        with f:
+            decompressor = zlib.decompressobj()
+            offset = 0
+            while True:
+                compressed = f.read(CHUNK_SIZE)
+                chunk = (
+                    decompressor.decompress(compressed)
+                    if compressed else decompressor.flush()
+                )
+                lo = max(start - offset, 0)
+                hi = len(chunk) if end is None else min(end - offset, len(chunk))
+                if lo < hi:
+                    yield chunk[lo:hi]
+                offset += len(chunk)
+                if not compressed or (end is not None and offset >= end):
+                    return
+
+    def get(self, digest: str) -> bytes:
+        return b"".join(self.iter_bytes(digest))
+
+    def ref(self, data: Union[str, bytes]) -> Dict[str, Any]:
+        """Store data and return a small reference dict with a text summary."""
+        text = data if isinstance(data, str) else data.decode(errors="replace")
+        digest = self.put(data)
+        return {
+            REF_KEY: digest,
+            "size": self.size(digest),
+            "summary": text[: self.summary_chars],
+        }
+
+    def offload(self, value: Any) -> Any:
+        """Replace a string above the size threshold with a reference."""
+        if isinstance(value, str) and len(value) > self.threshold:
+            return self.ref(value)
+        return value
+
+    def resolve(self, value: Any) -> Any:
+        """Inverse of offload: load referenced text, pass anything else through."""
+        if is_ref(value):
+            return self.get(value[REF_KEY]).decode()
+        return value
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and isinstance(value.get(REF_KEY), str) and "size" in value
@@ -0,0 +1,210 @@
+"""
+Batch mode for the CLI pipeline (``main.py --batch manifest.yaml``).
+
+A manifest lists projects and the main.py options for each; every project
+runs in a process-pool worker with its own output directory, run id and log
+file. Provider rate limits (see agent_system.rate_limit) are shared by all
+workers and, unless disabled, stages with identical inputs are computed once
+for the whole batch through a shared checkpoint cache.
+
+Example manifest:
+
+    workers: 4
+    output_root: ./batch_output
+    rate_limits: {anthropic: 50, openai: 500}
+    shared_cache: true
+    defaults:
+      validate: true
+    projects:
+      - project: shop
+        requirements: "Online shop with a REST API"
+      - project: shop-llama
+        requirements: "Online shop with a REST API"
+        architect_model: llama
+"""
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Any, Callable, Dict, List
+
+import yaml
+
+from agent_system import rate_limit
+from agent_system.checkpoint import new_run_id, runs_root
+
+logger = logging.getLogger(__name__)
+
+
+class BatchError(ValueError):
+    """Raised for an invalid batch manifest."""
+
+
+def slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", name).strip("-") or "project"
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        manifest = yaml.safe_load(f) or {}
+    projects = manifest.get("projects")
+    if not isinstance(projects, list) or not projects:
+        raise BatchError(f"{path}: 'projects' must be a non-empty list")
+    seen = set()
+    for entry in projects:
+        if not isinstance(entry, dict) or not entry.get("project"):
+            raise BatchError(f"{path}: every project needs a 'project' name")
+        name = slug(entry["project"])
+        if name in seen:
+            raise BatchError(f"{path}: duplicate project {entry['project']!r}")
+        seen.add(name)
+    return manifest
+
+
+def to_argv(options: Dict[str, Any]) -> List[str]:
+    """Turn ``{"output_dir": "x", "validate": True}`` into main.py arguments."""
+    argv = []
+    for name, value in options.items():
+        flag = "--" + name.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        elif value is not False and value is not None:
+            argv += [flag, str(value)]
+    return argv
+
+
+def _init_worker(limits, lock, state):
+    rate_limit.configure(limits, lock=lock, state=state)
+
+
+def _last_error(log_path: str) -> str:
+    try:
+        with open(log_path, "r", errors="replace") as f:
+            errors = [line.strip() for line in f if line.startswith("[ERROR]")]
+    except FileNotFoundError:
+        return ""
+    return errors[-1] if errors else ""
+
+
+def _run_project(
+    entry_point: Callable, name: str, argv: List[str], log_path: str
+) -> Dict[str, Any]:
+    """Run one project in a pool worker, capturing its output in log_path."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    start = time.time()
+    result = {"project": name, "log": log_path}
+    with open(log_path, "a") as log:
+        handler = logging.StreamHandler(log)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        with redirect_stdout(log), redirect_stderr(log):
+            try:
+                result.update(entry_point(argv) or {})
+                result["status"] = "ok"
+            except SystemExit as e:
+                result["status"] = "failed" if e.code else "ok"
+            except Exception as e:
+                traceback.print_exc()
+                result.update(status="failed", error=str(e))
+        root.removeHandler(handler)
+    if result["status"] != "ok" and "error" not in result:
+        result["error"] = _last_error(log_path)
+    result["duration"] = round(time.time() - start, 2)
+    return result
+
+
+def run_batch(
+    manifest_path: str,
+    entry_point: Callable[[List[str]], Any],
+    workers: int = None,
+    batch_id: str = None,
+    extra_argv: List[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run every project of the manifest through ``entry_point`` (main.main) in
+    a process pool and return the combined summary, which is also written to
+    ``<runs root>/<batch_id>/summary.json``. Rerunning with the same batch id
+    reuses each project's checkpoints.
+    """
+    manifest = load_manifest(manifest_path)
+    batch_id = batch_id or new_run_id()
+    batch_dir = os.path.join(runs_root(), batch_id)
+    os.makedirs(batch_dir, exist_ok=True)
+    output_root = manifest.get("output_root", "./batch_output")
+    defaults = manifest.get("defaults") or {}
+    workers = workers or manifest.get("workers") or os.cpu_count() or 1
+    limits = manifest.get("rate_limits")
+    if limits is None:
+        limits = rate_limit.limits()
+
+    jobs = []
+    for entry in manifest["projects"]:
+        name = slug(entry["project"])
+        options = {**defaults, **entry}
+        options.setdefault("output_dir", os.path.join(output_root, name))
+        options["run_id"] = f"{batch_id}-{name}"
+        if manifest.get("shared_cache", True):
+            options["shared_cache"] = os.path.join(batch_dir, "cache")
+        argv = to_argv(options) + list(extra_argv or [])
+        jobs.append((name, argv, os.path.join(batch_dir, f"{name}.log")))
+
+    start = time.time()
+    results = []
+    with multiprocessing.Manager() as manager:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(jobs)),
+            initializer=_init_worker,
+            initargs=(limits, manager.Lock(), manager.dict()),
+        ) as pool:
+            futures = {
+                pool.submit(_run_project, entry_point, name, argv, log): name
+                for name, argv, log in jobs
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:  # worker process died
+                    result = {"project": futures[future], "status": "failed", "error": str(e)}
+                logger.info("[Batch] %s: %s", result["project"], result["status"])
+                results.append(result)
+
+    order = [name for name, _, _ in jobs]
+    results.sort(key=lambda r: order.index(r["project"]))
+    summary = {
+        "batch_id": batch_id,
+        "manifest": os.path.abspath(manifest_path),
+        "workers": min(workers, len(jobs)),
+        "duration": round(time.time() - start, 2),
+        "ok": sum(r["status"] == "ok" for r in results),
+        "failed": sum(r["status"] != "ok" for r in results),
+        "projects": results,
+    }
+    with open(os.path.join(batch_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2, default=str)
+    return summary
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [
+        f"Batch {summary['batch_id']}: {summary['ok']} ok, {summary['failed']} failed "
+        f"in {summary['duration']:.1f}s with {summary['workers']} workers"
+    ]
+    for r in summary["projects"]:
+        score = r.get("score")
+        if isinstance(score, dict):
+            score = score.get("score", score)
+        detail = f"score {score}" if r["status"] == "ok" else r.get("error") or "see log"
+        reused = f", reused {len(r['reused'])} stages" if r.get("reused") else ""
+        lines.append(
+            f"  {r['project']:<24} {r['status']:<7} {r.get('duration', 0):>7.1f}s  "
+            f"{detail}{reused}"
+        )
+    return "\n".join(lines)
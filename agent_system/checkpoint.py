@@ -0,0 +1,232 @@
+"""
+Per-run checkpoints for the CLI pipeline.
+
+Each stage's output is stored under ``<root>/<run_id>/<stage>.json`` together
+with a hash of everything the stage consumed (project, requirements, model,
+upstream outputs and, for stages reading generated code, a digest of the
+output tree). Resuming a run reuses a stage's output when that hash still
+matches, so only stages whose inputs changed are recomputed. Stages that
+write into the output directory also keep a snapshot of the tree so it can be
+restored if the directory was emptied or removed since. Stages that both
+read and write the tree (tests, analysis) are keyed on ``CheckpointStore.tree``,
+the digest left by the previous writing stage, rather than on the current
+tree, which already contains their own output.
+
+Outputs of stages that depend only on their hashed inputs (SHARED_STAGES) can
+additionally be published to a ``shared_dir`` used by several runs, such as
+the projects of one batch, so identical work is done once.
+"""
+import hashlib
+import json
+import logging
+import os
+import tarfile
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from agent_system import profiling, tracing
+
+logger = logging.getLogger(__name__)
+
+STAGES = (
+    "architect", "ideas", "creativity", "generate", "tests",
+    "validate", "analysis", "qc", "score",
+)
+# Stages whose output is fully determined by their inputs and has no side
+# effects on the output directory.
+SHARED_STAGES = ("architect", "ideas", "creativity", "qc", "score")
+# Directories written by the pipeline's own tooling rather than by a stage.
+IGNORED_DIRS = {"__pycache__", ".git", ".obelisk", ".obelisk_shards", ".pytest_cache"}
+
+
+def runs_root() -> str:
+    return os.getenv("OBELISK_RUNS_PATH", os.path.join(".obelisk", "runs"))
+
+
+def new_run_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def _tree_files(root: str):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in IGNORED_DIRS)
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            yield os.path.relpath(path, root), path
+
+
+def tree_digest(root: str) -> Optional[str]:
+    """SHA-256 over the relative paths and contents of files under root."""
+    if not os.path.isdir(root):
+        return None
+    h = hashlib.sha256()
+    for rel, path in _tree_files(root):
+        h.update(rel.encode() + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class CheckpointStore:
+    """
+    Stage output cache for one pipeline run. ``from_stage`` forces that stage
+    and every later one (in STAGES order) to be recomputed; ``shared_dir``
+    is consulted for SHARED_STAGES before computing them. ``tree`` is the
+    digest of the output directory after the latest stage that wrote it, as
+    recorded by that stage, or the current digest if the directory has been
+    edited since.
+    """
+    def __init__(
+        self,
+        run_id: str = None,
+        root: str = None,
+        from_stage: str = None,
+        shared_dir: str = None,
+    ):
+        if from_stage is not None and from_stage not in STAGES:
+            raise ValueError(f"Unknown stage: {from_stage}")
+        self.root = root or runs_root()
+        self.run_id = run_id or new_run_id()
+        self.path = os.path.join(self.root, self.run_id)
+        self.from_stage = from_stage
+        self.shared_dir = shared_dir
+        self.reused = []
+        self.tree: Optional[str] = None
+        os.makedirs(self.path, exist_ok=True)
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+
+    @classmethod
+    def exists(cls, run_id: str, root: str = None) -> bool:
+        root = root or runs_root()
+        return os.path.isfile(os.path.join(root, run_id, "run.json"))
+
+    def save_args(self, args: Dict[str, Any]):
+        with open(os.path.join(self.path, "run.json"), "w") as f:
+            json.dump({"run_id": self.run_id, "args": args}, f, indent=2)
+
+    def load_args(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.path, "run.json"), "r") as f:
+                return json.load(f)["args"]
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def key(inputs: Dict[str, Any]) -> str:
+        payload = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def forced(self, stage: str) -> bool:
+        return (
+            self.from_stage is not None
+            and STAGES.index(stage) >= STAGES.index(self.from_stage)
+        )
+
+    def _record_path(self, stage: str) -> str:
+        return os.path.join(self.path, f"{stage}.json")
+
+    def _snapshot_path(self, stage: str) -> str:
+        return os.path.join(self.path, f"{stage}.tar.gz")
+
+    def _shared_path(self, stage: str, key: str) -> str:
+        return os.path.join(self.shared_dir, f"{stage}-{key}.json")
+
+    @staticmethod
+    def _load(path: str) -> Optional[dict]:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path: str, record: dict):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(record, f, default=str)
+        os.replace(tmp, path)
+
+    def _read(self, stage: str) -> Optional[dict]:
+        return self._load(self._record_path(stage))
+
+    def _snapshot(self, stage: str, output_dir: str):
+        tmp = self._snapshot_path(stage) + ".tmp"
+        with tarfile.open(tmp, "w:gz") as tar:
+            for rel, path in _tree_files(output_dir):
+                tar.add(path, arcname=rel)
+        os.replace(tmp, self._snapshot_path(stage))
+
+    def _known_trees(self) -> set:
+        """Digests recorded by this run's stages that wrote the output tree."""
+        records = (self._read(stage) for stage in STAGES)
+        return {r["tree"] for r in records if r and r.get("tree")}
+
+    def _restore(self, stage: str, record: dict, output_dir: str) -> bool:
+        """
+        Ensure output_dir holds generated code for stage. An empty or missing
+        directory, or one left as the stage found it (e.g. just restored by
+        an upstream stage), is refilled from the snapshot; other existing
+        files are kept, so edits are picked up by the stages that read them.
+        """
+        current = tree_digest(output_dir)
+        populated = current is not None and next(_tree_files(output_dir), None) is not None
+        if populated and current != record.get("input_tree"):
+            self.tree = record["tree"] if current in self._known_trees() else current
+            return True
+        snapshot = self._snapshot_path(stage)
+        if not os.path.exists(snapshot):
+            return False
+        os.makedirs(output_dir, exist_ok=True)
+        with tarfile.open(snapshot, "r:gz") as tar:
+            tar.extractall(output_dir, filter="data")
+        logger.info("Restored %s from the %s checkpoint", output_dir, stage)
+        self.tree = tree_digest(output_dir)
+        return self.tree == record["tree"]
+
+    def run(
+        self,
+        stage: str,
+        inputs: Dict[str, Any],
+        compute: Callable[[], Any],
+        output_dir: str = None,
+    ) -> Any:
+        """
+        Return the checkpointed output of ``stage`` for ``inputs`` or compute
+        and store it. Pass ``output_dir`` for stages that write generated code.
+        """
+        with tracing.span(f"checkpoint.{stage}", run_id=self.run_id) as span:
+            output = self._run(stage, inputs, compute, output_dir)
+            span.set(reused=stage in self.reused)
+            return output
+
+    def _run(self, stage, inputs, compute, output_dir):
+        key = self.key(inputs)
+        if not self.forced(stage):
+            record = self._read(stage)
+            if record and record["key"] == key and (
+                output_dir is None or self._restore(stage, record, output_dir)
+            ):
+                self.reused.append(stage)
+                logger.info("Reusing %s output from run %s", stage, self.run_id)
+                return record["output"]
+        shared = self.shared_dir and stage in SHARED_STAGES
+        record = self._load(self._shared_path(stage, key)) if shared else None
+        if record and not self.forced(stage):
+            self.reused.append(stage)
+            logger.info("Reusing shared %s output", stage)
+        else:
+            with profiling.stage(stage):
+                output = compute()
+            record = {"stage": stage, "key": key, "output": output, "finished": time.time()}
+            if output_dir is not None:
+                record["input_tree"] = self.tree
+                record["tree"] = self.tree = tree_digest(output_dir)
+                self._snapshot(stage, output_dir)
+            if shared:
+                self._write(self._shared_path(stage, key), record)
+        self._write(self._record_path(stage), record)
+        return record["output"]
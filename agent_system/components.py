@@ -0,0 +1,223 @@
+import json
+import os
+import re
+import shutil
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+COMPONENTS_SECTION = re.compile(r"\b(components?|services|modules|packages)\b", re.I)
+KIND_KEYWORDS = (
+    ("frontend", ("frontend", "front-end", "ui", "web app", "client", "dashboard")),
+    ("service", ("service", "api", "backend", "back-end", "server", "worker")),
+)
+# name, optional [extras], then a version specifier, environment marker or
+# direct reference (or nothing)
+REQUIREMENT = re.compile(
+    r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)(?:\[([^\]]*)\])?\s*((?:[<>=!~;@,].*)?)\s*$"
+)
+
+
+@dataclass
+class Component:
+    """One independently generated part of an architecture plan."""
+    name: str
+    spec: str
+    kind: str = "package"
+
+    @property
+    def slug(self) -> str:
+        slug = re.sub(r"[^a-z0-9]+", "_", self.name.lower()).strip("_")
+        return slug or "component"
+
+
+@dataclass
+class MergeReport:
+    """Outcome of merging component outputs into one tree."""
+    components: List[str] = field(default_factory=list)
+    conflicts: List[str] = field(default_factory=list)
+    requirements: List[str] = field(default_factory=list)
+
+
+def classify(name: str, body: str = "") -> str:
+    """Guess a component kind ("frontend", "service" or "package") from its text."""
+    text = name.lower()
+    for kind, words in KIND_KEYWORDS:
+        # whole words only (plurals allowed), so "Build" is not a UI nor "Rapid" an API
+        if any(re.search(rf"\b{re.escape(w)}s?\b", text) for w in words):
+            return kind
+    return "package"
+
+
+def _unique_slugs(components: List[Component]) -> None:
+    """Rename components in place so their output directories are distinct."""
+    taken = set()
+    for comp in components:
+        base, count = comp.name, 1
+        while comp.slug in taken:
+            count += 1
+            comp.name = f"{base} {count}"
+        taken.add(comp.slug)
+
+
+def _sections(spec: str) -> List[Tuple[int, str, str]]:
+    """Split markdown into (level, title, body) sections; level 0 is the preamble."""
+    sections = [(0, "", [])]
+    for line in spec.splitlines():
+        m = HEADING.match(line)
+        if m:
+            sections.append((len(m.group(1)), m.group(2).strip("*_ "), []))
+        else:
+            sections[-1][2].append(line)
+    return [(lvl, title, "\n".join(body).strip()) for lvl, title, body in sections]
+
+
+def split_components(spec: str) -> Tuple[str, List[Component]]:
+    """
+    Split an architecture spec into (shared context, components).
+
+    A JSON plan of the form ``{"overview": ..., "components": [{"name",
+    "kind", "spec"}]}`` is used as-is. For markdown plans, the sub-sections of
+    a "Components"/"Services"/"Modules" heading become components; failing
+    that, top-level sections whose titles name a frontend or service. All
+    other sections form the shared context. Fewer than two components means
+    the spec should be generated as a whole.
+    """
+    stripped = spec.strip()
+    if stripped.startswith("{"):
+        try:
+            plan = json.loads(stripped)
+        except ValueError:
+            plan = None
+        if isinstance(plan, dict) and isinstance(plan.get("components"), list):
+            comps = [
+                Component(
+                    name=str(c.get("name", f"component{i}")),
+                    spec=c.get("spec") or c.get("description") or json.dumps(c),
+                    kind=c.get("kind") or classify(str(c.get("name", ""))),
+                )
+                for i, c in enumerate(plan["components"])
+                if isinstance(c, dict)
+            ]
+            _unique_slugs(comps)
+            shared = {k: v for k, v in plan.items() if k != "components"}
+            return json.dumps(shared, indent=2) if shared else "", comps
+
+    sections = _sections(spec)
+    chosen: Dict[int, Component] = {}
+    for i, (level, title, _) in enumerate(sections):
+        if level and COMPONENTS_SECTION.search(title):
+            for j in range(i + 1, len(sections)):
+                sub_level, sub_title, _ = sections[j]
+                if sub_level <= level:
+                    break
+                if sub_level == level + 1:
+                    chosen[j] = Component(sub_title, "", classify(sub_title))
+            if chosen:
+                break
+    if not chosen:
+        top = min((lvl for lvl, _, _ in sections if lvl), default=0)
+        for i, (level, title, _) in enumerate(sections):
+            if level == top and classify(title) != "package":
+                chosen[i] = Component(title, "", classify(title))
+
+    _unique_slugs(list(chosen.values()))
+
+    shared: List[str] = []
+    current = None
+    for i, (level, title, body) in enumerate(sections):
+        if i in chosen:
+            current = (chosen[i], level)
+            chosen[i].spec = body
+            continue
+        if current and level > current[1]:
+            current[0].spec += f"\n\n{'#' * level} {title}\n{body}"
+            continue
+        current = None
+        shared.append(f"{'#' * level} {title}\n{body}" if level else body)
+    return "\n\n".join(p for p in shared if p.strip()), list(chosen.values())
+
+
+def component_spec(shared: str, component: Component, others: List[Component]) -> str:
+    """Build the generation spec for one component."""
+    siblings = ", ".join(f"{c.name} (./{c.slug})" for c in others if c is not component)
+    return (
+        f"{shared}\n\n"
+        f"Generate ONLY the '{component.name}' component ({component.kind}). "
+        f"It lives in its own directory; sibling components generated separately: "
+        f"{siblings or 'none'}. Put its Python dependencies in requirements.txt.\n\n"
+        f"{component.spec}"
+    ).strip()
+
+
+def merge_components(
+    staging_dir: str, output_dir: str, components: List[Component]
+) -> MergeReport:
+    """
+    Move each component from ``staging_dir/<slug>`` to ``output_dir/<slug>``,
+    combine their requirements.txt files into ``output_dir/requirements.txt``
+    and report conflicts: packages pinned differently by two components,
+    requirement lines that cannot be merged (options such as ``-r``/``-e``,
+    URLs) and top-level Python packages defined by more than one component.
+    A package's extras are the union of those every component asks for.
+    """
+    report = MergeReport()
+    pins: Dict[str, Tuple[str, str]] = {}
+    extras: Dict[str, Set[str]] = {}
+    packages: Dict[str, str] = {}
+    for comp in components:
+        src = os.path.join(staging_dir, comp.slug)
+        if not os.path.isdir(src):
+            continue
+        dest = os.path.join(output_dir, comp.slug)
+        if os.path.exists(dest):
+            shutil.rmtree(dest)
+        shutil.move(src, dest)
+        report.components.append(comp.slug)
+
+        for entry in sorted(os.listdir(dest)):
+            if os.path.isfile(os.path.join(dest, entry, "__init__.py")):
+                if entry in packages:
+                    report.conflicts.append(
+                        f"Python package '{entry}' defined by both "
+                        f"{packages[entry]} and {comp.slug}"
+                    )
+                packages.setdefault(entry, comp.slug)
+
+        req_path = os.path.join(dest, "requirements.txt")
+        if not os.path.isfile(req_path):
+            continue
+        with open(req_path, "r") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                m = REQUIREMENT.match(line) if not line.startswith("-") else None
+                if not m:
+                    report.conflicts.append(
+                        f"{comp.slug}/requirements.txt: cannot merge '{line}'; add it by hand"
+                    )
+                    continue
+                name = m.group(1).lower().replace("_", "-")
+                spec = m.group(3)
+                extras.setdefault(name, set()).update(
+                    e.strip().lower() for e in (m.group(2) or "").split(",") if e.strip()
+                )
+                if name in pins and pins[name][0] != spec:
+                    if pins[name][0] and spec:
+                        report.conflicts.append(
+                            f"{name}: '{pins[name][0]}' ({pins[name][1]}) vs "
+                            f"'{spec}' ({comp.slug})"
+                        )
+                    if spec and not pins[name][0]:
+                        pins[name] = (spec, comp.slug)
+                else:
+                    pins.setdefault(name, (spec, comp.slug))
+    if pins:
+        report.requirements = [
+            f"{name}[{','.join(sorted(extras[name]))}]{spec}" if extras[name] else f"{name}{spec}"
+            for name, (spec, _) in sorted(pins.items())
+        ]
+        with open(os.path.join(output_dir, "requirements.txt"), "w") as f:
+            f.write("\n".join(report.requirements) + "\n")
+    return report
@@ -0,0 +1,89 @@
+"""
+Offline text embedding backends for VectorMemory.
+
+``HashingEmbedder`` needs nothing beyond numpy: word unigrams and bigrams
+are hashed (CRC32, stable across processes) into a fixed number of signed
+buckets and the result is L2-normalised, so inner products approximate
+cosine similarity of bag-of-words vectors. ``SentenceTransformerEmbedder``
+wraps a small local CPU model when ``sentence-transformers`` is installed.
+Pick one with ``EMBEDDING_BACKEND`` (``hashing`` or ``sentence-transformers``).
+"""
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TOKEN = re.compile(r"[a-z0-9_]+")
+
+
+class HashingEmbedder:
+    """Feature-hashing bag of words; deterministic and network-free."""
+    def __init__(self, dimension: int = None, bigrams: bool = True, max_chars: int = 8000):
+        if np is None:
+            raise RuntimeError("numpy is required for HashingEmbedder but not installed")
+        self.dimension = dimension or int(os.getenv("EMBEDDING_DIMENSION", "384"))
+        self.bigrams = bigrams
+        self.max_chars = max_chars
+        self._bucket = lru_cache(maxsize=200_000)(self._hash)
+
+    def _hash(self, token: str):
+        h = zlib.crc32(token.encode())
+        return h % self.dimension, 1.0 if h & 0x80000000 else -1.0
+
+    def _features(self, text: str):
+        words = TOKEN.findall(text[: self.max_chars].lower())
+        yield from words
+        if self.bigrams:
+            yield from (f"{a} {b}" for a, b in zip(words, words[1:]))
+
+    def embed(self, texts: List[str]):
+        """Return an (n, dimension) float32 array of unit vectors."""
+        flat, signs = [], []
+        for row, text in enumerate(texts):
+            offset = row * self.dimension
+            for feature in self._features(text or ""):
+                bucket, sign = self._bucket(feature)
+                flat.append(offset + bucket)
+                signs.append(sign)
+        out = np.bincount(
+            flat, weights=signs, minlength=len(texts) * self.dimension
+        ).astype("float32").reshape(len(texts), self.dimension)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+class SentenceTransformerEmbedder:
+    """Small local sentence-transformers model (default all-MiniLM-L6-v2) on CPU."""
+    def __init__(self, model_name: str = None):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError(
+                "sentence-transformers is required for this backend but not installed"
+            ) from None
+        self.model = SentenceTransformer(
+            model_name or os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"), device="cpu"
+        )
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]):
+        return self.model.encode(
+            list(texts), batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        ).astype("float32")
+
+
+def get_embedder(backend: str = None):
+    """Instantiate the configured embedding backend."""
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "hashing")
+    if backend == "hashing":
+        return HashingEmbedder()
+    if backend in ("sentence-transformers", "sentence_transformers"):
+        return SentenceTransformerEmbedder()
+    raise ValueError(f"Unknown embedding backend: {backend}")
@@ -1,19 +1,38 @@
-from agent_system.memory import Memory
+from typing import Any, Dict, List, Optional
+
+from agent_system.reasoning import ReasoningStore, get_store
 
 
 class ReasoningLog:
     """
-    Logs agent reasoning steps into Memory and retrieves reasoning chains.
+    Logs agent reasoning steps into the structured reasoning store
+    (agent_system/reasoning.py) and retrieves reasoning chains.
+
+    ``memory`` is accepted for compatibility with existing callers; steps
+    are no longer written to Memory.
     """
-    def __init__(self, memory: Memory):
+    def __init__(self, memory=None, store: Optional[ReasoningStore] = None):
         self.memory = memory
+        self.store = store or get_store()
+
+    def log(
+        self,
+        agent: str,
+        step: str,
+        content: str,
+        chain_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Record a reasoning step for an agent; returns the step id."""
+        return self.store.log(
+            agent, step, content, chain_id=chain_id, parent_id=parent_id, metadata=metadata
+        )
 
-    def log(self, agent: str, step: str, content: str):
-        """Record a reasoning step for an agent."""
-        self.memory.add(agent, f"reasoning:{step}", content)
+    def get_chain(self, chain_id: str) -> List[Dict[str, Any]]:
+        """Retrieve every step of a chain in order."""
+        return self.store.get_chain(chain_id)
 
-    def get_chain(self, agent: str, limit: int = 100):
-        """
-        Retrieve recent reasoning entries for the agent as a list of tuples.
-        """
-        return self.memory.query(agent=agent, limit=limit)
+    def recent(self, agent: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Retrieve the agent's most recent steps across chains."""
+        return self.store.steps(agent=agent, limit=limit)
@@ -1,31 +1,141 @@
+import base64
+import json
+import logging
 import os
+import zlib
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from agent_system import tracing
+
+logger = logging.getLogger(__name__)
+
+# Compressed content is stored as one of these prefixes plus base64 data
+CODEC_PREFIXES = {"zlib": "~zlib~", "zstd": "~zstd~"}
+
+
+def _codec(name: Optional[str] = None) -> str:
+    return _resolve_codec(name or os.getenv("MEMORY_COMPRESSION", "zlib"))
+
+
+@lru_cache(maxsize=None)
+def _resolve_codec(name: str) -> str:
+    if name == "zstd" and zstandard is None:
+        logger.warning("zstandard is not installed; compressing Memory content with zlib")
+        return "zlib"
+    if name not in CODEC_PREFIXES:
+        raise ValueError(f"Unknown Memory compression codec: {name}")
+    return name
+
+
+def encode_content(value: Optional[str], min_bytes: int = 0, codec: str = None):
+    """
+    Compress ``value`` when it is at least ``min_bytes`` long (a negative
+    ``min_bytes`` disables compression) and the result is smaller.
+    """
+    if value is None or min_bytes < 0 or len(value) < min_bytes or is_compressed(value):
+        return value
+    codec = _codec(codec)
+    raw = value.encode("utf-8")
+    if codec == "zstd":
+        packed = zstandard.ZstdCompressor(level=10).compress(raw)
+    else:
+        packed = zlib.compress(raw, 6)
+    encoded = CODEC_PREFIXES[codec] + base64.b64encode(packed).decode("ascii")
+    return encoded if len(encoded) < len(value) else value
+
+
+def is_compressed(value: Optional[str]) -> bool:
+    return bool(value) and value[:6] in CODEC_PREFIXES.values()
+
+
+def decode_content(value: Optional[str]):
+    """Inverse of ``encode_content``; uncompressed values pass through."""
+    if not is_compressed(value):
+        return value
+    packed = base64.b64decode(value[6:])
+    if value[:6] == CODEC_PREFIXES["zstd"]:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed Memory content")
+        return zstandard.ZstdDecompressor().decompress(packed).decode("utf-8")
+    return zlib.decompress(packed).decode("utf-8")
+
 
 class Memory:
     """
     Memory store for agent interactions. Uses SQLAlchemy if RELATIONAL_DSN is set,
     otherwise falls back to SQLite.
+
+    With an ArtifactStore, content above the store's size threshold is kept
+    out of the table: the row holds a JSON reference with a short summary,
+    which ``load_content`` resolves back to the full text.
+
+    Content of at least ``MEMORY_COMPRESS_MIN_BYTES`` (default 4096; -1
+    disables) is compressed with ``MEMORY_COMPRESSION`` (zlib, or zstd when
+    ``zstandard`` is installed) on write and decompressed on read, so
+    callers always see plain text. Rows moved out by the retention engine
+    (agent_system/retention.py) live, always compressed, in
+    ``memories_archive``.
     """
 
-    def __init__(self, db_path: Optional[str] = None):
-        from sqlalchemy import (Column, DateTime, Integer, String, Text,
-                                create_engine, func, inspect, text)
+    def __init__(self, db_path: Optional[str] = None, artifact_store=None):
+        from sqlalchemy import (Column, DateTime, Index, Integer, String, Text,
+                                TypeDecorator, create_engine, event, func,
+                                inspect, text)
         from sqlalchemy.ext.declarative import declarative_base
         from sqlalchemy.orm import sessionmaker
 
+        class CompressedText(TypeDecorator):
+            impl = Text
+            cache_ok = True
+
+            def __init__(self, min_bytes: int = 0):
+                super().__init__()
+                self.min_bytes = min_bytes
+
+            def process_bind_param(self, value, dialect):
+                if dialect.name == "postgresql":
+                    return value  # TOAST compresses large values; keeps tsvector indexing simple
+                return encode_content(value, self.min_bytes)
+
+            def process_result_value(self, value, dialect):
+                return decode_content(value)
+
+        min_bytes = int(os.getenv("MEMORY_COMPRESS_MIN_BYTES", "4096"))
         Base = declarative_base()
 
         class MemoryEntry(Base):  # type: ignore[misc, valid-type]
             __tablename__ = "memories"
             id = Column(Integer, primary_key=True, autoincrement=True)
             # ensure correct timestamp generation without quoting issues
-            timestamp = Column(DateTime, server_default=func.now())
+            timestamp = Column(DateTime, server_default=func.now(), index=True)
+            project = Column(String(100), nullable=True)
+            agent = Column(String(100))
+            action = Column(String(100))
+            content = Column(CompressedText(min_bytes))
+            # Keeps recent-rows-per-agent queries fast however large the table grows
+            __table_args__ = (Index("ix_memories_agent_timestamp", "agent", "timestamp"),)
+
+        class ArchivedEntry(Base):  # type: ignore[misc, valid-type]
+            __tablename__ = "memories_archive"
+            id = Column(Integer, primary_key=True)
+            timestamp = Column(DateTime, index=True)
             project = Column(String(100), nullable=True)
             agent = Column(String(100))
             action = Column(String(100))
-            content = Column(Text)
+            content = Column(CompressedText(0))
+            archived_at = Column(DateTime)
+
+        class RemovedEntry(Base):  # type: ignore[misc, valid-type]
+            # Ids retention removed from memories, until the indexer drops their vectors
+            __tablename__ = "memories_removed"
+            id = Column(Integer, primary_key=True)
 
         dsn = os.getenv("RELATIONAL_DSN")
         if dsn:
@@ -33,6 +143,10 @@ class Memory:
         else:
             sqlite_path = db_path or os.getenv("MEMORY_DB_PATH", "./memory.sqlite")
             engine = create_engine(f"sqlite:///{sqlite_path}")
+            # Used by the full-text index to read compressed content
+            event.listen(engine, "connect", lambda conn, _: conn.create_function(
+                "memory_text", 1, decode_content, deterministic=True
+            ))
 
         Base.metadata.create_all(engine)
         # ensure project column exists for legacy databases
@@ -47,8 +161,27 @@ class Memory:
                     conn.execute(text("ALTER TABLE memories ADD COLUMN project TEXT"))
             except Exception:
                 pass
+        # create_all skips indexes of tables that already existed
+        for index in MemoryEntry.__table__.indexes:
+            index.create(engine, checkfirst=True)
+        self.engine = engine
         self.Session = sessionmaker(bind=engine)
         self._MemoryEntry = MemoryEntry
+        self._ArchivedEntry = ArchivedEntry
+        self._RemovedEntry = RemovedEntry
+        self.artifacts = artifact_store
+        self._init_search()
+
+    def _init_search(self):
+        """Install the full-text index; pending rows are left to the indexer task."""
+        from agent_system import memory_search
+
+        self.searchable = memory_search.install(self.engine)
+        if self.searchable and memory_search.has_pending(self.engine):
+            logger.info(
+                "Some Memory rows are not in the full-text index yet; "
+                "the index_memory task adds them"
+            )
 
     def _init_schema(self):
         cur = self.conn.cursor()
@@ -67,31 +200,45 @@ class Memory:
 
     def add(
         self, agent: str, action: str, content: str, project: Optional[str] = None
-    ) -> None:
+    ) -> int:
         """
         Add a memory entry for a given agent and action with arbitrary content.
+        Returns the new row id.
         """
-        session = self.Session()
-        entry = self._MemoryEntry(
-            project=project,
-            agent=agent,
-            action=action,
-            content=content,
-            timestamp=datetime.utcnow(),
-        )
-        session.add(entry)
-        session.commit()
-        session.close()
+        with tracing.span("db.memory.add", "db", agent=agent, action=action):
+            if self.artifacts is not None:
+                offloaded = self.artifacts.offload(content)
+                if offloaded is not content:
+                    content = json.dumps(offloaded)
+            session = self.Session()
+            entry = self._MemoryEntry(
+                project=project,
+                agent=agent,
+                action=action,
+                content=content,
+                timestamp=datetime.utcnow(),
+            )
+            session.add(entry)
+            session.flush()
+            if self.searchable:
+                from agent_system import memory_search
+
+                memory_search.index_added(session, entry.id)
+            session.commit()
+            entry_id = entry.id
+            session.close()
+            return entry_id
 
     def query(
         self,
         agent: Optional[str] = None,
         project: Optional[str] = None,
         limit: int = 100,
+        action: Optional[str] = None,
     ):
         """
-        Retrieve recent memory entries, optionally filtered by agent.
-        Returns a list of MemoryEntry objects.
+        Retrieve recent memory entries, optionally filtered by agent, project
+        and action. Returns a list of MemoryEntry objects.
         """
         session = self.Session()
         q = session.query(self._MemoryEntry)
@@ -99,6 +246,108 @@ class Memory:
             q = q.filter_by(project=project)
         if agent:
             q = q.filter_by(agent=agent)
+        if action:
+            q = q.filter_by(action=action)
         entries = q.order_by(self._MemoryEntry.timestamp.desc()).limit(limit).all()
         session.close()
         return entries
+
+    def get(self, ids):
+        """Return the entries with the given ids, in the order given."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        session = self.Session()
+        entries = session.query(self._MemoryEntry).filter(self._MemoryEntry.id.in_(ids)).all()
+        session.close()
+        by_id = {e.id: e for e in entries}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def iter_since(
+        self, after_id: int = 0, batch_size: int = 1000, exclude_agents=()
+    ):
+        """
+        Yield lists of up to ``batch_size`` entries with id > ``after_id`` in
+        id order. Each batch is a separate keyset query, so arbitrarily large
+        tables are streamed rather than loaded at once.
+        """
+        entry = self._MemoryEntry
+        while True:
+            session = self.Session()
+            q = session.query(entry).filter(entry.id > after_id)
+            if exclude_agents:
+                q = q.filter(~entry.agent.in_(list(exclude_agents)))
+            batch = q.order_by(entry.id).limit(batch_size).all()
+            session.close()
+            if not batch:
+                return
+            after_id = batch[-1].id
+            yield batch
+
+    def search(
+        self,
+        text: str,
+        agent: Optional[str] = None,
+        project: Optional[str] = None,
+        since=None,
+        limit: int = 20,
+        offset: int = 0,
+    ):
+        """
+        Full-text search over content (FTS5 on SQLite, tsvector on
+        PostgreSQL), best match first, optionally filtered by agent, project
+        and a minimum timestamp. Returns dicts with id, timestamp, agent,
+        action, project, a ``<mark>``-highlighted snippet and a score.
+        """
+        from agent_system import memory_search
+
+        if not self.searchable:
+            raise RuntimeError("Full-text search is not available for this database")
+        return memory_search.search(
+            self.engine, text, agent=agent, project=project, since=since,
+            limit=limit, offset=offset,
+        )
+
+    def removed_ids(self):
+        """Ids of rows retention removed whose vectors have not been dropped yet."""
+        session = self.Session()
+        ids = [i for (i,) in session.query(self._RemovedEntry.id).order_by(self._RemovedEntry.id)]
+        session.close()
+        return ids
+
+    def forget_removed(self, ids):
+        """Clear ids from ``removed_ids`` once their vectors are gone."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return
+        session = self.Session()
+        session.query(self._RemovedEntry).filter(
+            self._RemovedEntry.id.in_(ids)
+        ).delete(synchronize_session=False)
+        session.commit()
+        session.close()
+
+    def rebuild_search_index(self, batch_size: int = 5000, max_rows: Optional[int] = None) -> int:
+        """
+        Index rows not in the full-text index yet (ones that predate it or
+        were written by other processes), resuming where the last call
+        stopped; returns the number of rows still pending.
+        """
+        from agent_system import memory_search
+
+        if not self.searchable:
+            return 0
+        return memory_search.backfill(self.engine, batch_size, max_rows)
+
+    def load_content(self, content: str) -> str:
+        """
+        Return the full text for a stored content value, fetching it from
+        the artifact store if the row only holds a reference.
+        """
+        if self.artifacts is None or not content or not content.startswith("{"):
+            return content
+        try:
+            value = json.loads(content)
+        except ValueError:
+            return content
+        return self.artifacts.resolve(value) if isinstance(value, dict) else content
@@ -0,0 +1,136 @@
+"""
+Streams Memory rows into VectorMemory.
+
+``MemoryIndexer`` tails the ``memories`` table by id: it reads rows above its
+watermark in batches, embeds them with an offline backend (see
+agent_system.embedding) and adds them to VectorMemory under their row ids
+with agent/action/project metadata. The watermark is stored in the vector
+store's SQLite state table and committed by the same ``save`` that persists
+the vectors, so a crash resumes from the last saved batch. Rows the
+retention engine removed are deleted from the vector store first. It runs from the
+``service.indexer_tasks.index_memory`` Celery task or standalone via
+``scripts/memory_indexer.py``; run one indexer per vector index.
+"""
+import logging
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping rows that carry ids and JSON records rather than content
+EXCLUDED_AGENTS = ("TaskRegistry", "PipelineRegistry")
+WATERMARK_KEY = "memory_indexer.watermark"
+
+
+class MemoryIndexer:
+    def __init__(
+        self,
+        memory,
+        vectors=None,
+        embedder=None,
+        batch_size: int = 512,
+        save_every: int = 50_000,
+        exclude_agents=EXCLUDED_AGENTS,
+    ):
+        from agent_system.embedding import get_embedder
+
+        self.memory = memory
+        self.embedder = embedder or get_embedder()
+        if vectors is None:
+            from agent_system.vector_memory import VectorMemory
+
+            vectors = VectorMemory(self.embedder.dimension)
+        if vectors.dimension != self.embedder.dimension:
+            raise ValueError(
+                f"Embedding dimension {self.embedder.dimension} does not match "
+                f"the vector index ({vectors.dimension})"
+            )
+        self.vectors = vectors
+        self.batch_size = batch_size
+        self.save_every = save_every
+        self.exclude_agents = exclude_agents
+
+    @property
+    def watermark(self) -> int:
+        return self.vectors.get_state(WATERMARK_KEY, 0)
+
+    def _text(self, entry) -> str:
+        content = self.memory.load_content(entry.content) or ""
+        return f"{entry.agent} {entry.action}\n{content}"
+
+    def apply_removed(self) -> int:
+        """
+        Delete the vectors of rows retention removed from Memory; returns how
+        many ids were applied. They are only cleared once the deletion is
+        saved, and deleting again after a crash is harmless.
+        """
+        ids = self.memory.removed_ids()
+        if ids:
+            self.vectors.delete(ids)
+            self.vectors.save()
+            self.memory.forget_removed(ids)
+        return len(ids)
+
+    def run_once(self, max_rows: int = None) -> Dict[str, Any]:
+        """
+        Drop vectors of removed rows, then index rows above the watermark
+        until caught up (or ``max_rows`` were indexed) and return throughput
+        stats.
+        """
+        start = time.time()
+        removed = self.apply_removed()
+        watermark = self.watermark
+        rows = unsaved = 0
+        embed_seconds = 0.0
+        with self.vectors.bulk():
+            for batch in self.memory.iter_since(
+                watermark, self.batch_size, exclude_agents=self.exclude_agents
+            ):
+                if max_rows is not None:
+                    batch = batch[: max_rows - rows]
+                t0 = time.time()
+                vectors = self.embedder.embed([self._text(e) for e in batch])
+                embed_seconds += time.time() - t0
+                self.vectors.add(
+                    vectors,
+                    ids=[e.id for e in batch],
+                    metadata=[{
+                        "agent": e.agent,
+                        "action": e.action,
+                        "project": e.project,
+                        "timestamp": e.timestamp.isoformat() if e.timestamp else None,
+                    } for e in batch],
+                )
+                watermark = batch[-1].id
+                self.vectors.set_state(WATERMARK_KEY, watermark)
+                rows += len(batch)
+                unsaved += len(batch)
+                if unsaved >= self.save_every:
+                    self.vectors.save()
+                    unsaved = 0
+                    logger.info(
+                        "Indexed %d rows (watermark %d, %.0f rows/s)",
+                        rows, watermark, rows / max(time.time() - start, 1e-9),
+                    )
+                if max_rows is not None and rows >= max_rows:
+                    break
+            self.vectors.save()
+        elapsed = time.time() - start
+        return {
+            "rows": rows,
+            "removed": removed,
+            "watermark": watermark,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+            "embed_seconds": round(embed_seconds, 3),
+            "indexed": len(self.vectors),
+        }
+
+    def run_forever(self, poll_interval: float = 5.0):
+        """Standalone worker loop: index new rows, then poll for more."""
+        while True:
+            stats = self.run_once()
+            if stats["rows"]:
+                logger.info("Indexed %(rows)d rows at %(rows_per_sec).0f rows/s", stats)
+            else:
+                time.sleep(poll_interval)
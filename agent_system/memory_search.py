@@ -0,0 +1,284 @@
+"""
+Full-text search over Memory content.
+
+SQLite: an FTS5 index (porter stemming) whose external content is the view
+``memories_text``, which decompresses ``content`` through the
+``memory_text`` SQL function Memory registers on its connections. There are
+no triggers on ``memories``, so any process can write to the table; Memory
+indexes the rows it adds (``index_added``) and removes rows from the index
+before deleting them (``unindex``). ``memories_fts_state`` records the id up
+to which rows are indexed; rows past it, such as ones written by other
+processes or present before the index was installed, are indexed by
+``backfill`` in id batches, so a rebuild can be interrupted and resumed.
+
+PostgreSQL: a ``content_tsv`` tsvector column with a GIN index, maintained
+by a ``tsvector_update_trigger`` (content is not compressed there; TOAST
+already compresses large values). Pending rows are those whose
+``content_tsv`` is still NULL.
+"""
+import html
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+HIGHLIGHT = ("<mark>", "</mark>")
+# Snippets are built with these markers, HTML-escaped, then given HIGHLIGHT
+MARKERS = ("\x02", "\x03")
+TOKEN = re.compile(r"(\w+)(\*?)", re.UNICODE)
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories_fts_state (key TEXT PRIMARY KEY, value INTEGER);
+INSERT OR IGNORE INTO memories_fts_state (key, value) VALUES ('done', 0);
+CREATE VIEW IF NOT EXISTS memories_text AS
+    SELECT id, memory_text(content) AS content FROM memories;
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+    content, content='memories_text', content_rowid='id', tokenize='porter unicode61'
+);
+DROP TRIGGER IF EXISTS memories_fts_insert;
+DROP TRIGGER IF EXISTS memories_fts_delete;
+DROP TRIGGER IF EXISTS memories_fts_update;
+"""
+# Indexes installed with sync triggers also recorded a 'target' id, past which
+# the triggers had indexed every row. If their backfill had finished, all
+# rows are indexed; otherwise the index is rebuilt from scratch.
+SQLITE_MIGRATE = """
+INSERT INTO memories_fts (memories_fts) SELECT 'delete-all' WHERE {partial};
+UPDATE memories_fts_state SET value = 0 WHERE key = 'done' AND {partial};
+UPDATE memories_fts_state SET value = (SELECT COALESCE(MAX(id), 0) FROM memories)
+    WHERE key = 'done' AND value >= ({target});
+DELETE FROM memories_fts_state WHERE key = 'target';
+""".format(
+    target="SELECT value FROM memories_fts_state WHERE key = 'target'",
+    partial="(SELECT value FROM memories_fts_state WHERE key = 'done') "
+    "< (SELECT value FROM memories_fts_state WHERE key = 'target')",
+)
+DONE = "(SELECT value FROM memories_fts_state WHERE key = 'done')"
+
+POSTGRES_SCHEMA = [
+    "ALTER TABLE memories ADD COLUMN IF NOT EXISTS content_tsv tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_memories_content_tsv ON memories USING GIN (content_tsv)",
+]
+POSTGRES_TRIGGER = (
+    "CREATE TRIGGER memories_tsv_update BEFORE INSERT OR UPDATE OF content ON memories "
+    "FOR EACH ROW EXECUTE FUNCTION "
+    "tsvector_update_trigger(content_tsv, 'pg_catalog.english', content)"
+)
+
+
+def install(engine) -> bool:
+    """Create the index (and the PostgreSQL trigger) if missing; False if unsupported."""
+    from sqlalchemy import text
+
+    if engine.dialect.name == "sqlite":
+        raw = engine.raw_connection()
+        try:
+            raw.executescript(
+                "BEGIN IMMEDIATE;" + SQLITE_SCHEMA + SQLITE_MIGRATE + "COMMIT;"
+            )
+        except Exception:
+            raw.rollback()
+            return False
+        finally:
+            raw.close()
+        return True
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for statement in POSTGRES_SCHEMA:
+                conn.execute(text(statement))
+            exists = conn.execute(
+                text("SELECT 1 FROM pg_trigger WHERE tgname = 'memories_tsv_update'")
+            ).first()
+            if not exists:
+                conn.execute(text(POSTGRES_TRIGGER))
+        return True
+    return False
+
+
+def pending(engine) -> int:
+    """Number of rows not indexed yet."""
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            return conn.execute(text(
+                "SELECT COUNT(*) FROM memories WHERE content_tsv IS NULL AND content IS NOT NULL"
+            )).scalar()
+        return conn.execute(text(f"SELECT COUNT(*) FROM memories WHERE id > {DONE}")).scalar()
+
+
+def has_pending(engine) -> bool:
+    """Whether any row is not indexed yet; cheaper than ``pending``."""
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            sql = "SELECT 1 FROM memories WHERE content_tsv IS NULL AND content IS NOT NULL LIMIT 1"
+        else:
+            sql = f"SELECT 1 FROM memories WHERE id > {DONE} LIMIT 1"
+        return conn.execute(text(sql)).first() is not None
+
+
+def index_added(session, entry_id: int) -> None:
+    """
+    Index a row just inserted in ``session``'s open transaction if every
+    earlier row is indexed; otherwise it is left for ``backfill``. A no-op
+    except on SQLite.
+    """
+    from sqlalchemy import text
+
+    if session.get_bind().dialect.name != "sqlite":
+        return
+    caught_up = (
+        f"{DONE} >= (SELECT COALESCE(MAX(id), 0) FROM memories WHERE id < :id)"
+    )
+    indexed = session.execute(text(
+        "INSERT INTO memories_fts (rowid, content) "
+        f"SELECT id, memory_text(content) FROM memories WHERE id = :id AND {caught_up}"
+    ), {"id": entry_id}).rowcount
+    if indexed:
+        session.execute(text(
+            "UPDATE memories_fts_state SET value = :id WHERE key = 'done'"
+        ), {"id": entry_id})
+
+
+def unindex(session, ids) -> None:
+    """
+    Remove rows from the index; call it in the ``session`` that deletes
+    them, before the delete. A no-op except on SQLite.
+    """
+    from sqlalchemy import bindparam, text
+
+    ids = [int(i) for i in ids]
+    if not ids or session.get_bind().dialect.name != "sqlite":
+        return
+    session.execute(text(
+        "INSERT INTO memories_fts (memories_fts, rowid, content) "
+        "SELECT 'delete', id, memory_text(content) FROM memories "
+        f"WHERE id IN :ids AND id <= {DONE}"
+    ).bindparams(bindparam("ids", expanding=True)), {"ids": ids})
+
+
+def backfill(engine, batch_size: int = 5000, max_rows: int = None) -> int:
+    """
+    Index up to ``max_rows`` (default: all) pending rows, one batch per
+    transaction; returns how many rows are still pending.
+    """
+    from sqlalchemy import text
+
+    indexed = 0
+    while max_rows is None or indexed < max_rows:
+        n = batch_size if max_rows is None else min(batch_size, max_rows - indexed)
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                count = conn.execute(text(
+                    "UPDATE memories SET content_tsv = "
+                    "to_tsvector('pg_catalog.english', COALESCE(content, '')) "
+                    "WHERE id IN (SELECT id FROM memories WHERE content_tsv IS NULL "
+                    "AND content IS NOT NULL ORDER BY id LIMIT :n)"
+                ), {"n": n}).rowcount
+            else:
+                done = conn.execute(text("SELECT " + DONE)).scalar()
+                upto = conn.execute(text(
+                    "SELECT MAX(id) FROM (SELECT id FROM memories WHERE id > :done "
+                    "ORDER BY id LIMIT :n)"
+                ), {"done": done, "n": n}).scalar()
+                count = 0
+                if upto is not None:
+                    # Re-read the watermark under the write lock: Memory.add
+                    # may have indexed rows since
+                    count = conn.execute(text(
+                        "INSERT INTO memories_fts (rowid, content) "
+                        "SELECT id, memory_text(content) FROM memories "
+                        f"WHERE id > {DONE} AND id <= :upto"
+                    ), {"upto": upto}).rowcount
+                    conn.execute(text(
+                        "UPDATE memories_fts_state SET value = MAX(value, :upto) "
+                        "WHERE key = 'done'"
+                    ), {"upto": upto})
+        if not count:
+            break
+        indexed += count
+    return pending(engine)
+
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """HTML-escape a snippet, then turn its match markers into HIGHLIGHT tags."""
+    if snippet is None:
+        return None
+    snippet = html.escape(snippet)
+    for marker, tag in zip(MARKERS, HIGHLIGHT):
+        snippet = snippet.replace(marker, tag)
+    return snippet
+
+
+def fts_query(query: str) -> str:
+    """Quote each word of free text for FTS5 (all must match; ``word*`` is a prefix)."""
+    return " ".join(f'"{word}"{star}' for word, star in TOKEN.findall(query))
+
+
+def search(
+    engine,
+    query: str,
+    agent: Optional[str] = None,
+    project: Optional[str] = None,
+    since: Union[datetime, str, None] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """Best matches first, each with a highlighted snippet and a score (higher is better)."""
+    from sqlalchemy import text
+
+    if isinstance(since, str):
+        since = datetime.fromisoformat(since)
+    params: Dict[str, Any] = {"limit": limit, "offset": offset}
+    filters = []
+    for column, value in (("agent", agent), ("project", project)):
+        if value:
+            filters.append(f"m.{column} = :{column}")
+            params[column] = value
+    if since:
+        filters.append("m.timestamp >= :since")
+        params["since"] = since if engine.dialect.name == "postgresql" else since.isoformat(" ")
+    where = "".join(f" AND {f}" for f in filters)
+
+    if engine.dialect.name == "postgresql":
+        params["q"] = query
+        sql = (
+            "SELECT m.id, m.timestamp, m.agent, m.action, m.project, "
+            "ts_headline('pg_catalog.english', m.content, q, :headline) AS snippet, "
+            "ts_rank(m.content_tsv, q) AS score "
+            "FROM memories m, websearch_to_tsquery('pg_catalog.english', :q) q "
+            "WHERE m.content_tsv @@ q{0} ORDER BY score DESC, m.id DESC "
+            "LIMIT :limit OFFSET :offset"
+        ).format(where)
+        params["headline"] = (
+            "StartSel={0}, StopSel={1}, MaxFragments=2, MinWords=5, MaxWords=20"
+        ).format(*MARKERS)
+    elif engine.dialect.name == "sqlite":
+        params["q"] = fts_query(query)
+        if not params["q"]:
+            return []
+        sql = (
+            "SELECT m.id, m.timestamp, m.agent, m.action, m.project, "
+            "snippet(memories_fts, 0, :start, :stop, '...', 16) AS snippet, "
+            "-bm25(memories_fts) AS score "
+            "FROM memories_fts JOIN memories m ON m.id = memories_fts.rowid "
+            "WHERE memories_fts MATCH :q{0} ORDER BY bm25(memories_fts), m.id DESC "
+            "LIMIT :limit OFFSET :offset"
+        ).format(where)
+        params["start"], params["stop"] = MARKERS
+    else:
+        raise RuntimeError(f"Full-text search is not supported on {engine.dialect.name}")
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(sql), params).mappings().all()
+    return [
+        {
+            **row,
+            "timestamp": row["timestamp"].isoformat()
+            if isinstance(row["timestamp"], datetime) else row["timestamp"],
+            "snippet": highlight(row["snippet"]),
+            "score": float(row["score"]),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,196 @@
+"""
+Pipeline stages shared by the CLI (main.py) and the Celery workflows
+(service/pipeline.py). Each stage takes plain inputs, returns plain,
+JSON-serialisable outputs and raises PipelineError when it cannot produce
+a result.
+"""
+import json
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agent_system import semantic_cache, tracing
+
+FALLBACK_MODELS: Dict[str, List[str]] = {
+    "architect": ["claude-v1", "lmstudio", "llama"],
+    "ideas": ["gpt-4", "gpt-3.5-turbo", "llama", "lmstudio"],
+    "creativity": ["claude-v1", "lmstudio", "llama"],
+    "qc": ["gpt-4", "gpt-3.5-turbo", "llama", "lmstudio"],
+}
+
+
+class PipelineError(RuntimeError):
+    """Raised when a pipeline stage fails."""
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+def with_fallback(
+    registry, agent_name: str, role: str, model: str, call: Callable,
+    cache_text: Optional[str] = None,
+) -> Tuple[str, str]:
+    """
+    Try ``call(agent)`` with ``model`` and then the role's fallback models,
+    returning (result, model) for the first non-empty result. ``cache_text``
+    describes the request for the semantic cache, for agents that opted in.
+    """
+    models = [model] + [m for m in FALLBACK_MODELS[role] if m != model]
+    for tries, candidate in enumerate(models, 1):
+        if tries > 1:
+            tracing.metrics.inc("obelisk_llm_fallbacks_total", role=role, model=candidate)
+        try:
+            agent = registry.get_agent(agent_name, model=candidate)
+            result = semantic_cache.cached_call(
+                agent_name, candidate, cache_text, lambda: call(agent)
+            )
+            if result and str(result).strip():
+                tracing.set_attributes(model=candidate, attempts=tries)
+                return result, candidate
+        except Exception:
+            continue
+    raise PipelineError(
+        role, f"All models failed or returned empty output: {FALLBACK_MODELS[role]}"
+    )
+
+
+@tracing.traced("stage.architect", "stage")
+def architect(registry, project: str, requirements: str, model: str, memory=None):
+    """Generate the architecture plan. Returns (spec, model)."""
+    spec, used = with_fallback(
+        registry, "CodeArchitect", "architect", model,
+        lambda agent: agent.generate_architecture(project, requirements),
+        cache_text=f"{project}\n{requirements}",
+    )
+    if memory:
+        from agent_system.logging import ReasoningLog
+
+        ReasoningLog(memory).log("CodeArchitect", used, spec)
+        memory.add("architect", "generate_architecture", spec, project=project)
+    return spec, used
+
+
+@tracing.traced("stage.ideas", "stage")
+def ideas(registry, project: str, spec: str, model: str, memory=None):
+    """Brainstorm improvement ideas for the plan. Returns (ideas, model)."""
+    result, used = with_fallback(
+        registry, "IdeasAgent", "ideas", model,
+        lambda agent: agent.generate_ideas(project, spec),
+        cache_text=f"{project}\n{spec}",
+    )
+    if memory:
+        memory.add("ideas", "generate_ideas", result, project=project)
+    return result, used
+
+
+@tracing.traced("stage.creativity", "stage")
+def creativity(registry, project: str, ideas_text: str, model: str, memory=None):
+    """Review and refine brainstormed ideas. Returns (review, model)."""
+    result, used = with_fallback(
+        registry, "CreativityAgent", "creativity", model,
+        lambda agent: agent.review_ideas(project, ideas_text),
+        cache_text=f"{project}\n{ideas_text}",
+    )
+    if memory:
+        memory.add("creativity", "review_ideas", result, project=project)
+    return result, used
+
+
+@tracing.traced("stage.generate", "stage")
+def generate(
+    spec: str,
+    output_dir: str,
+    codex_timeout: Optional[float] = None,
+    parallel_components: int = 0,
+    component_timeout: Optional[float] = None,
+    memory=None,
+) -> dict:
+    """
+    Generate code for the plan into output_dir. Returns a dict with the
+    output directory, generated components and merge conflicts.
+    """
+    from agent_system.agents.code_generator import CodeGenerator
+
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        generator = CodeGenerator(timeout=codex_timeout, memory=memory)
+        if parallel_components:
+            merge = generator.generate_components(
+                spec,
+                output_dir,
+                max_workers=parallel_components,
+                component_timeout=component_timeout,
+            )
+            components, conflicts = merge.components, merge.conflicts
+        else:
+            generator.generate_code(spec, output_dir)
+            components, conflicts = [], []
+    except Exception as e:
+        raise PipelineError("generate", str(e)) from e
+    if memory:
+        memory.add("generator", "generate_code", output_dir)
+    return {"output_dir": output_dir, "components": components, "conflicts": conflicts}
+
+
+@tracing.traced("stage.tests", "stage")
+def generate_tests(registry, output_dir: str, model: str, memory=None) -> str:
+    """Generate a pytest harness for the code. Returns the test file list."""
+    try:
+        harness = registry.get_agent("TestHarnessAgent", model=model)
+        tests = harness.generate_tests(output_dir)
+    except Exception as e:
+        raise PipelineError("tests", str(e)) from e
+    if memory:
+        memory.add("test_harness", "generate_tests", tests)
+    return tests
+
+
+@tracing.traced("stage.validate", "stage")
+def validate(
+    output_dir: str, flags: str = "", workers: int = 0, memory=None
+) -> Tuple[dict, str]:
+    """
+    Run pylint and black through the ValidationEngine. Returns the report
+    dict and the path it was written to; findings do not raise.
+    """
+    from agent_system.validation import ValidationEngine
+
+    state_dir = os.path.join(output_dir, ".obelisk")
+    engine = ValidationEngine(
+        flags=flags,
+        workers=workers or None,
+        cache_path=os.path.join(state_dir, "validation_cache.json"),
+    )
+    report = engine.run(output_dir).to_dict()
+    report_path = os.path.join(state_dir, "validation.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    if memory:
+        memory.add("validation", "run_validation", json.dumps(report))
+    return report, report_path
+
+
+@tracing.traced("stage.qc", "stage")
+def qc(registry, output_dir: str, model: str, lint_report: dict = None, memory=None):
+    """Quality-check the generated code. Returns (report, model)."""
+    def check(agent):
+        if lint_report:
+            return agent.check_directory(output_dir, lint_report=lint_report)
+        return agent.check_directory(output_dir)
+
+    report, used = with_fallback(registry, "QCChecker", "qc", model, check)
+    if memory:
+        memory.add("qc", "check_directory", report)
+    return report, used
+
+
+@tracing.traced("stage.score", "stage")
+def score(registry, report: str, model: str, memory=None) -> dict:
+    """Self-score the QC report."""
+    try:
+        scorer = registry.get_agent("SelfScoringAgent", model=model)
+        result = scorer.evaluate(report)
+    except Exception as e:
+        raise PipelineError("score", str(e)) from e
+    if memory:
+        memory.add("self_scoring", "evaluate", json.dumps(result))
+    return result
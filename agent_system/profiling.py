@@ -0,0 +1,232 @@
+"""
+Per-stage profiling of pipeline runs.
+
+A Profiler measures each stage run inside ``stage(name)``: wall time,
+this process's CPU time and the CPU time of subprocesses it waited for
+(Codex, linters, sandboxed tests), plus, by mode,
+
+- ``cpu``:   cProfile with a CPU-time timer (where Python burns CPU),
+- ``wall``:  cProfile with the default wall-clock timer (also counts time
+             blocked on I/O, LLM requests and subprocesses),
+- ``alloc``: tracemalloc, the top allocating source lines of the stage.
+
+cProfile only sees the thread that entered the stage; work a stage hands
+to pool threads shows up as waiting time in the calling thread.
+
+Artifacts go to one directory per run: ``<stage>.prof`` (pstats, for
+``python -m pstats`` or snakeviz), ``<stage>.json`` with the measurements
+and the ten hottest functions or allocators, and ``summary.txt`` /
+``summary.json`` covering every stage written so far. Stage files are
+rewritten independently, so stages profiled by different Celery workers
+sharing the directory add up to one summary.
+
+``configure`` installs a profiler for the process; ``stage`` is a no-op
+when none is installed, so call sites need no checks.
+"""
+import cProfile
+import glob
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MODES = ("cpu", "alloc", "wall")
+TOP = 10
+
+
+def profile_dir(output_dir: str, run_id: str) -> str:
+    """``<output_dir>.profile/<run_id>``, beside the output directory."""
+    output_dir = os.path.abspath(output_dir).rstrip(os.sep)
+    return os.path.join(f"{output_dir}.profile", run_id)
+
+
+def _children_cpu() -> float:
+    t = os.times()
+    return t.children_user + t.children_system
+
+
+def _functions(profile: cProfile.Profile, top: int) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    cwd = os.getcwd()
+    rows = []
+    for (path, line, func), (_, nc, tt, ct, _) in stats.stats.items():
+        # Built-ins have no file; repo files are shown relative to the cwd
+        where = os.path.relpath(path) if path.startswith(cwd) else path
+        rows.append({
+            "function": func if path == "~" else f"{func} ({where}:{line})",
+            "calls": nc,
+            "own": round(tt, 6),
+            "cumulative": round(ct, 6),
+        })
+    rows.sort(key=lambda r: r["own"], reverse=True)
+    return rows[:top]
+
+
+def _allocations(before, after, top: int) -> List[Dict[str, Any]]:
+    diffs = after.compare_to(before, "lineno")
+    rows = []
+    for d in sorted(diffs, key=lambda d: d.size_diff, reverse=True)[:top]:
+        frame = d.traceback[0]
+        rows.append({
+            "location": f"{frame.filename}:{frame.lineno}",
+            "size": d.size_diff,
+            "count": d.count_diff,
+        })
+    return rows
+
+
+class Profiler:
+    def __init__(self, mode: str, directory: str, top: int = TOP):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; use one of {MODES}")
+        self.mode = mode
+        self.directory = directory
+        self.top = top
+        self._active = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Profile the block as stage ``name``; a stage nested in another is part of it."""
+        nested = self._active is not None
+        profile = None
+        snapshot = None
+        started_tracing = False
+        if not nested:
+            self._active = name
+            if self.mode == "alloc":
+                started_tracing = not tracemalloc.is_tracing()
+                if started_tracing:
+                    tracemalloc.start()
+                tracemalloc.reset_peak()
+                snapshot = tracemalloc.take_snapshot()
+            else:
+                profile = cProfile.Profile(time.process_time) if self.mode == "cpu" else cProfile.Profile()
+        wall, cpu, child_cpu = time.perf_counter(), time.process_time(), _children_cpu()
+        ok = False
+        try:
+            if profile is not None:
+                profile.enable()
+            try:
+                yield
+            finally:
+                if profile is not None:
+                    profile.disable()
+            ok = True
+        finally:
+            record = {
+                "stage": name,
+                "mode": self.mode,
+                "ok": ok,
+                "nested": nested,
+                "wall": round(time.perf_counter() - wall, 6),
+                "cpu": round(time.process_time() - cpu, 6),
+                "child_cpu": round(_children_cpu() - child_cpu, 6),
+                "pid": os.getpid(),
+                "finished": time.time(),
+            }
+            if not nested:
+                self._active = None
+                try:
+                    self._write(name, record, profile, snapshot, started_tracing)
+                except OSError:
+                    logger.exception("Writing profile for stage %s failed", name)
+
+    def _write(self, name, record, profile, snapshot, started_tracing):
+        os.makedirs(self.directory, exist_ok=True)
+        if profile is not None:
+            path = os.path.join(self.directory, f"{name}.prof")
+            profile.dump_stats(path)
+            record["profile"] = path
+            record["functions"] = _functions(profile, self.top)
+        if snapshot is not None:
+            after = tracemalloc.take_snapshot()
+            record["peak"] = tracemalloc.get_traced_memory()[1]
+            record["allocations"] = _allocations(snapshot, after, self.top)
+            if started_tracing:
+                tracemalloc.stop()
+        with open(os.path.join(self.directory, f"{name}.json"), "w") as f:
+            json.dump(record, f, indent=2)
+        write_summary(self.directory)
+
+
+def load_stages(directory: str) -> List[Dict[str, Any]]:
+    stages = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        if os.path.basename(path) == "summary.json":
+            continue
+        try:
+            with open(path) as f:
+                stages.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(stages, key=lambda s: s.get("finished", 0))
+
+
+def format_summary(stages: List[Dict[str, Any]]) -> str:
+    """Per-stage wall/CPU table followed by each stage's hottest functions or allocators."""
+    lines = [
+        f"{'stage':<16} {'wall s':>9} {'cpu s':>9} {'child cpu s':>12} {'cpu/wall':>9}",
+    ]
+    for s in stages:
+        ratio = (s["cpu"] + s["child_cpu"]) / s["wall"] if s["wall"] else 0
+        lines.append(
+            f"{s['stage']:<16} {s['wall']:9.3f} {s['cpu']:9.3f} {s['child_cpu']:12.3f} {ratio:9.2f}"
+            + ("" if s.get("ok", True) else "  (failed)")
+        )
+    for s in stages:
+        if s.get("functions"):
+            timer = "CPU" if s["mode"] == "cpu" else "wall"
+            lines += ["", f"{s['stage']}: top functions by own {timer} time",
+                      f"  {'own s':>9} {'cum s':>9} {'calls':>8}  function"]
+            for row in s["functions"]:
+                lines.append(
+                    f"  {row['own']:9.4f} {row['cumulative']:9.4f} {row['calls']:8d}  {row['function']}"
+                )
+        if s.get("allocations"):
+            lines += ["", f"{s['stage']}: top allocators (peak {s.get('peak', 0) / 2 ** 20:.1f} MiB)",
+                      f"  {'KiB':>10} {'blocks':>8}  location"]
+            for row in s["allocations"]:
+                lines.append(f"  {row['size'] / 1024:10.1f} {row['count']:8d}  {row['location']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_summary(directory: str) -> str:
+    """Rewrite summary.txt/summary.json from every stage in ``directory``."""
+    stages = load_stages(directory)
+    text = format_summary(stages)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "summary.txt"), "w") as f:
+        f.write(text)
+    with open(os.path.join(directory, "summary.json"), "w") as f:
+        json.dump({"stages": stages}, f, indent=2)
+    return text
+
+
+_profiler: Optional[Profiler] = None
+
+
+def configure(profiler: Optional[Profiler]):
+    """Install (or with None, remove) the process-wide profiler."""
+    global _profiler
+    _profiler = profiler
+
+
+def get_profiler() -> Optional[Profiler]:
+    return _profiler
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Profile the block with the installed profiler, if any."""
+    if _profiler is None:
+        yield
+        return
+    with _profiler.stage(name):
+        yield
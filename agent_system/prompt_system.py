@@ -5,6 +5,10 @@ import yaml
 class PromptSystem:
     """
     Loads and provides prompt templates from a YAML file.
+
+    Templates can call ``recall(query, agent=..., project=..., k=...,
+    token_budget=...)`` to include relevant prior outputs from Memory (see
+    agent_system.recall); it renders nothing unless a retriever is configured.
     """
     def __init__(self, template_path: str = None):
         self.template_path = template_path or os.getenv(
@@ -23,4 +27,7 @@ class PromptSystem:
             return ""
         from jinja2 import Template
 
+        from agent_system import recall
+
+        kwargs.setdefault("recall", recall.render)
         return Template(tmpl).render(**kwargs)
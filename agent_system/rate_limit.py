@@ -0,0 +1,65 @@
+"""
+Client-side request pacing for LLM providers.
+
+Limits are requests per minute per provider, e.g.
+``OBELISK_RATE_LIMITS="anthropic=50,openai=500"``. Calls are spaced evenly:
+each ``acquire`` reserves the next free slot and sleeps until it. Agents
+acquire right before every provider request, so an agent making several
+requests (one per file, say) is paced per request and cache hits use no
+budget. By default the schedule lives in this process; batch runs call
+``configure`` in every pool worker with a lock and dict from a
+``multiprocessing.Manager`` so all projects share one budget per provider.
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+_limits: Optional[Dict[str, float]] = None
+_lock = threading.Lock()
+_next_slot: Dict[str, float] = {}
+
+
+def parse_limits(text: str) -> Dict[str, float]:
+    """Parse ``provider=rpm,provider=rpm`` into a dict."""
+    limits = {}
+    for item in (text or "").split(","):
+        if "=" in item:
+            provider, rpm = item.split("=", 1)
+            limits[provider.strip()] = float(rpm)
+    return limits
+
+
+def configure(limits: Dict[str, float] = None, lock=None, state=None):
+    """
+    Set per-provider limits and, optionally, a shared lock and dict holding
+    the next free slot per provider.
+    """
+    global _limits, _lock, _next_slot
+    _limits = dict(limits) if limits is not None else None
+    if lock is not None:
+        _lock = lock
+    if state is not None:
+        _next_slot = state
+
+
+def limits() -> Dict[str, float]:
+    global _limits
+    if _limits is None:
+        _limits = parse_limits(os.getenv("OBELISK_RATE_LIMITS", ""))
+    return _limits
+
+
+def acquire(provider: str) -> float:
+    """Block until a request to provider is allowed; returns seconds waited."""
+    rpm = limits().get(provider)
+    if not rpm:
+        return 0.0
+    with _lock:
+        now = time.time()
+        slot = max(now, _next_slot.get(provider, 0.0))
+        _next_slot[provider] = slot + 60.0 / rpm
+    wait = slot - now
+    if wait > 0:
+        time.sleep(wait)
+    return wait
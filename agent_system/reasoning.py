@@ -0,0 +1,340 @@
+"""
+Structured store for agent reasoning steps.
+
+Every step belongs to a run (a CLI checkpoint run or a service pipeline id,
+taken from the ``run`` context unless given), a chain within that run
+(``<run_id>:<agent>`` by default) and optionally a parent step, and carries
+a per-chain sequence number. Steps live in their own SQLite database in WAL
+mode (``REASONING_DB_PATH``, default ``.obelisk/reasoning.sqlite``) rather
+than in Memory: ``log`` only appends to an in-process buffer, which is
+written with one ``executemany`` per batch once ``REASONING_BATCH_SIZE``
+steps are pending, every ``REASONING_FLUSH_INTERVAL`` seconds from a
+background thread, before reads and at exit.
+
+A whole chain or run is read back with one query on the
+``(chain_id, seq)`` / ``(run_id, chain_id, seq)`` indexes, and ``export``
+turns it into a node/edge graph (JSON, or Graphviz DOT) for visualising
+the thought chain.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from agent_system import tracing
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    "step_id", "run_id", "chain_id", "parent_id", "seq",
+    "agent", "step", "content", "timestamp", "metadata",
+)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reasoning_steps (
+    step_id TEXT PRIMARY KEY,
+    run_id TEXT,
+    chain_id TEXT NOT NULL,
+    parent_id TEXT,
+    seq INTEGER NOT NULL,
+    agent TEXT NOT NULL,
+    step TEXT NOT NULL,
+    content TEXT,
+    timestamp REAL NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_reasoning_chain_seq ON reasoning_steps (chain_id, seq);
+CREATE INDEX IF NOT EXISTS ix_reasoning_run ON reasoning_steps (run_id, chain_id, seq);
+CREATE INDEX IF NOT EXISTS ix_reasoning_agent_timestamp ON reasoning_steps (agent, timestamp);
+"""
+
+_run_id: contextvars.ContextVar = contextvars.ContextVar("reasoning_run_id", default=None)
+
+
+def current_run() -> Optional[str]:
+    return _run_id.get()
+
+
+@contextmanager
+def run(run_id: Optional[str]):
+    """Attribute steps logged inside the block to ``run_id``."""
+    token = _run_id.set(run_id)
+    try:
+        yield run_id
+    finally:
+        _run_id.reset(token)
+
+
+def set_run(run_id: Optional[str]):
+    """Attribute steps logged from now on (in this context) to ``run_id``."""
+    _run_id.set(run_id)
+
+
+class ReasoningStore:
+    """Buffered, batch-flushed reasoning step store backed by one SQLite file."""
+    def __init__(
+        self,
+        path: str = None,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_chains: int = 10000,
+    ):
+        self.path = path or os.getenv(
+            "REASONING_DB_PATH", os.path.join(".obelisk", "reasoning.sqlite")
+        )
+        self.batch_size = batch_size or int(os.getenv("REASONING_BATCH_SIZE", "256"))
+        self.flush_interval = (
+            flush_interval if flush_interval is not None
+            else float(os.getenv("REASONING_FLUSH_INTERVAL", "1.0"))
+        )
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self._buffer: List[tuple] = []
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # chain_id -> (last seq, last step id), most recently used last
+        self._chains: "OrderedDict[str, tuple]" = OrderedDict()
+        self.max_chains = max_chains
+        self._closed = False
+        self._wake = threading.Event()
+        if self.flush_interval > 0:
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+        atexit.register(self.close)
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing reasoning steps failed")
+
+    def _chain_tail(self, chain_id: str) -> tuple:
+        """(last seq, last step id) of a chain not seen by this process yet."""
+        self.flush()
+        with self._db_lock:
+            row = self.conn.execute(
+                "SELECT seq, step_id FROM reasoning_steps WHERE chain_id = ? "
+                "ORDER BY seq DESC LIMIT 1",
+                (chain_id,),
+            ).fetchone()
+        return row or (0, None)
+
+    def log(
+        self,
+        agent: str,
+        step: str,
+        content: str,
+        chain_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        run_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Buffer one step and return its id. ``parent_id`` defaults to the
+        previous step of the same chain.
+        """
+        run_id = run_id or current_run()
+        chain_id = chain_id or (f"{run_id}:{agent}" if run_id else agent)
+        step_id = uuid.uuid4().hex
+        with self._lock:
+            tail = self._chains.pop(chain_id, None)
+        if tail is None:
+            tail = self._chain_tail(chain_id)
+        with self._lock:
+            # Another thread may have extended the chain meanwhile
+            seq, last = self._chains.pop(chain_id, tail)
+            self._chains[chain_id] = (seq + 1, step_id)
+            if len(self._chains) > self.max_chains:
+                self._chains.popitem(last=False)
+            self._buffer.append((
+                step_id, run_id, chain_id, parent_id or last, seq + 1, agent, step,
+                content, time.time(),
+                json.dumps(metadata) if metadata else None,
+            ))
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+        return step_id
+
+    def flush(self) -> int:
+        """Write buffered steps in one transaction; returns how many."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        try:
+            with tracing.span("db.reasoning.flush", "db", rows=len(batch)), self._db_lock, self.conn:
+                self.conn.executemany(
+                    f"INSERT INTO reasoning_steps ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+                    batch,
+                )
+        except sqlite3.Error:
+            # Keep the steps for the next flush rather than dropping them
+            with self._lock:
+                self._buffer[:0] = batch
+            raise
+        return len(batch)
+
+    def _select(self, where: str, params: tuple, order: str, limit: int = None):
+        self.flush()
+        sql = f"SELECT {', '.join(COLUMNS)} FROM reasoning_steps WHERE {where} ORDER BY {order}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._db_lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [self._row(r) for r in rows]
+
+    @staticmethod
+    def _row(row) -> Dict[str, Any]:
+        step = dict(zip(COLUMNS, row))
+        step["metadata"] = json.loads(step["metadata"]) if step["metadata"] else {}
+        return step
+
+    def get_chain(self, chain_id: str) -> List[Dict[str, Any]]:
+        """Every step of a chain in sequence order."""
+        return self._select("chain_id = ?", (chain_id,), "seq")
+
+    def get_run(self, run_id: str) -> List[Dict[str, Any]]:
+        """Every step of a run, chain by chain, each in sequence order."""
+        return self._select("run_id = ?", (run_id,), "chain_id, seq")
+
+    def steps(self, agent: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent steps, optionally for one agent."""
+        if agent:
+            return self._select("agent = ?", (agent,), "timestamp DESC", limit)
+        return self._select("1", (), "timestamp DESC", limit)
+
+    def chains(self, run_id: str) -> List[Dict[str, Any]]:
+        """Chains of a run with their agent, length and time span."""
+        self.flush()
+        with self._db_lock:
+            rows = self.conn.execute(
+                "SELECT chain_id, MIN(agent), COUNT(*), MIN(timestamp), MAX(timestamp) "
+                "FROM reasoning_steps WHERE run_id = ? GROUP BY chain_id ORDER BY MIN(timestamp)",
+                (run_id,),
+            ).fetchall()
+        return [
+            {"chain_id": c, "agent": a, "steps": n, "started": s, "ended": e}
+            for c, a, n, s, e in rows
+        ]
+
+    def export(
+        self,
+        run_id: Optional[str] = None,
+        chain_id: Optional[str] = None,
+        label_chars: int = 80,
+    ) -> Dict[str, Any]:
+        """
+        A run or chain as a graph: one node per step and a ``parent`` edge
+        from each step to its parent, ready for a thought-chain viewer.
+        """
+        if bool(run_id) == bool(chain_id):
+            raise ValueError("Pass exactly one of run_id or chain_id")
+        steps = self.get_run(run_id) if run_id else self.get_chain(chain_id)
+        nodes, edges = [], []
+        for s in steps:
+            content = s["content"] or ""
+            label = " ".join(content.split())
+            if len(label) > label_chars:
+                label = label[: label_chars - 3] + "..."
+            nodes.append({
+                "id": s["step_id"], "chain_id": s["chain_id"], "seq": s["seq"],
+                "agent": s["agent"], "step": s["step"], "label": label,
+                "content": content, "timestamp": s["timestamp"], "metadata": s["metadata"],
+            })
+            if s["parent_id"]:
+                edges.append({"source": s["parent_id"], "target": s["step_id"], "type": "parent"})
+        return {"run_id": run_id, "chain_id": chain_id, "nodes": nodes, "edges": edges}
+
+    def prune(self, max_age_days: float, now: float = None, dry_run: bool = False) -> int:
+        """
+        Delete runs whose newest step is older than ``max_age_days``, whole
+        runs at a time so no chain is left half-deleted; steps without a run
+        go by their own age. Returns how many steps were (or would be)
+        deleted.
+        """
+        self.flush()
+        cutoff = (now or time.time()) - max_age_days * 86400
+        where = (
+            "run_id IN (SELECT run_id FROM reasoning_steps WHERE run_id IS NOT NULL "
+            "GROUP BY run_id HAVING MAX(timestamp) < ?) OR (run_id IS NULL AND timestamp < ?)"
+        )
+        with self._db_lock:
+            if dry_run:
+                return self.conn.execute(
+                    f"SELECT COUNT(*) FROM reasoning_steps WHERE {where}", (cutoff, cutoff)
+                ).fetchone()[0]
+            with self.conn:
+                deleted = self.conn.execute(
+                    f"DELETE FROM reasoning_steps WHERE {where}", (cutoff, cutoff)
+                ).rowcount
+        if deleted:
+            # Cached chain tails may point at deleted steps
+            with self._lock:
+                self._chains.clear()
+        return deleted
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+
+def to_dot(graph: Dict[str, Any]) -> str:
+    """Render ``ReasoningStore.export`` output as Graphviz DOT, one cluster per chain."""
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+    def quote(value) -> str:
+        return f'"{escape(value)}"'
+
+    lines = ["digraph reasoning {", "  rankdir=TB;", "  node [shape=box];"]
+    by_chain: Dict[str, List[Dict[str, Any]]] = {}
+    for node in graph["nodes"]:
+        by_chain.setdefault(node["chain_id"], []).append(node)
+    for i, (chain_id, nodes) in enumerate(by_chain.items()):
+        lines.append(f"  subgraph cluster_{i} {{")
+        lines.append(f"    label={quote(chain_id)};")
+        for node in nodes:
+            title = escape(f"{node['seq']}. {node['agent']} / {node['step']}")
+            label = f'"{title}\\n{escape(node["label"])}"'
+            lines.append(f"    {quote(node['id'])} [label={label}];")
+        lines.append("  }")
+    for edge in graph["edges"]:
+        lines.append(f"  {quote(edge['source'])} -> {quote(edge['target'])};")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+_store: Optional[ReasoningStore] = None
+_store_pid: Optional[int] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ReasoningStore:
+    """Per-process store (recreated after fork, so workers never share a connection)."""
+    global _store, _store_pid
+    with _store_lock:
+        if _store is None or _store_pid != os.getpid():
+            _store, _store_pid = ReasoningStore(), os.getpid()
+        return _store
@@ -0,0 +1,236 @@
+"""
+Retrieval of prior agent outputs from Memory for prompt grounding.
+
+``Retriever.recall`` gathers candidate rows from VectorMemory (rows indexed
+by agent_system.memory_indexer) and the most recent matching Memory rows
+(which may not be indexed yet), splits their content into paragraph
+chunks, scores every chunk against the query with the same embedder and
+keeps the best chunk per row. Chunks are deduplicated (exact and near
+duplicates) and packed by score into a token budget, so a prompt gets a
+few relevant excerpts instead of whole histories. Results are kept in a
+small LRU cache with a TTL, so repeated queries within a run are free.
+
+Templates opt in through the ``recall`` variable PromptSystem provides,
+which renders the configured retriever's snippets as text (or nothing when
+no retriever is configured):
+
+    {{ recall(requirements, agent="architect", project=project, k=4, token_budget=600) }}
+"""
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+_retriever = None
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def _chunks(text: str, max_chars: int) -> List[str]:
+    """Split text into paragraph-aligned chunks of at most ``max_chars``."""
+    chunks, current = [], ""
+    for para in re.split(r"\n\s*\n", text.strip()):
+        para = para.strip()
+        while len(para) > max_chars:
+            cut = para.rfind(" ", 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(para[:cut].strip())
+            para = para[cut:].strip()
+        if current and len(current) + len(para) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{para}" if current else para
+    if current:
+        chunks.append(current)
+    return [c for c in chunks if c]
+
+
+class Retriever:
+    """
+    Ranked, deduplicated, token-budgeted recall over Memory. ``vectors`` is
+    optional: without it (or without faiss) only the ``recent`` newest
+    matching rows are considered.
+    """
+    def __init__(
+        self,
+        memory,
+        vectors=None,
+        embedder=None,
+        recent: int = 50,
+        oversample: int = 4,
+        chunk_tokens: int = 200,
+        min_score: float = 0.1,
+        near_duplicate: float = 0.9,
+        cache_size: int = None,
+        cache_ttl: float = None,
+    ):
+        from agent_system.embedding import get_embedder
+
+        self.memory = memory
+        self.embedder = embedder or get_embedder()
+        if vectors is None:
+            vectors = self._open_vectors()
+        self.vectors = vectors
+        self.recent = recent
+        self.oversample = oversample
+        self.chunk_chars = chunk_tokens * 4
+        self.min_score = min_score
+        self.near_duplicate = near_duplicate
+        self.cache_size = cache_size or int(os.getenv("RECALL_CACHE_SIZE", "128"))
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(
+            os.getenv("RECALL_CACHE_TTL", "600")
+        )
+        self._cache = OrderedDict()
+        self.hits = self.misses = 0
+
+    def _open_vectors(self):
+        """Open the index written by the Memory indexer, if there is one."""
+        path = os.getenv("VECTOR_INDEX_PATH", "faiss.index")
+        if not os.path.isfile(path + ".sqlite"):
+            return None
+        try:
+            from agent_system.vector_memory import VectorMemory
+
+            return VectorMemory(self.embedder.dimension, index_path=path)
+        except (ImportError, RuntimeError):
+            return None
+
+    def _candidates(self, query_vector, agent, project, k: int):
+        """Memory rows from the vector index plus the newest matching rows."""
+        ids = []
+        if self.vectors is not None and len(self.vectors):
+            for hit in self.vectors.query(query_vector, top_k=k * self.oversample)[0]:
+                meta = hit["metadata"] or {}
+                if agent and meta.get("agent") != agent:
+                    continue
+                if project and meta.get("project") != project:
+                    continue
+                ids.append(hit["id"])
+        rows = {e.id: e for e in self.memory.get(ids)}
+        for entry in self.memory.query(agent=agent, project=project, limit=self.recent):
+            rows.setdefault(entry.id, entry)
+        return list(rows.values())
+
+    def recall(
+        self,
+        query: str,
+        agent: Optional[str] = None,
+        project: Optional[str] = None,
+        k: int = 5,
+        token_budget: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return up to ``k`` snippets relevant to ``query`` from rows of
+        ``agent``/``project`` (None matches any), best first, whose combined
+        estimated tokens fit ``token_budget``. Each snippet is a dict with
+        id, agent, action, project, timestamp, score, tokens and text.
+        """
+        key = (query, agent, project, k, token_budget)
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.time():
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        result = self._recall(query, agent, project, k, token_budget)
+        self._cache[key] = (time.time() + self.cache_ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def _recall(self, query, agent, project, k, token_budget):
+        if not query or not query.strip() or k <= 0 or token_budget <= 0:
+            return []
+        query_vector = self.embedder.embed([query])
+        rows = self._candidates(query_vector, agent, project, k)
+        chunks = []
+        for entry in rows:
+            content = self.memory.load_content(entry.content) or ""
+            chunks.extend((entry, c) for c in _chunks(content, self.chunk_chars))
+        if not chunks:
+            return []
+        vectors = self.embedder.embed([c for _, c in chunks])
+        scores = (vectors @ query_vector[0]).tolist()
+        best = {}
+        for (entry, text), score, vector in zip(chunks, scores, vectors):
+            if score >= self.min_score and (
+                entry.id not in best or score > best[entry.id][0]
+            ):
+                best[entry.id] = (score, entry, text, vector)
+
+        snippets, kept, used = [], [], 0
+        for score, entry, text, vector in sorted(
+            best.values(), key=lambda item: (-item[0], -item[1].id)
+        ):
+            # Drop exact, contained (e.g. an earlier revision) and near duplicates
+            norm = WHITESPACE.sub(" ", text).strip().lower()
+            if any(
+                norm in other or other in norm or float(vector @ v) >= self.near_duplicate
+                for other, v in kept
+            ):
+                continue
+            tokens = estimate_tokens(text)
+            if used + tokens > token_budget:
+                remaining = (token_budget - used) * 4 - 4
+                if snippets or remaining < 80:
+                    continue
+                # Nothing fits yet: trim the best match instead of returning nothing
+                text = text[:remaining].rsplit(" ", 1)[0] + " ..."
+                tokens = estimate_tokens(text)
+            kept.append((norm, vector))
+            used += tokens
+            snippets.append({
+                "id": entry.id,
+                "agent": entry.agent,
+                "action": entry.action,
+                "project": entry.project,
+                "timestamp": entry.timestamp.isoformat() if entry.timestamp else None,
+                "score": round(score, 4),
+                "tokens": tokens,
+                "text": text,
+            })
+            if len(snippets) >= k:
+                break
+        return snippets
+
+    def render(self, query: str, agent: str = None, project: str = None,
+               k: int = 5, token_budget: int = 1000) -> str:
+        """Snippets from ``recall`` formatted for inclusion in a prompt."""
+        return "\n\n".join(
+            f"[{s['agent']}/{s['action']}"
+            + (f", project {s['project']}" if s["project"] else "")
+            + (f", {s['timestamp'][:10]}" if s["timestamp"] else "")
+            + f"]\n{s['text']}"
+            for s in self.recall(query, agent, project, k, token_budget)
+        )
+
+    def cache_info(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+
+def configure(retriever: Optional[Retriever]):
+    """Set (or clear, with None) the retriever templates recall from."""
+    global _retriever
+    _retriever = retriever
+
+
+def get_retriever() -> Optional[Retriever]:
+    return _retriever
+
+
+def render(query: str, agent: str = None, project: str = None,
+           k: int = 5, token_budget: int = 1000) -> str:
+    """Template-facing recall: empty unless a retriever is configured."""
+    if _retriever is None:
+        return ""
+    return _retriever.render(query, agent, project, k, token_budget)
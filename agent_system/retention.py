@@ -0,0 +1,286 @@
+"""
+Memory retention: keeps the ``memories`` table to a hot window.
+
+Policies (config/retention.yaml, override with ``MEMORY_RETENTION_CONFIG``)
+match rows by agent/action fnmatch patterns, first match wins, and say how
+many days a row stays hot and what happens afterwards: move it into the
+compressed ``memories_archive`` table, append it to a compressed JSONL file,
+delete it, or keep it. ``RetentionEngine.run`` works through expired rows in
+id batches (recording the ids it removes, so MemoryIndexer drops their
+vectors too), compresses large hot rows written before compression was
+enabled, then runs VACUUM/ANALYZE and reports rows moved, bytes reclaimed
+and hot-set query latency before and after. Reasoning steps are kept in
+their own store (agent_system/reasoning.py); given one, ``run`` also prunes
+runs older than ``reasoning_days``.
+"""
+import fnmatch
+import gzip
+import json
+import os
+import statistics
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from agent_system import memory_search
+from agent_system.memory import CODEC_PREFIXES, zstandard
+
+ARCHIVE_MODES = ("table", "file", "delete", "keep")
+
+
+@dataclass
+class Policy:
+    agent: str = "*"
+    action: str = "*"
+    hot_days: float = 30
+    archive: str = "table"
+
+    def __post_init__(self):
+        if self.archive not in ARCHIVE_MODES:
+            raise ValueError(f"Unknown archive mode {self.archive!r}; use one of {ARCHIVE_MODES}")
+
+    def matches(self, agent: Optional[str], action: Optional[str]) -> bool:
+        return fnmatch.fnmatchcase(agent or "", self.agent) and fnmatch.fnmatchcase(
+            action or "", self.action
+        )
+
+    @property
+    def name(self) -> str:
+        return f"{self.agent}/{self.action}"
+
+
+def load_config(path: str = None) -> Dict[str, Any]:
+    """Read the retention config; returns policies plus settings."""
+    path = path or os.getenv("MEMORY_RETENTION_CONFIG", "config/retention.yaml")
+    with open(path, "r") as f:
+        raw = yaml.safe_load(f) or {}
+    defaults = raw.get("defaults") or {}
+    policies = [Policy(**{**defaults, **p}) for p in raw.get("policies") or []]
+    # Rows no policy matches fall back to the defaults
+    policies.append(Policy(**defaults))
+    return {
+        "policies": policies,
+        "archive_dir": raw.get("archive_dir", os.path.join(".obelisk", "archive")),
+        "vacuum": raw.get("vacuum", True),
+        "reasoning_days": raw.get("reasoning_days"),
+    }
+
+
+class RetentionEngine:
+    def __init__(
+        self,
+        memory,
+        policies: List[Policy] = None,
+        archive_dir: str = None,
+        vacuum: bool = None,
+        batch_size: int = 1000,
+        config_path: str = None,
+        reasoning_days: float = None,
+    ):
+        config = load_config(config_path) if policies is None else {}
+        self.memory = memory
+        self.policies = policies if policies is not None else config["policies"]
+        self.archive_dir = archive_dir or config.get("archive_dir") or os.path.join(
+            ".obelisk", "archive"
+        )
+        self.vacuum_enabled = vacuum if vacuum is not None else config.get("vacuum", True)
+        self.reasoning_days = (
+            reasoning_days if reasoning_days is not None else config.get("reasoning_days")
+        )
+        self.batch_size = batch_size
+        self.dialect = memory.engine.dialect.name
+
+    def policy_for(self, agent: Optional[str], action: Optional[str]) -> Policy:
+        for policy in self.policies:
+            if policy.matches(agent, action):
+                return policy
+        return Policy(archive="keep")
+
+    def db_bytes(self) -> int:
+        """Size of the Memory tables: the SQLite file, or the tables on PostgreSQL."""
+        from sqlalchemy import text
+
+        with self.memory.engine.connect() as conn:
+            if self.dialect == "sqlite":
+                pages = conn.execute(text("PRAGMA page_count")).scalar()
+                return pages * conn.execute(text("PRAGMA page_size")).scalar()
+            if self.dialect == "postgresql":
+                return conn.execute(text(
+                    "SELECT pg_total_relation_size('memories') "
+                    "+ pg_total_relation_size('memories_archive')"
+                )).scalar()
+        return 0
+
+    def hot_query_ms(self, repeat: int = 5) -> float:
+        """Median latency of the dashboard's recent-rows query."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            self.memory.query(limit=100)
+            timings.append((time.perf_counter() - start) * 1000)
+        return round(statistics.median(timings), 3)
+
+    def _archive_file(self, now: datetime):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        stamp = now.strftime("%Y%m%d-%H%M%S")
+        if zstandard is not None and os.getenv("MEMORY_COMPRESSION") == "zstd":
+            path = os.path.join(self.archive_dir, f"memories-{stamp}.jsonl.zst")
+            raw = open(path, "ab")
+            return path, zstandard.ZstdCompressor(level=10).stream_writer(raw)
+        path = os.path.join(self.archive_dir, f"memories-{stamp}.jsonl.gz")
+        return path, gzip.open(path, "ab")
+
+    def archive(self, now: datetime = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Move rows past their policy's hot window out of ``memories``."""
+        from sqlalchemy import delete, insert
+
+        now = now or datetime.utcnow()
+        active = [p for p in self.policies if p.archive != "keep"]
+        counts = {p.name: 0 for p in active}
+        if not active:
+            return {"rows": counts, "files": []}
+        entry, archived = self.memory._MemoryEntry, self.memory._ArchivedEntry
+        removed = self.memory._RemovedEntry
+        earliest = now - timedelta(days=min(p.hot_days for p in active))
+        files, writer, last_id = [], None, 0
+        try:
+            while True:
+                session = self.memory.Session()
+                batch = (
+                    session.query(entry)
+                    .filter(entry.id > last_id, entry.timestamp < earliest)
+                    .order_by(entry.id)
+                    .limit(self.batch_size)
+                    .all()
+                )
+                if not batch:
+                    session.close()
+                    break
+                last_id = batch[-1].id
+                to_table, to_file, expired = [], [], []
+                for row in batch:
+                    policy = self.policy_for(row.agent, row.action)
+                    if policy.archive == "keep":
+                        continue
+                    if row.timestamp >= now - timedelta(days=policy.hot_days):
+                        continue
+                    counts[policy.name] += 1
+                    expired.append(row.id)
+                    record = {
+                        "id": row.id, "timestamp": row.timestamp, "project": row.project,
+                        "agent": row.agent, "action": row.action, "content": row.content,
+                    }
+                    if policy.archive == "table":
+                        to_table.append({**record, "archived_at": now})
+                    elif policy.archive == "file":
+                        to_file.append(record)
+                if dry_run or not expired:
+                    session.close()
+                    continue
+                if to_file:
+                    if writer is None:
+                        path, writer = self._archive_file(now)
+                        files.append(path)
+                    for record in to_file:
+                        writer.write((json.dumps(record, default=str) + "\n").encode("utf-8"))
+                    writer.flush()
+                if to_table:
+                    session.execute(insert(archived), to_table)
+                if self.memory.searchable:
+                    memory_search.unindex(session, expired)
+                session.execute(delete(entry).where(entry.id.in_(expired)))
+                # The indexer drops their vectors on its next run
+                session.execute(insert(removed), [{"id": i} for i in expired])
+                session.commit()
+                session.close()
+        finally:
+            if writer is not None:
+                writer.close()
+        return {"rows": counts, "files": files}
+
+    def compress_existing(self, dry_run: bool = False) -> int:
+        """Rewrite large hot rows stored before compression was enabled."""
+        from sqlalchemy import bindparam, func, not_, or_, update
+
+        entry = self.memory._MemoryEntry
+        min_bytes = entry.__table__.c.content.type.min_bytes
+        if min_bytes < 0 or self.dialect == "postgresql":
+            return 0
+        uncompressed = not_(or_(*[
+            func.substr(entry.content, 1, 6) == prefix for prefix in CODEC_PREFIXES.values()
+        ]))
+        rewritten, last_id = 0, 0
+        while True:
+            session = self.memory.Session()
+            batch = (
+                session.query(entry)
+                .filter(entry.id > last_id, func.length(entry.content) >= min_bytes, uncompressed)
+                .order_by(entry.id)
+                .limit(self.batch_size)
+                .all()
+            )
+            if not batch:
+                session.close()
+                return rewritten
+            last_id = batch[-1].id
+            if not dry_run:
+                table = entry.__table__
+                session.execute(
+                    update(table).where(table.c.id == bindparam("row_id")),
+                    [{"row_id": row.id, "content": row.content} for row in batch],
+                )
+                session.commit()
+            rewritten += len(batch)
+            session.close()
+
+    def vacuum(self):
+        """Reclaim free pages and refresh planner statistics."""
+        from sqlalchemy import text
+
+        with self.memory.engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            if self.dialect == "postgresql":
+                conn.execute(text("VACUUM ANALYZE memories"))
+                conn.execute(text("VACUUM ANALYZE memories_archive"))
+            elif self.dialect == "sqlite":
+                conn.execute(text("VACUUM"))
+                conn.execute(text("ANALYZE"))
+            else:
+                conn.execute(text("ANALYZE TABLE memories, memories_archive"))
+
+    def run(
+        self, now: datetime = None, dry_run: bool = False, vacuum: bool = None, reasoning=None
+    ) -> Dict[str, Any]:
+        """
+        Apply every policy, compress, vacuum and report what was reclaimed.
+        With a ReasoningStore, also prune its runs older than ``reasoning_days``.
+        """
+        start = time.time()
+        before, latency_before = self.db_bytes(), self.hot_query_ms()
+        archived = self.archive(now, dry_run=dry_run)
+        compressed = self.compress_existing(dry_run=dry_run)
+        pruned = 0
+        if reasoning is not None and self.reasoning_days is not None:
+            pruned = reasoning.prune(
+                self.reasoning_days, now=now.timestamp() if now else None, dry_run=dry_run
+            )
+        vacuum = self.vacuum_enabled if vacuum is None else vacuum
+        if vacuum and not dry_run:
+            self.vacuum()
+        after = self.db_bytes()
+        return {
+            "dry_run": dry_run,
+            "archived": archived["rows"],
+            "archive_files": archived["files"],
+            "compressed": compressed,
+            "reasoning_steps_pruned": pruned,
+            "vacuumed": bool(vacuum and not dry_run),
+            "bytes_before": before,
+            "bytes_after": after,
+            "bytes_reclaimed": before - after,
+            "hot_query_ms": {"before": latency_before, "after": self.hot_query_ms()},
+            "seconds": round(time.time() - start, 3),
+        }
@@ -1,11 +1,304 @@
+import asyncio
+import atexit
+import collections
+import logging
 import os
+import queue
 import shutil
+import signal
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from agent_system import tracing
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
 
 
 class SandboxError(Exception):
     """Raised when sandbox command fails or times out."""
-    pass
+    def __init__(self, message: str, result: "SandboxResult" = None):
+        super().__init__(message)
+        self.result = result
+
+
+@dataclass
+class ResourceLimits:
+    """
+    rlimits applied to locally executed commands (ignored inside Docker).
+
+    ``memory_mb`` caps the address space (RLIMIT_AS), the closest enforceable
+    proxy for RSS on Linux. ``processes`` maps to RLIMIT_NPROC, which the
+    kernel counts per user rather than per process tree.
+    """
+    cpu_seconds: Optional[int] = None
+    memory_mb: Optional[int] = None
+    open_files: Optional[int] = None
+    processes: Optional[int] = None
+
+    def apply(self) -> None:
+        """Set the limits on the current process (used as a preexec_fn)."""
+        if resource is None:
+            return
+        for rlimit, value in (
+            (resource.RLIMIT_CPU, self.cpu_seconds),
+            (resource.RLIMIT_AS, self.memory_mb and self.memory_mb * 1024 * 1024),
+            (resource.RLIMIT_NOFILE, self.open_files),
+            (resource.RLIMIT_NPROC, self.processes),
+        ):
+            if value:
+                resource.setrlimit(rlimit, (value, value))
+
+
+@dataclass
+class SandboxResult:
+    """
+    Outcome of ExecutionSandbox.run_streaming. Only the first ``head`` and
+    last ``tail`` lines of output are retained; ``dropped_lines`` counts the
+    rest. ``cpu_time`` and ``peak_rss`` (bytes) are None for Docker runs,
+    where they would only describe the docker client.
+    """
+    command: str
+    exit_code: int
+    wall_time: float
+    cpu_time: Optional[float] = None
+    peak_rss: Optional[int] = None
+    head: List[str] = field(default_factory=list)
+    tail: List[str] = field(default_factory=list)
+    dropped_lines: int = 0
+    timed_out: bool = False
+
+    @property
+    def output(self) -> str:
+        """Retained output, with a marker where lines were dropped."""
+        lines = list(self.head)
+        if self.dropped_lines:
+            lines.append(f"... [{self.dropped_lines} lines omitted] ...")
+        lines.extend(self.tail)
+        return "\n".join(lines)
+
+
+class _HeadTailBuffer:
+    """Keeps the first and last N lines of a stream in bounded memory."""
+    def __init__(self, head: int, tail: int):
+        self.head_size = head
+        self.head: List[str] = []
+        self.tail: Deque[str] = collections.deque(maxlen=tail)
+        self.seen = 0
+
+    def append(self, line: str) -> None:
+        self.seen += 1
+        if len(self.head) < self.head_size:
+            self.head.append(line)
+        else:
+            self.tail.append(line)
+
+    @property
+    def dropped(self) -> int:
+        return self.seen - len(self.head) - len(self.tail)
+
+
+class ContainerPool:
+    """
+    Keeps up to ``size`` pre-started Docker containers for one image with the
+    workspace bind-mounted at /workspace, and runs commands in them via
+    ``docker exec``. A container is recycled (removed and replaced) after
+    ``max_uses`` commands, or as soon as a command times out or crashes (see
+    ``reusable``); ordinary non-zero exits such as failing tests keep it.
+    """
+    def __init__(
+        self,
+        image: str,
+        workspace: str,
+        size: int = 2,
+        max_uses: int = 50,
+        docker_bin: str = "docker",
+        acquire_timeout: int = 120,
+    ):
+        self.image = image
+        self.workspace = os.path.abspath(workspace)
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.docker_bin = docker_bin
+        self.acquire_timeout = acquire_timeout
+        self._idle: "queue.Queue[Tuple[str, int]]" = queue.Queue()
+        self._live: Dict[str, int] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> None:
+        """Pre-start containers in parallel until the pool is full."""
+        with self._lock:
+            missing = max(0, self.size - len(self._live) - self._pending)
+            self._pending += missing
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=missing) as ex:
+            futures = [ex.submit(self._spawn) for _ in range(missing)]
+        errors = [f.exception() for f in futures if f.exception()]
+        if errors:
+            raise errors[0]
+
+    def _spawn(self) -> Optional[str]:
+        # Callers reserve a slot in ``_pending`` before spawning.
+        try:
+            container_id = self._start_container()
+        finally:
+            with self._lock:
+                self._pending -= 1
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._live[container_id] = 0
+        if closed:
+            self._remove(container_id)
+            return None
+        self._idle.put((container_id, 0))
+        return container_id
+
+    def _start_container(self) -> str:
+        cmd = [
+            self.docker_bin, "run", "-d", "--rm",
+            "-v", f"{self.workspace}:/workspace",
+            "-w", "/workspace",
+            "--network", "none",
+            "--memory", "512m",
+            self.image,
+            "tail", "-f", "/dev/null",
+        ]
+        proc = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        if proc.returncode != 0:
+            raise SandboxError(
+                f"Failed to start pooled container (exit {proc.returncode}): "
+                f"{proc.stderr.strip()}"
+            )
+        return proc.stdout.strip()
+
+    def _remove(self, container_id: str) -> None:
+        subprocess.run(
+            [self.docker_bin, "rm", "-f", container_id],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def _recycle(self, container_id: str) -> None:
+        with self._lock:
+            self._live.pop(container_id, None)
+            closed = self._closed
+            if not closed:
+                self._pending += 1
+        self._remove(container_id)
+        if not closed:
+            # Replace in the background so the caller is not charged start-up.
+            threading.Thread(target=self._spawn_quietly, daemon=True).start()
+
+    def _spawn_quietly(self) -> None:
+        try:
+            self._spawn()
+        except SandboxError:
+            pass
+
+    def _acquire(self) -> Tuple[str, int]:
+        with self._lock:
+            if self._closed:
+                raise SandboxError("Container pool is closed")
+            grow = (
+                self._idle.empty()
+                and len(self._live) + self._pending < self.size
+            )
+            if grow:
+                self._pending += 1
+        if grow:
+            self._spawn()
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty as e:
+            raise SandboxError(
+                f"No pooled container available after {self.acquire_timeout}s"
+            ) from e
+
+    @staticmethod
+    def reusable(exit_code: int) -> bool:
+        """
+        Whether a container can be reused after a command exited with
+        ``exit_code``. Killed commands (negative for the docker client, above
+        128 inside the container, e.g. 137 for the OOM killer) may leave
+        processes or memory pressure behind, and 125 means docker itself
+        failed; any other status is the command's own result.
+        """
+        return 0 <= exit_code <= 128 and exit_code != 125
+
+    def acquire(self) -> str:
+        """Check out a warm container id; pair with ``release``."""
+        return self._acquire()[0]
+
+    def release(self, container_id: str, healthy: bool = True) -> None:
+        """Return a container to the pool, recycling it if worn out or unhealthy."""
+        with self._lock:
+            uses = self._live.get(container_id, 0) + 1
+            keep = healthy and uses < self.max_uses and not self._closed
+            if keep:
+                self._live[container_id] = uses
+        if keep:
+            self._idle.put((container_id, uses))
+        else:
+            self._recycle(container_id)
+
+    def exec_argv(self, container_id: str, command: str) -> List[str]:
+        """Build the ``docker exec`` argv running ``command`` in a container."""
+        return [
+            self.docker_bin, "exec", "-w", "/workspace",
+            container_id, "sh", "-c", command,
+        ]
+
+    def exec(
+        self, command: str, timeout: int = 60
+    ) -> subprocess.CompletedProcess:
+        """
+        Run ``command`` with ``sh -c`` in a warm container and return the
+        completed process. Raises subprocess.TimeoutExpired on timeout.
+        """
+        container_id = self.acquire()
+        healthy = False
+        try:
+            proc = subprocess.run(
+                self.exec_argv(container_id, command),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=timeout,
+            )
+            healthy = self.reusable(proc.returncode)
+            return proc
+        finally:
+            self.release(container_id, healthy)
+
+    def close(self) -> None:
+        """Remove every container owned by the pool. Safe to call twice."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            containers = list(self._live)
+            self._live.clear()
+        while not self._idle.empty():
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for container_id in containers:
+            self._remove(container_id)
 
 
 class ExecutionSandbox:
@@ -13,11 +306,67 @@ class ExecutionSandbox:
     Executes commands in an isolated sandbox. Uses Docker if a docker_image
     is provided and Docker is available; otherwise, runs in a subprocess
     with resource/time limits.
+
+    With ``pool_size`` > 0, Docker commands run via ``docker exec`` in warm
+    containers from a ContainerPool instead of a fresh ``docker run --rm``.
     """
-    def __init__(self, docker_image: str = None, timeout: int = 60):
+    def __init__(
+        self,
+        docker_image: str = None,
+        timeout: int = 60,
+        pool_size: int = 0,
+        max_uses: int = 50,
+        docker_bin: str = None,
+    ):
         self.docker_image = docker_image
         self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_uses = max_uses
+        self.docker_bin = docker_bin or os.getenv("DOCKER_BIN", "docker")
+        self._pools: Dict[Tuple[str, str], ContainerPool] = {}
+        self._pools_lock = threading.Lock()
+        if pool_size:
+            atexit.register(self.close)
+
+    def _use_docker(self) -> bool:
+        return bool(self.docker_image and shutil.which(self.docker_bin))
+
+    def _pool_for(self, cwd: str) -> ContainerPool:
+        key = (self.docker_image, os.path.abspath(cwd))
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = ContainerPool(
+                    self.docker_image,
+                    cwd,
+                    size=self.pool_size,
+                    max_uses=self.max_uses,
+                    docker_bin=self.docker_bin,
+                )
+                self._pools[key] = pool
+        return pool
 
+    def warm(self, cwd: str = None) -> None:
+        """Pre-start the container pool for ``cwd`` (no-op without pooling)."""
+        if self.pool_size and self._use_docker():
+            self._pool_for(cwd or os.getcwd()).start()
+
+    def close(self) -> None:
+        """Shut down all container pools created by this sandbox."""
+        with self._pools_lock:
+            pools: List[ContainerPool] = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    @tracing.traced("sandbox.run", "subprocess")
     def run(self, command: str, cwd: str = None) -> str:
         """
         Run the given shell command in the sandbox. Returns stdout on success.
@@ -25,10 +374,12 @@ class ExecutionSandbox:
         """
         cwd = cwd or os.getcwd()
         try:
-            if self.docker_image and shutil.which("docker"):
+            if self._use_docker() and self.pool_size:
+                proc = self._pool_for(cwd).exec(command, timeout=self.timeout)
+            elif self._use_docker():
                 # Run inside Docker container mounted at /workspace
                 cmd = [
-                    "docker", "run", "--rm",
+                    self.docker_bin, "run", "--rm",
                     "-v", f"{os.path.abspath(cwd)}:/workspace",
                     "-w", "/workspace",
                     "--network", "none",
@@ -64,3 +415,216 @@ class ExecutionSandbox:
                 f"STDERR:\n{proc.stderr}\n"
             )
         return proc.stdout
+
+    @tracing.traced("sandbox.run_streaming", "subprocess")
+    def run_streaming(
+        self,
+        command: str,
+        cwd: str = None,
+        on_line: Callable[[str, str], None] = None,
+        limits: ResourceLimits = None,
+        head_lines: int = 200,
+        tail_lines: int = 200,
+        max_line_length: int = 8192,
+        check: bool = True,
+        log_lines: bool = True,
+        cancel: threading.Event = None,
+    ) -> SandboxResult:
+        """
+        Run the command, delivering output line by line instead of buffering
+        it. Each line is passed to ``on_line(stream, line)`` (stream is
+        "stdout" or "stderr") and, with ``log_lines``, to this module's logger,
+        which feeds the API's WebSocket log broadcaster. Only a bounded
+        head/tail of the output is kept. ``limits`` are enforced on the local
+        path; setting ``cancel`` kills the command early.
+
+        Returns a SandboxResult; with ``check`` a non-zero exit or timeout
+        raises SandboxError carrying the result.
+        """
+        cwd = cwd or os.getcwd()
+        pool = None
+        container_id = None
+        preexec = None
+        healthy = False
+        if self._use_docker() and self.pool_size:
+            pool = self._pool_for(cwd)
+            # Everything after acquire runs under try so the container is
+            # always returned, even if Popen or a callback raises
+            container_id = pool.acquire()
+        try:
+            if pool is not None:
+                argv, shell = pool.exec_argv(container_id, command), False
+            elif self._use_docker():
+                argv, shell = [
+                    self.docker_bin, "run", "--rm",
+                    "-v", f"{os.path.abspath(cwd)}:/workspace",
+                    "-w", "/workspace",
+                    "--network", "none",
+                    "--memory", "512m",
+                    self.docker_image,
+                    "sh", "-c", command,
+                ], False
+            else:
+                argv, shell = command, True
+                preexec = limits.apply if limits else None
+
+            buffer = _HeadTailBuffer(head_lines, tail_lines)
+            lines: "queue.Queue[Optional[Tuple[str, str]]]" = queue.Queue()
+            start = time.monotonic()
+            proc = subprocess.Popen(
+                argv,
+                shell=shell,
+                cwd=cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                errors="replace",
+                preexec_fn=preexec,
+                start_new_session=True,
+            )
+
+            def pump(name, stream):
+                for line in iter(lambda: stream.readline(max_line_length), ""):
+                    lines.put((name, line.rstrip("\n")))
+                stream.close()
+                lines.put(None)
+
+            readers = [
+                threading.Thread(target=pump, args=(name, stream), daemon=True)
+                for name, stream in (("stdout", proc.stdout), ("stderr", proc.stderr))
+            ]
+            for t in readers:
+                t.start()
+
+            timed_out = False
+            open_streams = len(readers)
+            deadline = start + self.timeout if self.timeout else None
+            while open_streams:
+                try:
+                    item = lines.get(timeout=0.1)
+                except queue.Empty:
+                    item = False
+                if item is None:
+                    open_streams -= 1
+                elif item:
+                    name, line = item
+                    buffer.append(line)
+                    if log_lines:
+                        logger.info("[sandbox:%s] %s", name, line)
+                    if on_line:
+                        on_line(name, line)
+                expired = deadline is not None and time.monotonic() > deadline
+                if (expired or (cancel is not None and cancel.is_set())) and not timed_out:
+                    timed_out = expired
+                    self._kill(proc)
+                    if not expired:
+                        break
+
+            cpu_time, peak_rss, status = self._reap(proc)
+            wall_time = time.monotonic() - start
+            # cancelled commands were killed mid-run, like timeouts
+            killed = timed_out or (cancel is not None and cancel.is_set())
+            healthy = not killed and ContainerPool.reusable(status)
+            local = not self._use_docker()
+            result = SandboxResult(
+                command=command,
+                exit_code=status,
+                wall_time=wall_time,
+                cpu_time=cpu_time if local else None,
+                peak_rss=peak_rss if local else None,
+                head=buffer.head,
+                tail=list(buffer.tail),
+                dropped_lines=buffer.dropped,
+                timed_out=timed_out,
+            )
+            if check and timed_out:
+                raise SandboxError(
+                    f"Sandbox timeout after {self.timeout}s\nOUTPUT:\n{result.output}\n",
+                    result,
+                )
+            if check and status != 0:
+                raise SandboxError(
+                    f"Command failed (exit {status})\nOUTPUT:\n{result.output}\n", result
+                )
+            return result
+        finally:
+            if pool is not None:
+                pool.release(container_id, healthy=healthy)
+
+    def stream(
+        self, command: str, cwd: str = None, **kwargs
+    ) -> "SandboxStream":
+        """
+        Async counterpart of run_streaming: returns a SandboxStream to iterate
+        with ``async for stream, line in ...``; its ``result`` is set once
+        iteration finishes.
+        """
+        return SandboxStream(self, command, cwd, kwargs)
+
+    @staticmethod
+    def _kill(proc: subprocess.Popen) -> None:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    @staticmethod
+    def _reap(proc: subprocess.Popen) -> Tuple[float, int, int]:
+        """Wait for the process and return (cpu seconds, peak RSS bytes, exit code)."""
+        if not hasattr(os, "wait4"):
+            return 0.0, 0, proc.wait()
+        _, wait_status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(wait_status)
+        cpu_time = usage.ru_utime + usage.ru_stime
+        # ru_maxrss is reported in KiB on Linux
+        return cpu_time, usage.ru_maxrss * 1024, proc.returncode
+
+
+class SandboxStream:
+    """
+    Async iterator over the ``(stream, line)`` output of a sandbox command,
+    running ExecutionSandbox.run_streaming on a worker thread.
+    """
+    def __init__(self, sandbox: ExecutionSandbox, command: str, cwd: str, kwargs):
+        self.sandbox = sandbox
+        self.command = command
+        self.cwd = cwd
+        self.kwargs = kwargs
+        self.result: Optional[SandboxResult] = None
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        lines: "asyncio.Queue" = asyncio.Queue()
+        done = object()
+        cancel = threading.Event()
+        user_cb = self.kwargs.pop("on_line", None)
+
+        def on_line(name, line):
+            if user_cb:
+                user_cb(name, line)
+            loop.call_soon_threadsafe(lines.put_nowait, (name, line))
+
+        def work():
+            try:
+                return self.sandbox.run_streaming(
+                    self.command, self.cwd, on_line=on_line, cancel=cancel,
+                    **self.kwargs,
+                )
+            finally:
+                loop.call_soon_threadsafe(lines.put_nowait, done)
+
+        future = loop.run_in_executor(None, work)
+        finished = False
+        try:
+            while True:
+                item = await lines.get()
+                if item is done:
+                    break
+                yield item
+            finished = True
+        finally:
+            if not finished:
+                # Consumer stopped early: kill the command, drop its result.
+                cancel.set()
+                future.add_done_callback(lambda f: f.exception())
+        self.result = await future
@@ -0,0 +1,298 @@
+"""
+Semantic response cache for agent calls.
+
+Exact request fingerprints (service/idempotency.py) miss requests that
+differ by a word. ``SemanticCache`` embeds the request text and looks up
+its nearest neighbour in a dedicated VectorMemory index per (agent, model);
+a stored response is reused when the cosine similarity reaches the
+threshold and the entry is younger than the TTL. Entries beyond
+``max_entries`` are evicted oldest first.
+
+Caching is opt-in per agent through ``SEMANTIC_CACHE_AGENTS``, a comma
+separated list of agent names with optional per-agent thresholds
+(``IdeasAgent:0.97,CodeArchitect``). Code-generating agents are never
+cached. A fraction of hits (``SEMANTIC_CACHE_VERIFY_RATE``) is verified by
+calling the agent anyway: a fresh response that differs from the cached one
+counts as a false positive and replaces it. Counters (lookups, hits,
+false positives, evictions, ...) are kept in each index's state table and
+reported by ``stats()``.
+
+Indexes live under ``SEMANTIC_CACHE_PATH`` (default .obelisk/semantic_cache)
+and may be shared by several worker processes: every operation holds an
+exclusive file lock and reopens the index when another process changed it.
+"""
+import fcntl
+import glob
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Reusing a near-duplicate response is unsafe where output must match the input exactly
+CODEGEN_AGENTS = frozenset({"CodeGenerator", "TestHarnessAgent"})
+STATS_KEY = "semantic_cache.stats"
+VERSION_KEY = "semantic_cache.version"
+COUNTERS = (
+    "lookups", "hits", "misses", "expired", "stores", "evictions",
+    "verified", "false_positives",
+)
+
+_caches: Dict[tuple, "SemanticCache"] = {}
+
+
+def cache_root() -> str:
+    return os.getenv("SEMANTIC_CACHE_PATH", os.path.join(".obelisk", "semantic_cache"))
+
+
+def enabled_agents() -> Dict[str, Optional[float]]:
+    """Parse SEMANTIC_CACHE_AGENTS into {agent: threshold or None}."""
+    return _parse_agents(os.getenv("SEMANTIC_CACHE_AGENTS", ""))
+
+
+@lru_cache(maxsize=8)
+def _parse_agents(value: str) -> Dict[str, Optional[float]]:
+    agents = {}
+    for item in value.split(","):
+        name, _, threshold = item.strip().partition(":")
+        if not name:
+            continue
+        if name in CODEGEN_AGENTS:
+            logger.warning("Semantic cache is never enabled for %s", name)
+            continue
+        agents[name] = float(threshold) if threshold else None
+    return agents
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", name).strip("-") or "default"
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        agent: str,
+        model: str,
+        root: str = None,
+        threshold: float = None,
+        ttl: float = None,
+        max_entries: int = None,
+        verify_rate: float = None,
+        embedder=None,
+    ):
+        from agent_system.embedding import get_embedder
+
+        if agent in CODEGEN_AGENTS:
+            raise ValueError(f"Semantic caching is not allowed for {agent}")
+        self.agent = agent
+        self.model = model or "default"
+        root = root or cache_root()
+        os.makedirs(root, exist_ok=True)
+        self.index_path = os.path.join(root, f"{_slug(agent)}__{_slug(self.model)}.index")
+        self.threshold = threshold if threshold is not None else float(
+            os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")
+        )
+        self.ttl = ttl if ttl is not None else float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+        self.max_entries = max_entries or int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+        self.verify_rate = verify_rate if verify_rate is not None else float(
+            os.getenv("SEMANTIC_CACHE_VERIFY_RATE", "0.05")
+        )
+        # Cosine similarity below which a verified response counts as different
+        self.agreement = float(os.getenv("SEMANTIC_CACHE_AGREEMENT", "0.8"))
+        self.embedder = embedder or get_embedder()
+        self.vectors = None
+        self.version = None
+
+    @contextmanager
+    def _locked(self):
+        """Hold the index's file lock and make sure ``self.vectors`` is current."""
+        with open(self.index_path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self.vectors is None:
+                    self._open()
+                elif self.vectors.get_state(VERSION_KEY, 0) != self.version:
+                    self._open()
+                yield self.vectors
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _open(self):
+        from agent_system.vector_memory import VectorMemory
+
+        if self.vectors is not None:
+            self.vectors.conn.close()
+        self.vectors = VectorMemory(
+            self.embedder.dimension, index_path=self.index_path, background=False
+        )
+        self.version = self.vectors.get_state(VERSION_KEY, 0)
+
+    def _commit(self, vectors, counts: Dict[str, int], changed: bool = False):
+        """Add to the shared counters and, after writes, persist and bump the version."""
+        stats = vectors.get_state(STATS_KEY, {})
+        for name, value in counts.items():
+            stats[name] = stats.get(name, 0) + value
+        vectors.set_state(STATS_KEY, stats)
+        if changed:
+            self.version = self.version + 1
+            vectors.set_state(VERSION_KEY, self.version)
+            vectors.save()
+        vectors.conn.commit()
+
+    def _embed(self, text: str):
+        return self.embedder.embed([text])
+
+    def _expire(self, vectors) -> int:
+        """Drop expired entries, then the oldest ones beyond ``max_entries``."""
+        cutoff = time.time() - self.ttl
+        expired = [row[0] for row in vectors.conn.execute(
+            "SELECT id FROM vectors WHERE json_extract(metadata, '$.created') < ?", (cutoff,)
+        )]
+        vectors.delete(expired)
+        over = len(vectors) - self.max_entries
+        oldest = sorted(vectors.location)[:over] if over > 0 else []
+        vectors.delete(oldest)
+        return len(expired) + len(oldest)
+
+    def lookup(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Return ``{"id", "similarity", "response", "created"}`` for the closest
+        live entry at or above the threshold, or None.
+        """
+        query = self._embed(text)
+        with self._locked() as vectors:
+            hits = vectors.query(query, top_k=1)[0] if len(vectors) else []
+            if hits:
+                # Unit vectors: squared L2 distance = 2 - 2 * cosine
+                similarity = 1.0 - hits[0]["distance"] / 2.0
+                meta = hits[0]["metadata"] or {}
+                if similarity >= self.threshold:
+                    if meta.get("created", 0) >= time.time() - self.ttl:
+                        self._commit(vectors, {"lookups": 1, "hits": 1})
+                        return {
+                            "id": hits[0]["id"],
+                            "similarity": round(similarity, 4),
+                            "response": meta.get("response"),
+                            "created": meta.get("created"),
+                        }
+                    vectors.delete([hits[0]["id"]])
+                    self._commit(vectors, {"lookups": 1, "misses": 1, "expired": 1}, True)
+                    return None
+            self._commit(vectors, {"lookups": 1, "misses": 1})
+            return None
+
+    def store(self, text: str, response: Any, replace: int = None):
+        """Cache ``response`` for ``text`` (replacing entry ``replace`` if given)."""
+        vector = self._embed(text)
+        with self._locked() as vectors:
+            if replace is not None:
+                vectors.delete([replace])
+            vectors.add(vector, metadata=[{
+                "text": text[:2000], "response": response, "created": time.time(),
+            }])
+            evicted = self._expire(vectors)
+            self._commit(vectors, {"stores": 1, "evictions": evicted}, True)
+
+    def _agrees(self, cached: Any, fresh: Any) -> bool:
+        if cached == fresh:
+            return True
+        a, b = self.embedder.embed([str(cached), str(fresh)])
+        return float(a @ b) >= self.agreement
+
+    def call(self, text: str, compute: Callable[[], Any]) -> Any:
+        """Return a cached response for ``text`` or compute and cache it."""
+        hit = self.lookup(text)
+        if hit is None:
+            response = compute()
+            if response and str(response).strip():
+                self.store(text, response)
+            return response
+        if self.verify_rate and random.random() < self.verify_rate:
+            fresh = compute()
+            agrees = self._agrees(hit["response"], fresh)
+            with self._locked() as vectors:
+                self._commit(vectors, {"verified": 1, "false_positives": 0 if agrees else 1})
+            if not agrees:
+                logger.info(
+                    "Semantic cache false positive for %s/%s (similarity %.3f)",
+                    self.agent, self.model, hit["similarity"],
+                )
+                self.store(text, fresh, replace=hit["id"])
+                return fresh
+        return hit["response"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._locked() as vectors:
+            return _summary(vectors.get_state(STATS_KEY, {}), len(vectors))
+
+
+def _summary(counts: Dict[str, int], entries: int) -> Dict[str, Any]:
+    out = {name: counts.get(name, 0) for name in COUNTERS}
+    out["entries"] = entries
+    out["hit_rate"] = round(out["hits"] / out["lookups"], 4) if out["lookups"] else 0.0
+    out["false_positive_rate"] = (
+        round(out["false_positives"] / out["verified"], 4) if out["verified"] else 0.0
+    )
+    return out
+
+
+def for_agent(agent: str, model: str) -> Optional[SemanticCache]:
+    """The process's cache for (agent, model), or None if the agent has not opted in."""
+    agents = enabled_agents()
+    if agent not in agents:
+        return None
+    key = (agent, model or "default", cache_root())
+    if key not in _caches:
+        _caches[key] = SemanticCache(agent, model, threshold=agents[agent])
+    return _caches[key]
+
+
+def request_text(params: Dict[str, Any]) -> str:
+    """
+    Canonical text of an agent's method arguments for embedding. Pass the
+    arguments only, not constructor options such as ``api_key``; ``model``
+    is dropped regardless as the cache is already per model.
+    """
+    return "\n".join(
+        f"{key}: {value}" for key, value in sorted((params or {}).items()) if key != "model"
+    )
+
+
+def cached_call(agent: str, model: str, text: str, compute: Callable[[], Any]) -> Any:
+    """``compute()`` through the semantic cache when ``agent`` opted in."""
+    if not text:
+        return compute()
+    try:
+        cache = for_agent(agent, model)
+    except (ImportError, RuntimeError) as e:
+        logger.warning("Semantic cache unavailable for %s: %s", agent, e)
+        cache = None
+    if cache is None:
+        return compute()
+    return cache.call(text, compute)
+
+
+def stats(root: str = None) -> Dict[str, Dict[str, Any]]:
+    """Counters for every (agent, model) index under ``root``, read without faiss."""
+    out = {}
+    for path in sorted(glob.glob(os.path.join(root or cache_root(), "*.index.sqlite"))):
+        conn = sqlite3.connect(path)
+        try:
+            row = conn.execute(
+                "SELECT value FROM state WHERE key = ?", (STATS_KEY,)
+            ).fetchone()
+            entries = conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        except sqlite3.Error:
+            continue
+        finally:
+            conn.close()
+        name = os.path.basename(path)[: -len(".index.sqlite")]
+        out[name.replace("__", "/", 1)] = _summary(json.loads(row[0]) if row else {}, entries)
+    return out
@@ -0,0 +1,253 @@
+import heapq
+import json
+import os
+import shlex
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from agent_system import tracing
+from agent_system.sandbox import (ExecutionSandbox, ResourceLimits,
+                                  SandboxResult)
+
+# pytest exit code when nothing was collected
+NO_TESTS_COLLECTED = 5
+# lines of collection output kept in ShardSummary.collection_error
+COLLECT_TAIL_LINES = 20
+
+
+def junit_key(node_id: str) -> str:
+    """
+    Map a pytest node id (``tests/test_a.py::TestX::test_y[1]``) to the
+    ``classname::name`` key pytest writes into JUnit XML, so durations read
+    back from reports can be matched to collected ids.
+    """
+    parts = node_id.split("::")
+    module = parts[0]
+    if module.endswith(".py"):
+        module = module[:-3]
+    classname = ".".join([module.replace("/", ".")] + parts[1:-1])
+    return f"{classname}::{parts[-1]}"
+
+
+@dataclass
+class ShardSummary:
+    """Merged outcome of a sharded test run."""
+    tests: int = 0
+    failures: int = 0
+    errors: int = 0
+    skipped: int = 0
+    wall_time: float = 0.0
+    shards: List[SandboxResult] = field(default_factory=list)
+    failed_ids: List[str] = field(default_factory=list)
+    junit_path: Optional[str] = None
+    cancelled: bool = False
+    collection_error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        if self.collection_error:
+            return False
+        return not (self.failures or self.errors or self.cancelled) and all(
+            r.exit_code in (0, NO_TESTS_COLLECTED) for r in self.shards
+        )
+
+
+class ShardedTestRunner:
+    """
+    Splits a pytest suite across parallel sandbox workers. Test ids are
+    collected once, balanced over ``workers`` shards by historical duration
+    (longest-processing-time first), executed concurrently and merged into a
+    single JUnit XML report. Durations are persisted in Memory per project.
+    """
+    def __init__(
+        self,
+        sandbox: ExecutionSandbox,
+        workers: int = None,
+        test_command: str = "pytest",
+        memory=None,
+        project: str = None,
+        fail_fast: bool = False,
+        default_duration: float = 1.0,
+        limits: ResourceLimits = None,
+    ):
+        self.sandbox = sandbox
+        self.workers = workers or os.cpu_count() or 1
+        self.test_command = test_command
+        self.memory = memory
+        self.project = project
+        self.fail_fast = fail_fast
+        self.default_duration = default_duration
+        self.limits = limits
+
+    def collect(self, cwd: str) -> List[str]:
+        """Return the pytest node ids found under cwd."""
+        return self._collect(cwd)[0]
+
+    def _collect(self, cwd: str) -> Tuple[List[str], SandboxResult]:
+        ids: List[str] = []
+
+        def on_line(stream, line):
+            if stream == "stdout" and "::" in line and not line.startswith(" "):
+                ids.append(line.strip())
+
+        result = self.sandbox.run_streaming(
+            self._collect_command(),
+            cwd=cwd,
+            on_line=on_line,
+            check=False,
+            log_lines=False,
+            limits=self.limits,
+        )
+        return ids, result
+
+    def _collect_command(self) -> str:
+        # pytest prints bare node ids only at verbosity -1 (a single -q);
+        # compensate for any -q flags already in the test command.
+        quiet = sum(
+            tok.count("q")
+            for tok in shlex.split(self.test_command)
+            if tok.startswith("-") and not tok.startswith("--") and set(tok[1:]) == {"q"}
+        )
+        adjust = " -q" if quiet == 0 else " -v" * (quiet - 1)
+        return f"{self.test_command} --collect-only{adjust}"
+
+    def load_durations(self) -> Dict[str, float]:
+        """Latest recorded per-test durations for this project, keyed by junit_key."""
+        if not self.memory:
+            return {}
+        entries = self.memory.query(
+            agent="sandbox", action="test_durations", project=self.project, limit=1
+        )
+        if not entries:
+            return {}
+        try:
+            return json.loads(entries[0].content)
+        except (TypeError, ValueError):
+            return {}
+
+    def plan(self, test_ids: List[str], durations: Dict[str, float]) -> List[List[str]]:
+        """Greedily assign the slowest tests first to the least loaded shard."""
+        shards: List[List[str]] = [[] for _ in range(min(self.workers, len(test_ids)))]
+        if not shards:
+            return []
+        known = [d for d in durations.values() if d > 0]
+        fallback = sorted(known)[len(known) // 2] if known else self.default_duration
+        weighted = sorted(
+            test_ids,
+            key=lambda t: durations.get(junit_key(t), fallback),
+            reverse=True,
+        )
+        heap = [(0.0, i) for i in range(len(shards))]
+        for test_id in weighted:
+            load, i = heapq.heappop(heap)
+            shards[i].append(test_id)
+            heapq.heappush(heap, (load + durations.get(junit_key(test_id), fallback), i))
+        return [s for s in shards if s]
+
+    def run(self, cwd: str) -> ShardSummary:
+        """Collect, shard, execute and merge. Never raises on test failures."""
+        start = time.monotonic()
+        test_ids, collected = self._collect(cwd)
+        error = self._collection_error(test_ids, collected)
+        if error:
+            return ShardSummary(
+                shards=[collected],
+                collection_error=error,
+                wall_time=time.monotonic() - start,
+            )
+        shards = self.plan(test_ids, self.load_durations())
+        report_dir = os.path.join(cwd, ".obelisk_shards")
+        os.makedirs(report_dir, exist_ok=True)
+        for name in os.listdir(report_dir):
+            if name.startswith("shard-"):
+                os.remove(os.path.join(report_dir, name))
+        cancel = threading.Event()
+        extra = " -x" if self.fail_fast else ""
+
+        def run_shard(index: int, ids: List[str]) -> SandboxResult:
+            junit = f".obelisk_shards/shard-{index}.xml"
+            command = (
+                f"{self.test_command}{extra} --junitxml={junit} "
+                + " ".join(shlex.quote(t) for t in ids)
+            )
+            result = self.sandbox.run_streaming(
+                command, cwd=cwd, check=False, cancel=cancel, limits=self.limits
+            )
+            if self.fail_fast and result.exit_code not in (0, NO_TESTS_COLLECTED):
+                cancel.set()
+            return result
+
+        with ThreadPoolExecutor(max_workers=max(1, len(shards))) as ex:
+            futures = [ex.submit(tracing.wrap(run_shard), i, ids) for i, ids in enumerate(shards)]
+            results = [f.result() for f in futures]
+
+        summary = self._merge(report_dir, len(shards))
+        summary.shards = results
+        summary.cancelled = cancel.is_set()
+        summary.wall_time = time.monotonic() - start
+        return summary
+
+    @staticmethod
+    def _collection_error(test_ids: List[str], result: SandboxResult) -> Optional[str]:
+        """
+        Describe a failed collection, or None. Exit 5 with no ids is an empty
+        suite; any other nonzero exit (import errors, bad options) or a
+        successful exit that yielded no ids means the shards cannot be planned.
+        """
+        if result.exit_code == NO_TESTS_COLLECTED and not test_ids:
+            return None
+        if result.exit_code == 0 and test_ids:
+            return None
+        if result.timed_out:
+            reason = "timed out"
+        elif result.exit_code == 0:
+            reason = "reported no test ids"
+        else:
+            reason = f"exited with {result.exit_code}"
+        lines = (result.head + result.tail)[-COLLECT_TAIL_LINES:]
+        return f"test collection {reason}:\n" + "\n".join(lines)
+
+    def _merge(self, report_dir: str, count: int) -> ShardSummary:
+        summary = ShardSummary()
+        merged = ET.Element("testsuites")
+        suite = ET.SubElement(merged, "testsuite", name="obelisk-sharded")
+        durations = self.load_durations()
+        for index in range(count):
+            path = os.path.join(report_dir, f"shard-{index}.xml")
+            try:
+                root = ET.parse(path).getroot()
+            except (OSError, ET.ParseError):
+                continue
+            for case in root.iter("testcase"):
+                suite.append(case)
+                key = f"{case.get('classname', '')}::{case.get('name', '')}"
+                durations[key] = float(case.get("time") or 0)
+                summary.tests += 1
+                if case.find("failure") is not None:
+                    summary.failures += 1
+                    summary.failed_ids.append(key)
+                elif case.find("error") is not None:
+                    summary.errors += 1
+                    summary.failed_ids.append(key)
+                elif case.find("skipped") is not None:
+                    summary.skipped += 1
+        suite.set("tests", str(summary.tests))
+        suite.set("failures", str(summary.failures))
+        suite.set("errors", str(summary.errors))
+        suite.set("skipped", str(summary.skipped))
+        suite.set(
+            "time", f"{sum(float(c.get('time') or 0) for c in suite):.3f}"
+        )
+        summary.junit_path = os.path.join(report_dir, "junit.xml")
+        ET.ElementTree(merged).write(
+            summary.junit_path, encoding="utf-8", xml_declaration=True
+        )
+        if self.memory and summary.tests:
+            self.memory.add(
+                "sandbox", "test_durations", json.dumps(durations), project=self.project
+            )
+        return summary
@@ -0,0 +1,17 @@
+"""
+Small summary statistics shared by the benchmark and load-test scripts.
+"""
+from typing import Iterable, Optional
+
+
+def percentile(values: Iterable[float], pct: float) -> Optional[float]:
+    """
+    Nearest-rank percentile (``pct`` in 0..100) of values, or None when
+    there are none. Uses the sample itself rather than interpolating, so
+    reported latencies are ones that were actually observed.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
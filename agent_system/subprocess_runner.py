@@ -0,0 +1,156 @@
+import asyncio
+import collections
+import contextvars
+import logging
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Sequence, TypeVar
+
+from agent_system import tracing
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ProcessTimeout(RuntimeError):
+    """Raised when a subprocess exceeds its time budget and is killed."""
+    def __init__(self, message: str, tail: List[str] = None):
+        super().__init__(message)
+        self.tail = tail or []
+
+
+@dataclass
+class ProcessResult:
+    """Exit status, duration and the last lines of output of a subprocess."""
+    returncode: int
+    duration: float
+    tail: List[str] = field(default_factory=list)
+
+
+async def run_process(
+    argv: Sequence[str],
+    input_text: Optional[str] = None,
+    timeout: Optional[float] = None,
+    on_line: Callable[[str], None] = None,
+    cwd: Optional[str] = None,
+    tail_lines: int = 50,
+    log_prefix: Optional[str] = None,
+) -> ProcessResult:
+    """
+    Run ``argv`` without a shell, optionally feeding ``input_text`` on stdin,
+    and stream its combined stdout/stderr line by line to ``on_line`` and the
+    module logger. The process is killed if ``timeout`` expires (raising
+    ProcessTimeout) or if the awaiting task is cancelled.
+    """
+    name = os.path.basename(str(argv[0]))
+    with tracing.span(f"subprocess.{name}", "subprocess", argv0=name) as span:
+        result = await _run_process(
+            argv, input_text, timeout, on_line, cwd, tail_lines, log_prefix
+        )
+        span.set(returncode=result.returncode)
+        return result
+
+
+async def _run_process(argv, input_text, timeout, on_line, cwd, tail_lines, log_prefix):
+    start = time.monotonic()
+    proc = await asyncio.create_subprocess_exec(
+        *argv,
+        stdin=asyncio.subprocess.PIPE if input_text is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        cwd=cwd,
+        # Own process group, so a timeout also kills the command's children
+        start_new_session=True,
+    )
+    tail: "collections.deque[str]" = collections.deque(maxlen=tail_lines)
+    prefix = log_prefix or argv[0]
+
+    async def feed():
+        if input_text is not None:
+            try:
+                proc.stdin.write(input_text.encode())
+                await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                proc.stdin.close()
+
+    async def pump():
+        while True:
+            raw = await proc.stdout.readline()
+            if not raw:
+                break
+            line = raw.decode(errors="replace").rstrip("\n")
+            tail.append(line)
+            logger.info("[%s] %s", prefix, line)
+            if on_line:
+                on_line(line)
+        return await proc.wait()
+
+    feeder = asyncio.ensure_future(feed())
+    try:
+        returncode = await asyncio.wait_for(pump(), timeout=timeout)
+    except asyncio.TimeoutError:
+        await _kill(proc)
+        raise ProcessTimeout(
+            f"{prefix} timed out after {timeout}s", list(tail)
+        ) from None
+    except asyncio.CancelledError:
+        await _kill(proc)
+        raise
+    finally:
+        feeder.cancel()
+    return ProcessResult(returncode, time.monotonic() - start, list(tail))
+
+
+async def _kill(proc) -> None:
+    """
+    SIGKILL the process group of ``proc``, then drain its output: wait()
+    only returns once every holder of the stdout pipe (grandchildren
+    included) has gone.
+    """
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    try:
+        await proc.stdout.read()
+    except (ConnectionResetError, ValueError):
+        pass
+    await proc.wait()
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code. When called from a
+    thread that already runs an event loop, it is driven from a helper thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    outcome = {}
+    # Keep the caller's trace context on the helper thread
+    context = contextvars.copy_context()
+
+    def target():
+        try:
+            outcome["result"] = context.run(asyncio.run, coro)
+        except BaseException as e:  # re-raised in the calling thread
+            outcome["error"] = e
+
+    t = threading.Thread(target=target)
+    t.start()
+    t.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def run_process_sync(argv: Sequence[str], **kwargs) -> ProcessResult:
+    """Blocking wrapper around run_process."""
+    return run_sync(run_process(argv, **kwargs))
@@ -1,14 +1,11 @@
 import os
-import subprocess
-
-import anthropic
-import openai
 
 
 class TaskRouter:
     """
     Intelligent dispatcher that assigns tasks to Claude (Anthropic),
     Codex CLI, or ChatGPT (OpenAI) based on task description.
+    Provider SDKs are imported only when a task is routed to them.
     """
     def __init__(self,
                  anthro_model: str = "claude-v1",
@@ -17,19 +14,26 @@ class TaskRouter:
         self.anthro_key = os.getenv("ANTHROPIC_API_KEY")
         if not self.anthro_key:
             raise ValueError("ANTHROPIC_API_KEY not set for Claude agent")
-        self.anthro = anthropic.Client(api_key=self.anthro_key)
+        self._anthro = None
         self.anthro_model = anthro_model
 
         self.openai_key = os.getenv("OPENAI_API_KEY")
         if not self.openai_key:
             raise ValueError("OPENAI_API_KEY not set for ChatGPT agent")
-        openai.api_key = self.openai_key
         self.openai_model = openai_model
 
         self.codex_cli = codex_cli_path or os.getenv("CODEX_CLI_PATH")
         if not self.codex_cli:
             raise ValueError("CODEX_CLI_PATH not set for Codex agent")
 
+    @property
+    def anthro(self):
+        if self._anthro is None:
+            import anthropic
+
+            self._anthro = anthropic.Client(api_key=self.anthro_key)
+        return self._anthro
+
     def classify_task(self, description: str) -> str:
         """
         Simple heuristic to classify task description to one of: 'claude', 'codex', 'chatgpt'.
@@ -49,11 +53,13 @@ class TaskRouter:
         """
         agent = self.classify_task(description)
         if agent == "claude":
+            import anthropic
+
             prompt = anthropic.HUMAN_PROMPT + description + anthropic.AI_PROMPT
             resp = self.anthro.completions.create(
                 model=self.anthro_model,
                 prompt=prompt,
-                max_tokens=1000,
+                max_tokens_to_sample=1000,
                 stop_sequences=[anthropic.HUMAN_PROMPT],
             )
             return resp.completion.strip()
@@ -62,14 +68,20 @@ class TaskRouter:
             # expects kwargs: spec, output_dir
             spec = kwargs.get("spec", description)
             output_dir = kwargs.get("output_dir", "./output")
-            subprocess.run([
-                self.codex_cli, "generate",
-                "--spec", spec,
-                "--out", output_dir,
-            ], check=True)
+            from agent_system.agents.code_generator import CodeGenerator
+
+            generator = CodeGenerator(
+                codex_cli_path=self.codex_cli,
+                timeout=kwargs.get("timeout"),
+                on_progress=kwargs.get("on_progress"),
+            )
+            generator.generate_code(spec, output_dir)
             return f"Code generated to {output_dir}"
 
         # chatgpt
+        import openai
+
+        openai.api_key = self.openai_key
         resp = openai.ChatCompletion.create(
             model=self.openai_model,
             messages=[{"role": "user", "content": description}],
@@ -0,0 +1,610 @@
+"""
+In-process tracing and metrics, with no external collector.
+
+``span(name, kind=...)`` times a block as a span of the current trace (a
+context variable, so spans nest across function calls, threads started
+through ``wrap`` and asyncio tasks); ``traced`` does the same for a whole
+function and ``instrument`` for every public method of a class. Kinds group
+spans for the metrics: ``run``, ``stage``, ``task``, ``http``, ``agent``,
+``llm``, ``subprocess`` and ``db``. ``llm_call`` additionally records the
+provider, model and prompt/completion tokens of one provider request.
+
+Trace context crosses process boundaries as a W3C ``traceparent`` string
+(``inject`` / ``extract``); service/telemetry.py carries it in Celery task
+headers.
+
+Finished spans are exported when ``OBELISK_TRACE_FILE`` is set, appended
+in batches (whenever a local root span ends, and at exit) as one JSON span
+per line, or with ``OBELISK_TRACE_FORMAT=otlp`` as OTLP/JSON
+``ExportTraceServiceRequest`` lines that OpenTelemetry tooling can replay.
+Every span also feeds in-process aggregates (duration histograms, error,
+token and retry counters) rendered by ``prometheus_text`` for the API's
+``/metrics`` endpoint. With ``OBELISK_METRICS_DIR`` set, each process also
+writes its aggregates there and ``prometheus_text`` merges them, so API
+and worker processes on one host report together.
+
+``OBELISK_TRACING=0`` turns spans into no-ops.
+"""
+import asyncio
+import atexit
+import contextvars
+import fcntl
+import functools
+import glob
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the duration histogram buckets: LLM calls and
+# Codex runs take minutes, DB writes milliseconds
+BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+# OTLP SpanKind per span kind; everything else is INTERNAL (1)
+OTLP_KINDS = {"http": 2, "llm": 3, "subprocess": 3, "task": 5}
+
+_current: contextvars.ContextVar = contextvars.ContextVar("obelisk_span", default=None)
+
+
+def enabled() -> bool:
+    return os.getenv("OBELISK_TRACING", "1") != "0"
+
+
+class Span:
+    """One timed operation; ``parent_id`` is None for the root of a trace."""
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "kind", "attributes",
+        "start_ns", "end_ns", "status", "error", "events", "remote_parent",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        kind: str = "internal",
+        trace_id: str = None,
+        parent_id: str = None,
+        remote_parent: bool = False,
+        attributes: Dict[str, Any] = None,
+    ):
+        # Random ids as in OpenTelemetry's default generator; os.urandom per span is slower
+        self.trace_id = trace_id or f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.remote_parent = remote_parent
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attributes) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def event(self, name: str, **attributes):
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, error: BaseException):
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+        self.event("exception", type=type(error).__name__, message=str(error))
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        _finished(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start_ns / 1e9,
+            "duration": round(self.duration, 6),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "events": self.events,
+            "pid": os.getpid(),
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": OTLP_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": _otlp_attributes({"obelisk.kind": self.kind, **self.attributes}),
+            "events": [
+                {
+                    "name": e["name"], "timeUnixNano": str(e["time_ns"]),
+                    "attributes": _otlp_attributes(e["attributes"]),
+                }
+                for e in self.events
+            ],
+            "status": {"code": 2, "message": self.error} if self.status == "error" else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    out = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        out.append({"key": key, "value": typed})
+    return out
+
+
+class _NoopSpan(Span):
+    def __init__(self):
+        super().__init__("noop")
+
+    def end(self):
+        pass
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def set_attributes(**attributes):
+    """Add attributes to the current span, if any."""
+    span = _current.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def start_span(
+    name: str, kind: str = "internal", parent: Optional[Tuple[str, str]] = None, **attributes
+) -> Span:
+    """
+    Start a span without activating it. ``parent`` is a (trace_id, span_id)
+    pair from ``extract``; by default the current span is the parent.
+    """
+    if not enabled():
+        return _NoopSpan()
+    if parent is not None:
+        return Span(name, kind, parent[0], parent[1], remote_parent=True, attributes=attributes)
+    current = _current.get()
+    if current is not None:
+        return Span(name, kind, current.trace_id, current.span_id, attributes=attributes)
+    return Span(name, kind, attributes=attributes)
+
+
+def activate(span: Span) -> contextvars.Token:
+    """Make ``span`` current; pass the token to ``deactivate``."""
+    return _current.set(span)
+
+
+def deactivate(token: contextvars.Token):
+    _current.reset(token)
+
+
+@contextmanager
+def span(
+    name: str, kind: str = "internal", parent: Optional[Tuple[str, str]] = None, **attributes
+) -> Iterator[Span]:
+    """Time the block as a child of the current span (or of ``parent``)."""
+    s = start_span(name, kind, parent, **attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            s.record_exception(e)
+        raise
+    except BaseException as e:
+        s.record_exception(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+def traced(name: str = None, kind: str = "internal", **attributes) -> Callable:
+    """Decorator: run each call of the function inside ``span``."""
+    def decorate(fn):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, kind, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instrument(cls: type, kind: str = "agent") -> type:
+    """
+    Wrap every public method defined on ``cls`` in a ``<kind>.<Class>.<method>``
+    span. Idempotent, so registries can call it on each lookup.
+    """
+    if cls.__dict__.get("_obelisk_traced"):
+        return cls
+    for attr, value in list(cls.__dict__.items()):
+        if attr.startswith("_") or not callable(value) or isinstance(value, (staticmethod, classmethod, type)):
+            continue
+        setattr(cls, attr, traced(f"{kind}.{cls.__name__}.{attr}", kind)(value))
+    cls._obelisk_traced = True
+    return cls
+
+
+def wrap(fn: Callable) -> Callable:
+    """
+    Bind ``fn`` to the caller's context, so spans it starts on a pool
+    thread stay children of the current span. Safe to call concurrently.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+# -- propagation -----------------------------------------------------------
+
+def traceparent(s: Span = None) -> Optional[str]:
+    """W3C traceparent for ``s`` (default: the current span)."""
+    s = s or _current.get()
+    if s is None or isinstance(s, _NoopSpan):
+        return None
+    return f"00-{s.trace_id}-{s.span_id}-01"
+
+
+def inject(headers: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the current trace context to a headers dict (in place)."""
+    value = traceparent()
+    if value:
+        headers["traceparent"] = value
+    return headers
+
+
+def extract(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, span_id) from a traceparent string, or None if malformed."""
+    parts = (value or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+# -- LLM calls -------------------------------------------------------------
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """About four characters per token, as in agent_system.recall."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def _field(obj, name: str):
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+class LLMCall:
+    """Handle yielded by ``llm_call``; pass the provider response to ``record``."""
+    def __init__(self, span: Span, provider: str, model: str, prompt: str):
+        self.span = span
+        self.provider = provider
+        self.model = model
+        self.prompt = prompt
+
+    def record(self, response: Any, completion: Optional[str] = None):
+        """
+        Read token usage from an OpenAI (``usage.prompt_tokens``) or
+        Anthropic (``usage.input_tokens``) response, estimating it from the
+        text when the response carries none.
+        """
+        usage = _field(response, "usage")
+        prompt_tokens = _field(usage, "prompt_tokens") or _field(usage, "input_tokens")
+        completion_tokens = _field(usage, "completion_tokens") or _field(usage, "output_tokens")
+        if completion is None:
+            completion = _field(response, "completion")
+            choices = _field(response, "choices")
+            if completion is None and choices:
+                message = _field(choices[0], "message")
+                completion = _field(message, "content") if message else _field(choices[0], "text")
+        estimated = prompt_tokens is None or completion_tokens is None
+        self.span.set(
+            prompt_tokens=int(prompt_tokens if prompt_tokens is not None else estimate_tokens(self.prompt)),
+            completion_tokens=int(
+                completion_tokens if completion_tokens is not None else estimate_tokens(completion)
+            ),
+            tokens_estimated=estimated,
+        )
+
+
+@contextmanager
+def llm_call(provider: str, model: str, prompt: str = "") -> Iterator[LLMCall]:
+    """Span around one provider request (kind ``llm``)."""
+    with span(f"llm.{provider}", "llm", provider=provider, model=model) as s:
+        yield LLMCall(s, provider, model, prompt)
+
+
+# -- metrics ---------------------------------------------------------------
+
+class Metrics:
+    """Counters and histograms keyed by metric name and a sorted label tuple."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        self.histograms: Dict[Tuple[str, tuple], List[float]] = {}
+
+    def _reset_after_fork(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.counters.clear()
+            self.histograms.clear()
+
+    def inc(self, metric: str, value: float = 1, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self.lock:
+            self._reset_after_fork()
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, metric: str, value: float, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self.lock:
+            self._reset_after_fork()
+            # One count per bucket, then +Inf, sum
+            h = self.histograms.setdefault(key, [0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    h[i] += 1
+            h[-2] += 1
+            h[-1] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            self._reset_after_fork()
+            return {
+                "counters": [[n, list(map(list, l)), v] for (n, l), v in self.counters.items()],
+                "histograms": [[n, list(map(list, l)), h] for (n, l), h in self.histograms.items()],
+            }
+
+
+metrics = Metrics()
+
+HELP = {
+    "obelisk_span_duration_seconds": ("histogram", "Duration of traced operations"),
+    "obelisk_span_errors_total": ("counter", "Traced operations that raised"),
+    "obelisk_llm_requests_total": ("counter", "LLM provider requests"),
+    "obelisk_llm_tokens_total": ("counter", "LLM prompt and completion tokens"),
+    "obelisk_llm_fallbacks_total": ("counter", "Retries of a pipeline role on a fallback model"),
+    "obelisk_tasks_total": ("counter", "Celery tasks finished, by state"),
+}
+
+
+def _record_metrics(s: Span):
+    metrics.observe("obelisk_span_duration_seconds", s.duration, kind=s.kind, name=s.name)
+    if s.status == "error":
+        metrics.inc("obelisk_span_errors_total", kind=s.kind, name=s.name)
+    if s.kind == "llm":
+        labels = {"provider": s.attributes.get("provider", ""), "model": s.attributes.get("model", "")}
+        metrics.inc("obelisk_llm_requests_total", status=s.status, **labels)
+        for kind in ("prompt", "completion"):
+            tokens = s.attributes.get(f"{kind}_tokens")
+            if tokens:
+                metrics.inc("obelisk_llm_tokens_total", tokens, type=kind, **labels)
+    elif s.kind == "task":
+        metrics.inc("obelisk_tasks_total", task=s.name, state=s.attributes.get("state", s.status))
+
+
+def _merged(snapshots: List[Dict[str, Any]]):
+    counters: Dict[Tuple[str, tuple], float] = {}
+    histograms: Dict[Tuple[str, tuple], List[float]] = {}
+    for snap in snapshots:
+        for name, labels, value in snap.get("counters", []):
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, h in snap.get("histograms", []):
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, [0] * len(h))
+            for i, v in enumerate(h):
+                total[i] += v
+    return counters, histograms
+
+
+def _labels(labels: tuple, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+
+def prometheus_text() -> str:
+    """Aggregates in the Prometheus text exposition format."""
+    snapshots = [metrics.snapshot()]
+    directory = os.getenv("OBELISK_METRICS_DIR")
+    if directory:
+        write_metrics()
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    counters, histograms = _merged(snapshots)
+    lines = []
+    names = sorted({n for n, _ in counters} | {n for n, _ in histograms})
+    for name in names:
+        kind, text = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_labels(labels)} {value:g}")
+        for (n, labels), h in sorted(histograms.items()):
+            if n != name:
+                continue
+            for bound, count in zip(BUCKETS, h):
+                lines.append(f"{name}_bucket{_labels(labels, (('le', f'{bound:g}'),))} {count:g}")
+            lines.append(f"{name}_bucket{_labels(labels, (('le', '+Inf'),))} {h[-2]:g}")
+            lines.append(f"{name}_sum{_labels(labels)} {h[-1]:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {h[-2]:g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics():
+    """Publish this process's aggregates to ``OBELISK_METRICS_DIR``."""
+    directory = os.getenv("OBELISK_METRICS_DIR")
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(metrics.snapshot(), f)
+    os.replace(tmp, path)
+
+
+# -- export ----------------------------------------------------------------
+
+class _Exporter:
+    """Buffers finished spans and appends them to the trace file in batches."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending: List[Span] = []
+        self.batch_size = int(os.getenv("OBELISK_TRACE_BATCH", "512"))
+        self.last_metrics = 0.0
+        atexit.register(self.flush)
+
+    def add(self, s: Span):
+        with self.lock:
+            self.pending.append(s)
+            full = len(self.pending) >= self.batch_size
+        # A local root ending closes a CLI run, task or request: flush then
+        if full or s.parent_id is None or s.remote_parent:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        path = os.getenv("OBELISK_TRACE_FILE")
+        if batch and path:
+            try:
+                self._write(path, batch)
+            except OSError:
+                logger.exception("Writing %d spans to %s failed", len(batch), path)
+        now = time.monotonic()
+        if os.getenv("OBELISK_METRICS_DIR") and now - self.last_metrics >= 1:
+            self.last_metrics = now
+            try:
+                write_metrics()
+            except OSError:
+                logger.exception("Writing metrics snapshot failed")
+
+    @staticmethod
+    def _write(path: str, batch: List[Span]):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.getenv("OBELISK_TRACE_FORMAT", "jsonl") == "otlp":
+            lines = [json.dumps({"resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({
+                    "service.name": os.getenv("OTEL_SERVICE_NAME", "obelisk"),
+                    "process.pid": os.getpid(),
+                })},
+                "scopeSpans": [{
+                    "scope": {"name": "agent_system.tracing"},
+                    "spans": [s.to_otlp() for s in batch],
+                }],
+            }]})]
+        else:
+            lines = [json.dumps(s.to_dict(), default=str) for s in batch]
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        # One locked append per batch keeps lines from several processes whole
+        with open(path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(data)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_exporter = _Exporter()
+
+
+def _finished(s: Span):
+    try:
+        _record_metrics(s)
+    except Exception:
+        logger.exception("Recording metrics for span %s failed", s.name)
+    _exporter.add(s)
+
+
+def flush():
+    """Write buffered spans (and the metrics snapshot) now."""
+    _exporter.flush()
+
+
+def _otlp_value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    return next(iter(value.values()))
+
+
+def read_spans(path: str) -> List[Dict[str, Any]]:
+    """Spans from a trace file in either format, as ``Span.to_dict``-style dicts."""
+    spans = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "resourceSpans" not in record:
+                spans.append(record)
+                continue
+            for resource in record["resourceSpans"]:
+                for scope in resource.get("scopeSpans", []):
+                    for s in scope.get("spans", []):
+                        attributes = {
+                            a["key"]: _otlp_value(a["value"]) for a in s.get("attributes", [])
+                        }
+                        start, end = int(s["startTimeUnixNano"]), int(s["endTimeUnixNano"])
+                        spans.append({
+                            "trace_id": s["traceId"], "span_id": s["spanId"],
+                            "parent_id": s.get("parentSpanId"), "name": s["name"],
+                            "kind": attributes.pop("obelisk.kind", "internal"),
+                            "start": start / 1e9, "duration": (end - start) / 1e9,
+                            "status": "error" if s.get("status", {}).get("code") == 2 else "ok",
+                            "attributes": attributes,
+                        })
+    return spans
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from agent_system import tracing
+
+# Files whose contents change tool behaviour and so belong in the cache key
+CONFIG_FILES = ("pyproject.toml", "setup.cfg", "tox.ini", ".pylintrc", "pylintrc")
+SKIP_DIRS = {"__pycache__", "node_modules", "venv"}
+BLACK_REFORMAT = re.compile(r"^would reformat (.+)$")
+BLACK_ERROR = re.compile(r"^error: cannot format (.+?): (.*)$")
+# pylint exit status bits that mean the run itself failed: fatal message (1)
+# and usage error such as bad flags (32); 2-16 only report message categories
+PYLINT_FAILED = 1 | 32
+# black exits 1 when files would be reformatted and 123 on internal errors
+BLACK_OK = (0, 1)
+
+
+@dataclass
+class LintIssue:
+    """A single finding from a validation tool."""
+    tool: str
+    path: str
+    line: int
+    column: int
+    code: str
+    message: str
+    severity: str
+
+
+@dataclass
+class ValidationReport:
+    """Machine-readable result of a ValidationEngine run."""
+    files: int = 0
+    checked: int = 0
+    cached: int = 0
+    issues: List[LintIssue] = field(default_factory=list)
+    tool_versions: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def summary(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for issue in self.issues:
+            counts[issue.tool] = counts.get(issue.tool, 0) + 1
+        return counts
+
+    def to_dict(self) -> dict:
+        return {
+            "ok": self.ok,
+            "files": self.files,
+            "checked": self.checked,
+            "cached": self.cached,
+            "summary": self.summary(),
+            "tool_versions": self.tool_versions,
+            "issues": [asdict(i) for i in self.issues],
+        }
+
+
+class ValidationEngine:
+    """
+    Runs pylint and ``black --check`` over a source tree. Files are sharded
+    across ``workers`` tool processes per tool, and per-file results are cached
+    by (tool, tool version, config, content hash) so unchanged files are not
+    re-linted. Because pylint sees one shard at a time, cross-module checks
+    such as duplicate-code only cover files within the same shard.
+    """
+    def __init__(
+        self,
+        tools: Sequence[str] = ("pylint", "black"),
+        flags: str = "",
+        workers: int = None,
+        cache_path: str = None,
+    ):
+        self.tools = list(tools)
+        self.flags = flags
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_path = cache_path
+
+    def discover(self, root: str) -> List[str]:
+        """Return the Python files under root, skipping hidden and cache dirs."""
+        found = []
+        for dirpath, dirs, files in os.walk(root):
+            dirs[:] = sorted(
+                d for d in dirs if not d.startswith(".") and d not in SKIP_DIRS
+            )
+            found.extend(
+                os.path.join(dirpath, f) for f in sorted(files) if f.endswith(".py")
+            )
+        return found
+
+    def tool_version(self, tool: str) -> str:
+        try:
+            proc = subprocess.run(
+                [tool, "--version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True,
+            )
+        except OSError:
+            return "missing"
+        return proc.stdout.strip()
+
+    def config_digest(self, root: str) -> str:
+        digest = hashlib.sha256(self.flags.encode())
+        for name in CONFIG_FILES:
+            path = os.path.join(root, name)
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    digest.update(name.encode() + f.read())
+        return digest.hexdigest()
+
+    def _load_cache(self) -> Dict[str, list]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache: Dict[str, list]) -> None:
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, self.cache_path)
+
+    def run(self, root: str) -> ValidationReport:
+        """Validate every Python file under root and return the report."""
+        report = ValidationReport()
+        files = self.discover(root)
+        report.files = len(files)
+        content_hashes = {}
+        for path in files:
+            with open(path, "rb") as f:
+                content_hashes[path] = hashlib.sha256(f.read()).hexdigest()
+        config = self.config_digest(root)
+        cache = self._load_cache()
+        # Old keys are dropped: only entries for the current tree survive.
+        fresh: Dict[str, list] = {}
+        jobs = []
+        for tool in self.tools:
+            version = report.tool_versions[tool] = self.tool_version(tool)
+            misses = []
+            for path in files:
+                key = hashlib.sha256(
+                    "\0".join(
+                        (tool, version, config, os.path.relpath(path, root),
+                         content_hashes[path])
+                    ).encode()
+                ).hexdigest()
+                if key in cache:
+                    fresh[key] = cache[key]
+                    report.cached += 1
+                    report.issues.extend(LintIssue(**i) for i in cache[key])
+                else:
+                    misses.append((path, key))
+            report.checked += len(misses)
+            for shard in self._shards(misses):
+                jobs.append((tool, shard))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            results = ex.map(tracing.wrap(lambda job: self._run_tool(job[0], job[1], root)), jobs)
+            for (tool, shard), (issues, failed) in zip(jobs, results):
+                by_path: Dict[str, List[LintIssue]] = {p: [] for p, _ in shard}
+                for issue in issues:
+                    by_path.setdefault(issue.path, []).append(issue)
+                for path, key in shard:
+                    found = by_path.get(path, [])
+                    # A failed tool run says nothing reliable about the shard
+                    if not failed:
+                        fresh[key] = [asdict(i) for i in found]
+                    report.issues.extend(found)
+        self._save_cache(fresh)
+        report.issues.sort(key=lambda i: (i.path, i.line, i.tool))
+        return report
+
+    def _shards(self, items: list) -> List[list]:
+        if not items:
+            return []
+        count = min(self.workers, len(items))
+        return [items[i::count] for i in range(count)]
+
+    def _run_tool(self, tool: str, shard: list, root: str) -> Tuple[List[LintIssue], bool]:
+        """Run tool over a shard; returns its issues and whether the tool itself failed."""
+        paths = [p for p, _ in shard]
+        with tracing.span(f"subprocess.{tool}", "subprocess", files=len(paths)) as span:
+            try:
+                if tool == "pylint":
+                    issues, failed = self._run_pylint(paths)
+                elif tool == "black":
+                    issues, failed = self._run_black(paths)
+                else:
+                    raise ValueError(f"Unsupported validation tool: {tool}")
+            except FileNotFoundError:
+                issues, failed = [self._failure(tool, paths, f"{tool} is not installed")], True
+            span.set(issues=len(issues), failed=failed)
+            return issues, failed
+
+    @staticmethod
+    def _failure(tool: str, paths: List[str], message: str) -> LintIssue:
+        return LintIssue(tool, paths[0], 0, 0, "tool-failed", message, "fatal")
+
+    def _run_pylint(self, paths: List[str]) -> Tuple[List[LintIssue], bool]:
+        proc = subprocess.run(
+            ["pylint", "--output-format=json", *shlex.split(self.flags), *paths],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            messages = json.loads(proc.stdout or "[]")
+        except ValueError:
+            messages = []
+        issues = [
+            LintIssue(
+                tool="pylint",
+                path=self._match(m.get("path", ""), paths),
+                line=m.get("line") or 0,
+                column=m.get("column") or 0,
+                code=m.get("symbol") or m.get("message-id", ""),
+                message=m.get("message", ""),
+                severity=m.get("type", ""),
+            )
+            for m in messages
+        ]
+        failed = bool(proc.returncode & PYLINT_FAILED)
+        if failed and not any(m.get("type") == "fatal" for m in messages):
+            issues.append(self._failure(
+                "pylint", paths,
+                proc.stderr.strip() or f"pylint exited with status {proc.returncode}",
+            ))
+        return issues, failed
+
+    def _run_black(self, paths: List[str]) -> Tuple[List[LintIssue], bool]:
+        proc = subprocess.run(
+            ["black", "--check", *shlex.split(self.flags), *paths],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        issues = []
+        for line in proc.stderr.splitlines():
+            m = BLACK_REFORMAT.match(line)
+            if m:
+                issues.append(LintIssue(
+                    "black", self._match(m.group(1), paths), 0, 0,
+                    "would-reformat", "File is not black-formatted", "convention",
+                ))
+                continue
+            m = BLACK_ERROR.match(line)
+            if m:
+                issues.append(LintIssue(
+                    "black", self._match(m.group(1), paths), 0, 0,
+                    "cannot-format", m.group(2), "error",
+                ))
+        failed = proc.returncode not in BLACK_OK
+        if failed and not issues:
+            issues.append(self._failure(
+                "black", paths,
+                proc.stderr.strip() or f"black exited with status {proc.returncode}",
+            ))
+        return issues, failed
+
+    @staticmethod
+    def _match(reported: str, paths: List[str]) -> str:
+        """Map a path as printed by a tool back to the path we passed in."""
+        if reported in paths:
+            return reported
+        target = os.path.abspath(reported)
+        for path in paths:
+            if os.path.abspath(path) == target:
+                return path
+        return reported
+
+
+def format_issues(report: dict, limit: Optional[int] = 200) -> str:
+    """Render report issues as compact ``path:line [tool code] message`` lines."""
+    lines = [
+        f"{i['path']}:{i['line']} [{i['tool']} {i['code']}] {i['message']}"
+        for i in report.get("issues", [])
+    ]
+    if limit is not None and len(lines) > limit:
+        lines = lines[:limit] + [f"... {len(lines) - limit} more findings omitted"]
+    return "\n".join(lines)
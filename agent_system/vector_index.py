@@ -0,0 +1,130 @@
+"""
+Size-adaptive FAISS index construction for VectorMemory.
+
+Small corpora are searched exactly; above ``flat_threshold`` vectors an
+approximate index is built (IVF-Flat or HNSW, chosen by ``ann``), and above
+``pq_threshold`` an IVF-PQ index keeps memory bounded. IVF indexes are
+trained on a random sample of at most ``train_sample`` vectors.
+"""
+import math
+import os
+from dataclasses import dataclass, fields
+from typing import Optional
+
+try:
+    import faiss
+    import numpy as np
+except ImportError:
+    faiss = None
+
+KINDS = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+
+@dataclass
+class IndexConfig:
+    """Tiering thresholds and index knobs (``VECTOR_<NAME>`` env overrides)."""
+    flat_threshold: int = 10_000
+    pq_threshold: int = 1_000_000
+    ann: str = "ivf"              # "ivf" or "hnsw" between the two thresholds
+    nlist: Optional[int] = None   # IVF lists; default 4 * sqrt(n)
+    nprobe: int = 16
+    m: int = 32                   # HNSW neighbours per node
+    ef_construction: int = 80
+    ef_search: int = 64
+    pq_m: Optional[int] = None    # PQ sub-quantizers; default largest of 64/32/.../2 with d/m >= 4
+    pq_nbits: int = 8
+    train_sample: int = 100_000
+    rerank: int = 4               # IVF-PQ: fetch k * rerank candidates, re-rank exactly
+
+    @classmethod
+    def from_env(cls, **overrides) -> "IndexConfig":
+        values = {}
+        for field in fields(cls):
+            raw = os.getenv(f"VECTOR_{field.name.upper()}")
+            if raw is not None:
+                values[field.name] = raw if field.name == "ann" else int(raw)
+        values.update(overrides)
+        return cls(**values)
+
+
+def choose_kind(n: int, config: IndexConfig) -> str:
+    """Index kind for a corpus of n vectors."""
+    if n < config.flat_threshold:
+        return "flat"
+    if n >= config.pq_threshold:
+        return "ivf_pq"
+    return "hnsw" if config.ann == "hnsw" else "ivf_flat"
+
+
+def _nlist(n: int, config: IndexConfig) -> int:
+    nlist = config.nlist or int(4 * math.sqrt(n))
+    # FAISS wants ~39 training points per centroid
+    return max(1, min(nlist, n // 39 or 1))
+
+
+def _pq_m(dimension: int, config: IndexConfig) -> int:
+    if config.pq_m:
+        return config.pq_m
+    for m in (64, 32, 16, 8, 4, 2):
+        if dimension % m == 0 and dimension // m >= 4:
+            return m
+    return 1
+
+
+def _sample(vectors, size: int):
+    if len(vectors) <= size:
+        return vectors
+    rng = np.random.default_rng(0)
+    return vectors[np.sort(rng.choice(len(vectors), size, replace=False))]
+
+
+def build_index(vectors, ids, kind: str, config: IndexConfig):
+    """Build an ID-mapped index of ``kind`` holding ``vectors`` under ``ids``."""
+    dimension = vectors.shape[1]
+    n = len(vectors)
+    if kind == "flat":
+        base = faiss.IndexFlatL2(dimension)
+    elif kind == "hnsw":
+        base = faiss.IndexHNSWFlat(dimension, config.m)
+        base.hnsw.efConstruction = config.ef_construction
+    elif kind in ("ivf_flat", "ivf_pq"):
+        quantizer = faiss.IndexFlatL2(dimension)
+        nlist = _nlist(n, config)
+        if kind == "ivf_flat":
+            base = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        else:
+            nbits = config.pq_nbits if n >= 39 * (1 << config.pq_nbits) else 4
+            base = faiss.IndexIVFPQ(quantizer, dimension, nlist, _pq_m(dimension, config), nbits)
+        base.train(_sample(vectors, max(config.train_sample, nlist)))
+    else:
+        raise ValueError(f"Unknown index kind: {kind}")
+    index = faiss.IndexIDMap(base)
+    index.add_with_ids(vectors, ids)
+    tune(index, config)
+    return index
+
+
+def tune(index, config: IndexConfig):
+    """Apply search-time knobs (nprobe, efSearch) to an index."""
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(base, faiss.IndexIVF):
+        base.nprobe = config.nprobe
+    elif isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = config.ef_search
+    return index
+
+
+def index_kind(index) -> str:
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(base, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(base, faiss.IndexIVF):
+        return "ivf_flat"
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def index_bytes(index) -> int:
+    """Serialized size, a close proxy for the index's memory footprint."""
+    return int(faiss.serialize_index(index).nbytes)
@@ -1,41 +1,455 @@
+import json
+import logging
 import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 
 try:
     import faiss
+    import numpy as np
 except ImportError:
     faiss = None
 
+from agent_system import tracing
+from agent_system.vector_index import (IndexConfig, build_index, choose_kind,
+                                       index_kind, tune)
+
+# Flat segments are only read and searched, so their codes can be used
+# directly from the mapped file; plain IO_FLAG_MMAP still copies them.
+SEGMENT_IO_FLAG = faiss.IO_FLAG_MMAP_IFC if faiss else None
+
+logger = logging.getLogger(__name__)
+
 
 class VectorMemory:
     """
     Wrapper around a FAISS vector store for semantic memory.
+
+    Vectors are keyed by caller-supplied ids (Memory row ids) through
+    ``IndexIDMap`` and their metadata lives in a SQLite side table that is
+    joined on ``query``. Persistence is append-only: each ``save`` writes the
+    vectors added since the last save as a new delta segment next to
+    ``index_path``, and segments are merged by ``compact`` once there are too
+    many of them or too many superseded entries. Flat segments are mapped in
+    place (``IO_FLAG_MMAP_IFC``), so their vectors stay in the page cache
+    instead of being copied into RAM; approximate indexes are read with
+    ``IO_FLAG_MMAP``.
+
+    Upserts and deletions only touch SQLite and an in-memory location map;
+    superseded entries stay in older segments and are filtered at search
+    time until the next compaction.
+
+    Segments always keep their exact vectors. Once a segment holds at least
+    ``config.flat_threshold`` vectors an approximate index is built for it in
+    a background thread (see agent_system.vector_index), chosen by the total
+    corpus size, and searches switch to it when ready; crossing the next
+    size boundary rebuilds it as the next tier the same way.
     """
-    def __init__(self, dimension: int, index_path: str = None):
+    def __init__(
+        self,
+        dimension: int,
+        index_path: str = None,
+        max_segments: int = None,
+        compact_ratio: float = 0.25,
+        config: IndexConfig = None,
+        background: bool = True,
+    ):
         if not faiss:
             raise RuntimeError("faiss is required for VectorMemory but not installed")
         self.index_path = index_path or os.getenv("VECTOR_INDEX_PATH", "faiss.index")
         self.dimension = dimension
-        if os.path.exists(self.index_path):
-            self.index = faiss.read_index(self.index_path)
-        else:
-            self.index = faiss.IndexFlatL2(dimension)
+        self.max_segments = max_segments or int(os.getenv("VECTOR_MAX_SEGMENTS", "8"))
+        self.compact_ratio = compact_ratio
+        self.config = config or IndexConfig.from_env()
+        self.background = background
+        self.conn = sqlite3.connect(self.index_path + ".sqlite", check_same_thread=False)
+        self._init_schema()
+        # seg -> mapped index, id -> seg holding its current vector
+        self.segments = {}
+        self.location = {}
+        self.stale = {}
+        for seg, path in self.conn.execute("SELECT seg, path FROM segments ORDER BY seg"):
+            self.segments[seg] = faiss.read_index(path, SEGMENT_IO_FLAG)
+        for vid, seg in self.conn.execute("SELECT id, seg FROM vectors"):
+            self.location[vid] = seg
+        for seg, index in self.segments.items():
+            live = sum(1 for s in self.location.values() if s == seg)
+            self.stale[seg] = index.ntotal - live
+        # seg -> approximate index over the segment, and its (kind, path)
+        self.ann = {}
+        self.ann_files = {}
+        self._positions = {}
+        self._building = {}
+        self._lock = threading.Lock()
+        self._bulk = False
+        for seg, kind, path in self.conn.execute("SELECT seg, kind, path FROM ann"):
+            if seg in self.segments:
+                self.ann[seg] = tune(faiss.read_index(path, faiss.IO_FLAG_MMAP), self.config)
+                self.ann_files[seg] = (kind, path)
+        self._new_pending()
+        if not self.segments and os.path.isfile(self.index_path):
+            self._import_legacy()
+        self._maybe_migrate()
+
+    def _init_schema(self):
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS segments (
+                seg INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS vectors (
+                id INTEGER PRIMARY KEY,
+                seg INTEGER NOT NULL,
+                metadata TEXT
+            );
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS ann (
+                seg INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                path TEXT NOT NULL
+            );
+            """
+        )
+        self.conn.commit()
+
+    def _new_pending(self):
+        row = self.conn.execute("SELECT MAX(seg) FROM segments").fetchone()
+        self.pending_seg = (row[0] or 0) + 1
+        self.pending = faiss.IndexIDMap(faiss.IndexFlatL2(self.dimension))
+        self.stale[self.pending_seg] = 0
+
+    def _import_legacy(self):
+        """Adopt a pre-segment single-file index, using positions as ids."""
+        index = faiss.read_index(self.index_path)
+        if index.ntotal and not isinstance(index, faiss.IndexIDMap):
+            vectors = index.reconstruct_n(0, index.ntotal)
+            self.add(vectors, ids=np.arange(index.ntotal))
+            self.save()
+
+    def _segment_path(self, seg: int) -> str:
+        return f"{self.index_path}.{seg:06d}.seg"
+
+    def __len__(self) -> int:
+        return len(self.location)
+
+    def add(self, vectors, metadata=None, ids=None):
+        """
+        Add or replace embeddings (nxD numpy array) under ``ids`` (Memory row
+        ids; defaults to ids after the current maximum). ``metadata`` is an
+        optional list of JSON-serialisable values, one per vector; on upsert
+        a missing value keeps the stored metadata.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype="float32").reshape(-1, self.dimension)
+        if ids is None:
+            start = max(self.location, default=-1) + 1
+            ids = np.arange(start, start + len(vectors))
+        ids = np.asarray(ids, dtype="int64")
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors must have the same length")
+        metadata = metadata if metadata is not None else [None] * len(ids)
+        # An id repeated within the batch keeps its last vector
+        last = {vid: row for row, vid in enumerate(ids.tolist())}
+        if len(last) < len(ids):
+            rows = sorted(last.values())
+            ids, vectors = ids[rows], vectors[rows]
+            metadata = [metadata[row] for row in rows]
+        replaced = []
+        for vid in ids.tolist():
+            old = self.location.get(vid)
+            if old == self.pending_seg:
+                replaced.append(vid)
+            elif old is not None:
+                self.stale[old] += 1
+            self.location[vid] = self.pending_seg
+        if replaced:
+            # Not saved yet, so the old vector can simply be dropped
+            self.pending.remove_ids(np.asarray(replaced, dtype="int64"))
+        self.pending.add_with_ids(vectors, ids)
+        self.conn.executemany(
+            "INSERT INTO vectors (id, seg, metadata) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET seg = excluded.seg, "
+            "metadata = COALESCE(excluded.metadata, metadata)",
+            [(vid, self.pending_seg, None if meta is None else json.dumps(meta))
+             for vid, meta in zip(ids.tolist(), metadata)],
+        )
+        return ids
+
+    upsert = add
+
+    def delete(self, ids) -> int:
+        """Remove vectors by id; returns how many existed."""
+        removed = list(dict.fromkeys(vid for vid in map(int, ids) if vid in self.location))
+        unsaved = []
+        for vid in removed:
+            seg = self.location.pop(vid)
+            if seg == self.pending_seg:
+                unsaved.append(vid)
+            else:
+                self.stale[seg] += 1
+        if unsaved:
+            self.pending.remove_ids(np.asarray(unsaved, dtype="int64"))
+        self.conn.executemany("DELETE FROM vectors WHERE id = ?", [(vid,) for vid in removed])
+        return len(removed)
+
+    def get_state(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
 
-    def add(self, vectors, metadata=None):
+    def set_state(self, key: str, value):
         """
-        Add embeddings (nxD numpy array) to the index.
-        Metadata handling can be implemented alongside external store.
+        Store a JSON value (e.g. an indexer watermark); it is committed by the
+        next ``save`` together with the vectors it describes.
         """
-        self.index.add(vectors)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, json.dumps(value))
+        )
+
+    def _indexes(self):
+        yield from self.segments.items()
+        if self.pending.ntotal:
+            yield self.pending_seg, self.pending
+
+    def _exact(self, seg: int, queries, ids):
+        """Exact L2 distances from each query to the given ids of a segment."""
+        if seg not in self._positions:
+            id_map = faiss.vector_to_array(self.segments[seg].id_map)
+            self._positions[seg] = {vid: row for row, vid in enumerate(id_map.tolist())}
+        flat = faiss.downcast_index(self.segments[seg].index)
+        positions = self._positions[seg]
+        vectors = np.stack([flat.reconstruct(positions[i]) for i in ids])
+        return ((vectors[None, :, :] - queries[:, None, :]) ** 2).sum(-1)
+
+    def _search_segment(self, seg: int, index, queries, k: int):
+        ann = self.ann.get(seg)
+        if ann is None:
+            return index.search(queries, k)
+        if index_kind(ann) != "ivf_pq" or self.config.rerank <= 1:
+            return ann.search(queries, k)
+        # PQ distances are approximate: re-rank a wider candidate set exactly
+        _, candidates = ann.search(queries, min(index.ntotal, k * self.config.rerank))
+        distances = np.full((len(queries), k), np.inf, dtype="float32")
+        ids = np.full((len(queries), k), -1, dtype="int64")
+        for row, cand in enumerate(candidates):
+            cand = cand[cand >= 0]
+            if not len(cand):
+                continue
+            exact = self._exact(seg, queries[row:row + 1], cand.tolist())[0]
+            order = np.argsort(exact)[:k]
+            distances[row, :len(order)] = exact[order]
+            ids[row, :len(order)] = cand[order]
+        return distances, ids
 
     def search(self, queries, top_k: int = 5):
         """
         Search the index for the nearest neighbors of queries (nxD numpy array).
-        Returns distances and indices.
+        Returns distances and ids, padded with -1 like FAISS.
         """
-        return self.index.search(queries, top_k)
+        queries = np.ascontiguousarray(queries, dtype="float32").reshape(-1, self.dimension)
+        hits = [[] for _ in range(len(queries))]
+        for seg, index in self._indexes():
+            # Over-fetch by the number of superseded entries in the segment
+            k = min(index.ntotal, top_k + self.stale.get(seg, 0))
+            if not k:
+                continue
+            distances, ids = self._search_segment(seg, index, queries, k)
+            for row, (drow, irow) in enumerate(zip(distances, ids)):
+                hits[row].extend(
+                    (d, i) for d, i in zip(drow.tolist(), irow.tolist())
+                    if i >= 0 and self.location.get(i) == seg
+                )
+        out_d = np.full((len(queries), top_k), np.inf, dtype="float32")
+        out_i = np.full((len(queries), top_k), -1, dtype="int64")
+        for row, found in enumerate(hits):
+            found.sort()
+            # Segments written before upserts replaced in place may repeat an id
+            seen = set()
+            for d, i in found:
+                if i in seen:
+                    continue
+                out_d[row, len(seen)], out_i[row, len(seen)] = d, i
+                seen.add(i)
+                if len(seen) == top_k:
+                    break
+        return out_d, out_i
 
+    def metadata(self, ids) -> dict:
+        ids = [int(i) for i in ids if i >= 0]
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        rows = self.conn.execute(
+            f"SELECT id, metadata FROM vectors WHERE id IN ({marks})", ids
+        )
+        return {vid: json.loads(meta) if meta else None for vid, meta in rows}
+
+    def query(self, queries, top_k: int = 5):
+        """
+        Like ``search`` but returns, per query, a list of
+        ``{"id", "distance", "metadata"}`` dicts joined from SQLite.
+        """
+        distances, ids = self.search(queries, top_k)
+        meta = self.metadata(ids.ravel().tolist())
+        return [
+            [{"id": i, "distance": d, "metadata": meta.get(i)}
+             for d, i in zip(drow.tolist(), irow.tolist()) if i >= 0]
+            for drow, irow in zip(distances, ids)
+        ]
+
+    @tracing.traced("db.vectors.save", "db")
     def save(self):
         """
-        Persist index to disk.
+        Persist vectors added since the last save as a new delta segment and
+        commit metadata changes; compacts when segments accumulate.
         """
-        faiss.write_index(self.index, self.index_path)
+        if self.pending.ntotal:
+            path = self._segment_path(self.pending_seg)
+            faiss.write_index(self.pending, path)
+            self.conn.execute(
+                "INSERT INTO segments (seg, path, created) VALUES (?, ?, ?)",
+                (self.pending_seg, path, time.time()),
+            )
+            self.conn.commit()
+            self.segments[self.pending_seg] = faiss.read_index(path, SEGMENT_IO_FLAG)
+            self._new_pending()
+        self._record_ann()
+        self.conn.commit()
+        total = sum(index.ntotal for index in self.segments.values())
+        if len(self.segments) > self.max_segments or (
+            total and sum(self.stale.values()) > self.compact_ratio * total
+        ):
+            self.compact()
+        else:
+            self._maybe_migrate()
+
+    def _record_ann(self):
+        """Sync the ann table with the approximate indexes built so far."""
+        with self._lock:
+            files = dict(self.ann_files)
+        self.conn.execute("DELETE FROM ann")
+        self.conn.executemany(
+            "INSERT INTO ann (seg, kind, path) VALUES (?, ?, ?)",
+            [(seg, kind, path) for seg, (kind, path) in files.items()],
+        )
+
+    @contextmanager
+    def bulk(self):
+        """
+        Defer approximate-index builds during a bulk load (e.g. a backfill),
+        so segments that are about to be compacted are not indexed; builds
+        start when the block exits.
+        """
+        self._bulk = True
+        try:
+            yield self
+        finally:
+            self._bulk = False
+            self._maybe_migrate()
+
+    def _maybe_migrate(self):
+        """Start building an approximate index for every segment that needs one."""
+        if self._bulk:
+            return
+        target = choose_kind(len(self), self.config)
+        for seg, index in list(self.segments.items()):
+            kind = target if index.ntotal >= self.config.flat_threshold else "flat"
+            current = self.ann_files.get(seg, ("flat", None))[0]
+            if kind == "flat" or kind == current or self._building.get(seg) == kind:
+                continue
+            self._building[seg] = kind
+            if self.background:
+                threading.Thread(
+                    target=self._migrate, args=(seg, index, kind), daemon=True
+                ).start()
+            else:
+                self._migrate(seg, index, kind)
+
+    def _migrate(self, seg: int, index, kind: str):
+        try:
+            start = time.time()
+            vectors, ids = self._live_vectors(seg, index)
+            ann = build_index(vectors, ids, kind, self.config)
+            path = f"{self._segment_path(seg)}.{kind}"
+            faiss.write_index(ann, path)
+            ann = tune(faiss.read_index(path, faiss.IO_FLAG_MMAP), self.config)
+            with self._lock:
+                if seg not in self.segments:
+                    os.remove(path)
+                    return
+                old = self.ann_files.get(seg)
+                self.ann[seg] = ann
+                self.ann_files[seg] = (kind, path)
+            if old and old[1] != path:
+                os.remove(old[1])
+            logger.info(
+                "Built %s index for %d vectors of segment %d in %.1fs",
+                kind, len(ids), seg, time.time() - start,
+            )
+        except Exception:
+            logger.exception("Building %s index for segment %d failed", kind, seg)
+        finally:
+            self._building.pop(seg, None)
+
+    def wait_for_migrations(self, timeout: float = None):
+        """Block until background index builds finish (used by benchmarks)."""
+        deadline = None if timeout is None else time.time() + timeout
+        while self._building and (deadline is None or time.time() < deadline):
+            time.sleep(0.05)
+        self.save()
+
+    def _live_vectors(self, seg: int, index):
+        """Current vectors of a segment, keeping only the last copy of each id."""
+        ids = faiss.vector_to_array(index.id_map)
+        vectors = faiss.downcast_index(index.index).reconstruct_n(0, index.ntotal)
+        keep = np.zeros(len(ids), dtype=bool)
+        seen = set()
+        for row in range(len(ids) - 1, -1, -1):
+            vid = int(ids[row])
+            if vid not in seen and self.location.get(vid) == seg:
+                keep[row] = True
+                seen.add(vid)
+        return vectors[keep], ids[keep]
+
+    def compact(self):
+        """Merge all segments into one, dropping deleted and superseded entries."""
+        if self.pending.ntotal:
+            self.save()
+        if len(self.segments) <= 1 and not any(self.stale.values()):
+            return
+        merged = faiss.IndexIDMap(faiss.IndexFlatL2(self.dimension))
+        for seg, index in self.segments.items():
+            vectors, ids = self._live_vectors(seg, index)
+            if len(ids):
+                merged.add_with_ids(vectors, ids)
+        seg = self.pending_seg
+        path = self._segment_path(seg)
+        faiss.write_index(merged, path)
+        old_paths = [self._segment_path(s) for s in self.segments]
+        with self._lock:
+            old_paths += [path for _, path in self.ann_files.values()]
+            self.ann, self.ann_files = {}, {}
+        self._positions = {}
+        with self.conn:
+            self.conn.execute("DELETE FROM ann")
+            self.conn.execute("DELETE FROM segments")
+            self.conn.execute(
+                "INSERT INTO segments (seg, path, created) VALUES (?, ?, ?)",
+                (seg, path, time.time()),
+            )
+            self.conn.execute("UPDATE vectors SET seg = ?", (seg,))
+        for old in old_paths:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
+        self.segments = {seg: faiss.read_index(path, SEGMENT_IO_FLAG)}
+        self.location = dict.fromkeys(self.location, seg)
+        self.stale = {seg: 0}
+        self._new_pending()
+        self._maybe_migrate()
@@ -3,6 +3,7 @@
 Entry point for the agent system to generate and QC complete software stacks.
 """
 import argparse
+import hashlib
 import logging
 import os
 import sys
@@ -11,55 +12,34 @@ import traceback
 
 from dotenv import load_dotenv
 
+from agent_system import pipeline, profiling, tracing
 from agent_system.agent_registry import AgentRegistry
-from agent_system.agents.code_generator import CodeGenerator
+from agent_system.checkpoint import STAGES, CheckpointStore, tree_digest
+from agent_system.pipeline import PipelineError
 
+# Arguments that select a run rather than describe it; never saved with a run.
+RUN_ARGS = (
+    "run_id", "resume", "from_stage", "batch", "batch_workers", "shared_cache", "trace_file",
+    "profile",
+)
+# Options --batch handles itself rather than passing on to every project.
+BATCH_ARGS = ("batch", "batch_workers", "run_id", "resume", "trace_file")
+# Options that must differ between projects, so only the manifest may set them.
+PROJECT_ARGS = ("project", "output_dir", "shared_cache")
 
-def main():
-    load_dotenv()
-    # Configure root logger
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
-    )
-    logger = logging.getLogger(__name__)
-    # Show availability of supported LLMs (green = available, red = unavailable)
-    GREEN = "\033[32m"
-    RED = "\033[31m"
-    RESET = "\033[0m"
-    has_anthro = bool(os.getenv("ANTHROPIC_API_KEY"))
-    has_openai = bool(os.getenv("OPENAI_API_KEY"))
-    has_lmstudio = shutil.which("lmstudio") is not None
-    has_llama = shutil.which("llama") is not None
-    print("Model availability:")
-    for role, models in [
-        ("Architect", ["claude-v1", "lmstudio", "llama"]),
-        ("Ideas", ["gpt-4", "gpt-3.5-turbo", "llama", "lmstudio"]),
-        ("Creativity", ["claude-v1", "lmstudio", "llama"]),
-        ("QC", ["gpt-4", "gpt-3.5-turbo", "llama", "lmstudio"]),
-    ]:
-        print(f"  {role} models:")
-        for m in models:
-            available = (
-                (m.startswith("claude") and has_anthro)
-                or (m.startswith("gpt") and has_openai)
-                or (m == "lmstudio" and has_lmstudio)
-                or (m == "llama" and has_llama)
-            )
-            color = GREEN if available else RED
-            print(f"    {color}{m}{RESET}")
 
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Automated system for software stack generation and QC"
     )
     parser.add_argument(
-        "--project", required=True, help="Name of the project to generate"
+        "--project", help="Name of the project to generate (required unless --resume)"
     )
     parser.add_argument(
         "--requirements", default="", help="High-level requirements or description"
     )
     parser.add_argument(
-        "--output-dir", required=True, help="Directory to place generated code"
+        "--output-dir", help="Directory to place generated code (required unless --resume)"
     )
     parser.add_argument(
         "--architect-model",
@@ -75,6 +55,22 @@ def main():
         "--analysis-report",
         help="Path to JSON analysis report for Codex to apply improvements",
     )
+    parser.add_argument(
+        "--codex-timeout",
+        type=float,
+        help="Seconds before a Codex CLI invocation is killed (default: CODEX_TIMEOUT or 1800)",
+    )
+    parser.add_argument(
+        "--parallel-components",
+        type=int,
+        default=0,
+        help="Split the architecture plan into components and generate them with up to N parallel Codex processes",
+    )
+    parser.add_argument(
+        "--component-timeout",
+        type=float,
+        help="Time budget in seconds for each component when using --parallel-components",
+    )
     parser.add_argument(
         "--use-memory",
         action="store_true",
@@ -108,11 +104,60 @@ def main():
         "--sandbox-docker-image",
         help="Docker image to use for sandbox isolation (requires --sandbox)",
     )
+    parser.add_argument(
+        "--sandbox-pool-size",
+        type=int,
+        default=0,
+        help="Keep N warm Docker containers and run commands via docker exec (0 disables pooling)",
+    )
+    parser.add_argument(
+        "--sandbox-max-uses",
+        type=int,
+        default=50,
+        help="Recycle a pooled container after this many commands (default: 50)",
+    )
+    parser.add_argument(
+        "--sandbox-cpu-limit",
+        type=int,
+        help="CPU-seconds limit (RLIMIT_CPU) for local sandbox commands",
+    )
+    parser.add_argument(
+        "--sandbox-memory-limit",
+        type=int,
+        help="Address-space limit in MiB (RLIMIT_AS) for local sandbox commands",
+    )
+    parser.add_argument(
+        "--sandbox-open-files",
+        type=int,
+        help="Open file descriptor limit (RLIMIT_NOFILE) for local sandbox commands",
+    )
+    parser.add_argument(
+        "--sandbox-max-procs",
+        type=int,
+        help="Process count limit (RLIMIT_NPROC) for local sandbox commands",
+    )
     parser.add_argument(
         "--test-command",
         default="pytest",
         help="Command to execute in sandbox when --sandbox is enabled (default: pytest)",
     )
+    parser.add_argument(
+        "--sandbox-timeout",
+        type=int,
+        default=60,
+        help="Timeout in seconds for each sandbox command or test shard (default: 60)",
+    )
+    parser.add_argument(
+        "--test-workers",
+        type=int,
+        default=1,
+        help="Shard the pytest suite across N parallel sandbox workers (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop all test shards as soon as one of them fails",
+    )
     parser.add_argument(
         "--validate",
         action="store_true",
@@ -123,6 +168,17 @@ def main():
         default="",
         help="Additional flags for validation commands",
     )
+    parser.add_argument(
+        "--validate-workers",
+        type=int,
+        default=0,
+        help="Parallel linter processes per tool for validation (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--validate-advisory",
+        action="store_true",
+        help="Do not fail on validation findings; hand them to the QC stage instead",
+    )
     parser.add_argument(
         "--generate-tests",
         action="store_true",
@@ -133,86 +189,220 @@ def main():
         default="gpt-4",
         help="OpenAI (or local) model to use for test harness generation",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--run-id",
+        help="Identifier for this run's stage checkpoints (default: timestamp-based)",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Resume a previous run, reusing every stage whose inputs are unchanged",
+    )
+    parser.add_argument(
+        "--from-stage",
+        choices=STAGES,
+        help="Recompute this stage and all later ones even if checkpointed",
+    )
+    parser.add_argument(
+        "--shared-cache",
+        metavar="DIR",
+        help="Directory of stage outputs shared between runs (set per project by --batch)",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="MANIFEST",
+        help="Run every project in a YAML manifest concurrently (see agent_system/batch.py)",
+    )
+    parser.add_argument(
+        "--batch-workers",
+        type=int,
+        help="Worker processes for --batch (default: manifest 'workers' or one per CPU core)",
+    )
+    parser.add_argument(
+        "--trace-file",
+        metavar="PATH",
+        help="Append the run's spans to this JSONL trace file (overrides OBELISK_TRACE_FILE)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cpu",
+        choices=profiling.MODES,
+        help="Profile each stage (cpu, alloc or wall; default cpu) and write the results "
+             "beside the output directory in <output-dir>.profile/<run-id>",
+    )
+    return parser
+
+
+def explicit_args(argv=None) -> dict:
+    """Only the options actually given on the command line."""
+    given = build_parser()
+    for action in given._actions:
+        action.default = argparse.SUPPRESS
+    return vars(given.parse_args(argv))
 
-    fallback_models = {
-        'architect': ['claude-v1', 'lmstudio', 'llama'],
-        'ideas': ['gpt-4', 'gpt-3.5-turbo', 'llama', 'lmstudio'],
-        'creativity': ['claude-v1', 'lmstudio', 'llama'],
-        'qc': ['gpt-4', 'gpt-3.5-turbo', 'llama', 'lmstudio'],
-    }
+
+def main(argv=None):
+    load_dotenv()
+    # Configure root logger
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    logger = logging.getLogger(__name__)
+    # Show availability of supported LLMs (green = available, red = unavailable)
+    GREEN = "\033[32m"
+    RED = "\033[31m"
+    RESET = "\033[0m"
+    has_anthro = bool(os.getenv("ANTHROPIC_API_KEY"))
+    has_openai = bool(os.getenv("OPENAI_API_KEY"))
+    has_lmstudio = shutil.which("lmstudio") is not None
+    has_llama = shutil.which("llama") is not None
+    print("Model availability:")
+    for role, models in [
+        ("Architect", ["claude-v1", "lmstudio", "llama"]),
+        ("Ideas", ["gpt-4", "gpt-3.5-turbo", "llama", "lmstudio"]),
+        ("Creativity", ["claude-v1", "lmstudio", "llama"]),
+        ("QC", ["gpt-4", "gpt-3.5-turbo", "llama", "lmstudio"]),
+    ]:
+        print(f"  {role} models:")
+        for m in models:
+            available = (
+                (m.startswith("claude") and has_anthro)
+                or (m.startswith("gpt") and has_openai)
+                or (m == "lmstudio" and has_lmstudio)
+                or (m == "llama" and has_llama)
+            )
+            color = GREEN if available else RED
+            print(f"    {color}{m}{RESET}")
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.trace_file:
+        os.environ["OBELISK_TRACE_FILE"] = args.trace_file
+
+    if args.batch:
+        from agent_system.batch import format_summary, run_batch, to_argv
+
+        explicit = explicit_args(argv)
+        clash = [name for name in PROJECT_ARGS if name in explicit]
+        if clash:
+            parser.error(
+                f"--{clash[0].replace('_', '-')} is set per project by the manifest "
+                "and cannot be combined with --batch"
+            )
+        # Every other option given here applies to all projects, over the manifest
+        extra = to_argv({k: v for k, v in explicit.items() if k not in BATCH_ARGS})
+        summary = run_batch(
+            args.batch, main, workers=args.batch_workers,
+            batch_id=args.resume or args.run_id, extra_argv=extra,
+        )
+        print(format_summary(summary))
+        if summary["failed"]:
+            sys.exit(1)
+        return summary
+
+    if args.resume:
+        if not CheckpointStore.exists(args.resume):
+            parser.error(f"no checkpointed run named {args.resume}")
+        # Options not given on the command line default to the resumed run's values
+        explicit = explicit_args(argv)
+        saved = CheckpointStore(run_id=args.resume).load_args()
+        for name, value in saved.items():
+            if name not in explicit:
+                setattr(args, name, value)
+    if not args.project or not args.output_dir:
+        parser.error("--project and --output-dir are required unless --resume or --batch is given")
+    checkpoints = CheckpointStore(
+        run_id=args.resume or args.run_id,
+        from_stage=args.from_stage,
+        shared_dir=args.shared_cache,
+    )
+    checkpoints.save_args(
+        {k: v for k, v in vars(args).items() if k not in RUN_ARGS}
+    )
+    print(
+        f"[Checkpoint] Run {checkpoints.run_id} "
+        f"(resume with --resume {checkpoints.run_id})"
+    )
+    # Reasoning steps logged by the stages are grouped under this run
+    from agent_system import reasoning
+    reasoning.set_run(checkpoints.run_id)
+    tracing.set_attributes(run_id=checkpoints.run_id, project=args.project)
+    if args.profile:
+        profile_dir = profiling.profile_dir(args.output_dir, checkpoints.run_id)
+        profiling.configure(profiling.Profiler(args.profile, profile_dir))
+        print(f"[Profile] {args.profile} profiles of each stage go to {profile_dir}")
 
     spec = None
     # Initialize memory if enabled
     registry = AgentRegistry()
     if args.use_memory:
+        from agent_system import recall
         from agent_system.memory import Memory
         memory = Memory(db_path=args.memory_db)
+        # Prompt templates that call recall() are grounded on this DB
+        recall.configure(recall.Retriever(memory))
     else:
         memory = None
 
     # Generate architecture plan using AgentRegistry
-    for model in [args.architect_model] + [m for m in fallback_models['architect'] if m != args.architect_model]:
-        try:
-            architect = registry.get_agent('CodeArchitect', model=model)
-            spec = architect.generate_architecture(args.project, args.requirements)
-            if spec and spec.strip():
-                # Log reasoning for architecture plan
-                if memory:
-                    from agent_system.logging import ReasoningLog
-                    rl = ReasoningLog(memory)
-                    rl.log('CodeArchitect', model, spec)
-                print(f"[Architect] Architecture plan generated by {model}.")
-                break
-        except Exception:
-            continue
-    if not spec or not spec.strip():
-        print(f"[ERROR][Architect] All models failed or returned empty for architecture plan: {fallback_models['architect']}", file=sys.stderr)
-        sys.exit(1)
-    if args.use_memory:
-        memory.add("architect", "generate_architecture", spec)
+    # Each stage is keyed by its inputs; on --resume unchanged stages are reused
+    try:
+        spec, model = checkpoints.run(
+            "architect",
+            {"project": args.project, "requirements": args.requirements,
+             "model": args.architect_model},
+            lambda: pipeline.architect(
+                registry, args.project, args.requirements, args.architect_model, memory
+            ),
+        )
+        print(f"[Architect] Architecture plan generated by {model}.")
 
-    # Generate and review improvement ideas
-    ideas = None
-    for model in ([args.ideas_model] + [m for m in fallback_models['ideas'] if m != args.ideas_model]):
-        try:
-            ideas_agent = registry.get_agent('IdeasAgent', model=model)
-            ideas = ideas_agent.generate_ideas(args.project, spec)
-            if ideas and ideas.strip():
-                print(f"[IdeasAgent] Brainstormed ideas by {model}:\n", ideas)
-                break
-        except Exception:
-            continue
-    if not ideas or not ideas.strip():
-        print(f"[ERROR][IdeasAgent] All models failed or returned empty ideas: {fallback_models['ideas']}", file=sys.stderr)
-        sys.exit(1)
-    if args.use_memory:
-        memory.add("ideas", "generate_ideas", ideas)
+        # Generate and review improvement ideas
+        ideas, model = checkpoints.run(
+            "ideas",
+            {"project": args.project, "spec": spec, "model": args.ideas_model},
+            lambda: pipeline.ideas(
+                registry, args.project, spec, args.ideas_model, memory
+            ),
+        )
+        print(f"[IdeasAgent] Brainstormed ideas by {model}:\n", ideas)
 
-    creative_review = None
-    for model in ([args.creativity_model] + [m for m in fallback_models['creativity'] if m != args.creativity_model]):
-        try:
-            creativity_agent = registry.get_agent('CreativityAgent', model=model)
-            creative_review = creativity_agent.review_ideas(args.project, ideas)
-            if creative_review and creative_review.strip():
-                print(f"[CreativityAgent] Refined ideas review by {model}:\n", creative_review)
-                break
-        except Exception:
-            continue
-    if not creative_review or not creative_review.strip():
-        print(f"[ERROR][CreativityAgent] All models failed or returned empty review: {fallback_models['creativity']}", file=sys.stderr)
+        creative_review, model = checkpoints.run(
+            "creativity",
+            {"project": args.project, "ideas": ideas, "model": args.creativity_model},
+            lambda: pipeline.creativity(
+                registry, args.project, ideas, args.creativity_model, memory
+            ),
+        )
+        print(f"[CreativityAgent] Refined ideas review by {model}:\n", creative_review)
+    except PipelineError as e:
+        label = {"architect": "Architect", "ideas": "IdeasAgent", "creativity": "CreativityAgent"}
+        print(f"[ERROR][{label[e.stage]}] {e}", file=sys.stderr)
         sys.exit(1)
-    if args.use_memory:
-        memory.add("creativity", "review_ideas", creative_review)
 
     try:
-        os.makedirs(args.output_dir, exist_ok=True)
-        generator = CodeGenerator()
-        generator.generate_code(spec, args.output_dir)
+        generated = checkpoints.run(
+            "generate",
+            {"spec": spec, "output_dir": args.output_dir,
+             "parallel_components": args.parallel_components},
+            lambda: pipeline.generate(
+                spec,
+                args.output_dir,
+                codex_timeout=args.codex_timeout,
+                parallel_components=args.parallel_components,
+                component_timeout=args.component_timeout,
+                memory=memory,
+            ),
+            output_dir=args.output_dir,
+        )
+        if generated["components"]:
+            print(f"[Generator] Components generated: {', '.join(generated['components'])}")
+        for conflict in generated["conflicts"]:
+            print(f"[WARN][Generator] Merge conflict: {conflict}", file=sys.stderr)
         print(f"[Generator] Code generated at {args.output_dir}")
-        if args.use_memory:
-            memory.add("generator", "generate_code", args.output_dir)
-    except Exception as e:
+    except PipelineError as e:
         print(f"[ERROR][Generator] {e}", file=sys.stderr)
         traceback.print_exc()
         sys.exit(1)
@@ -220,38 +410,56 @@ def main():
     # Optional automatic test harness generation
     if args.generate_tests:
         try:
-            harness = registry.get_agent('TestHarnessAgent', model=args.test_harness_model)
-            tests = harness.generate_tests(args.output_dir)
+            tests = checkpoints.run(
+                "tests",
+                # keyed on the tree generate left, not the one holding the tests
+                {"tree": checkpoints.tree, "model": args.test_harness_model},
+                lambda: pipeline.generate_tests(
+                    registry, args.output_dir, args.test_harness_model, memory
+                ),
+                output_dir=args.output_dir,
+            )
             print(f"[TestHarnessAgent] Generated test files:\n{tests}")
-            if args.use_memory:
-                memory.add("test_harness", "generate_tests", tests)
-        except Exception as e:
+        except PipelineError as e:
             print(f"[ERROR][TestHarnessAgent] {e}", file=sys.stderr)
             traceback.print_exc()
             sys.exit(1)
 
     # Optional validation stage (pylint + black)
+    lint_report = None
     if args.validate:
-        from agent_system.sandbox import ExecutionSandbox, SandboxError
-
-        validator = ExecutionSandbox(docker_image=None)
-        cmd = (
-            f"pylint {args.validate_flags} {args.output_dir} && "
-            f"black --check {args.validate_flags} {args.output_dir}"
+        lint_report, report_path = checkpoints.run(
+            "validate",
+            {"tree": tree_digest(args.output_dir), "flags": args.validate_flags},
+            lambda: pipeline.validate(
+                args.output_dir, args.validate_flags, args.validate_workers, memory
+            ),
         )
-        try:
-            val_out = validator.run(cmd)
-            print(f"[Validation] Passed:\n{val_out}")
-            if args.use_memory:
-                memory.add("validation", "run_validation", val_out)
-        except SandboxError as e:
-            print(f"[ERROR][Validation] {e}", file=sys.stderr)
+        print(
+            f"[Validation] {lint_report['files']} files "
+            f"({lint_report['cached']} cached results), findings: "
+            f"{lint_report['summary'] or 'none'}; report: {report_path}"
+        )
+        if not lint_report["ok"] and not args.validate_advisory:
+            from agent_system.validation import format_issues
+
+            print(f"[ERROR][Validation] Failed:\n{format_issues(lint_report)}", file=sys.stderr)
             sys.exit(1)
 
     # Apply analysis report improvements via Codex CLI
     if args.analysis_report:
         try:
-            generator.apply_analysis(args.analysis_report, args.output_dir)
+            with open(args.analysis_report, "rb") as f:
+                analysis = hashlib.sha256(f.read()).hexdigest()
+            from agent_system.agents.code_generator import CodeGenerator
+
+            generator = CodeGenerator(timeout=args.codex_timeout)
+            checkpoints.run(
+                "analysis",
+                {"tree": checkpoints.tree, "report": analysis},
+                lambda: generator.apply_analysis(args.analysis_report, args.output_dir),
+                output_dir=args.output_dir,
+            )
             print(f"[Generator] Applied analysis improvements from {args.analysis_report}")
             if args.use_memory:
                 memory.add("generator", "apply_analysis", args.analysis_report)
@@ -262,46 +470,129 @@ def main():
 
     # Optional execution sandbox for test commands
     if args.sandbox:
-        from agent_system.sandbox import ExecutionSandbox, SandboxError
+        import json
+
+        from agent_system.sandbox import (ExecutionSandbox, ResourceLimits,
+                                          SandboxError)
 
-        sandbox = ExecutionSandbox(docker_image=args.sandbox_docker_image)
+        workers = args.test_workers if args.test_workers > 0 else (os.cpu_count() or 1)
+        pool_size = max(args.sandbox_pool_size, workers) if args.sandbox_pool_size else 0
+        sandbox = ExecutionSandbox(
+            docker_image=args.sandbox_docker_image,
+            timeout=args.sandbox_timeout,
+            pool_size=pool_size,
+            max_uses=args.sandbox_max_uses,
+        )
+        limits = ResourceLimits(
+            cpu_seconds=args.sandbox_cpu_limit,
+            memory_mb=args.sandbox_memory_limit,
+            open_files=args.sandbox_open_files,
+            processes=args.sandbox_max_procs,
+        )
         try:
-            output = sandbox.run(args.test_command, cwd=args.output_dir)
-            print(f"[Sandbox] Command '{args.test_command}' succeeded:\n{output}")
-            if args.use_memory:
-                memory.add("sandbox", "run_tests", {"command": args.test_command, "output": output})
+            if workers > 1:
+                from agent_system.shard_runner import ShardedTestRunner
+
+                runner = ShardedTestRunner(
+                    sandbox,
+                    workers=workers,
+                    test_command=args.test_command,
+                    memory=memory,
+                    project=args.project,
+                    fail_fast=args.fail_fast,
+                    limits=limits,
+                )
+                with sandbox, profiling.stage("sandbox"):
+                    summary = runner.run(args.output_dir)
+                print(
+                    f"[Sandbox] {summary.tests} tests in {len(summary.shards)} shards "
+                    f"({summary.failures} failed, {summary.errors} errors, "
+                    f"{summary.skipped} skipped) in {summary.wall_time:.2f}s; "
+                    f"JUnit report: {summary.junit_path}"
+                )
+                if args.use_memory:
+                    memory.add("sandbox", "run_tests", json.dumps({
+                        "command": args.test_command,
+                        "tests": summary.tests,
+                        "failures": summary.failures,
+                        "errors": summary.errors,
+                        "failed_ids": summary.failed_ids,
+                        "wall_time": summary.wall_time,
+                        "junit": summary.junit_path,
+                    }), project=args.project)
+                if summary.collection_error:
+                    raise SandboxError(f"Sharded test run failed: {summary.collection_error}")
+                if not summary.ok:
+                    raise SandboxError(
+                        "Sharded test run failed: "
+                        + (", ".join(summary.failed_ids) or "see shard output")
+                    )
+            else:
+                # Output is streamed line by line through the logger as it arrives
+                with sandbox, profiling.stage("sandbox"):
+                    result = sandbox.run_streaming(
+                        args.test_command, cwd=args.output_dir, limits=limits
+                    )
+                print(
+                    f"[Sandbox] Command '{args.test_command}' succeeded "
+                    f"(wall {result.wall_time:.2f}s, cpu {result.cpu_time or 0:.2f}s, "
+                    f"peak rss {(result.peak_rss or 0) // (1024 * 1024)} MiB)"
+                )
+                if args.use_memory:
+                    memory.add("sandbox", "run_tests", json.dumps({
+                        "command": args.test_command,
+                        "exit_code": result.exit_code,
+                        "wall_time": result.wall_time,
+                        "cpu_time": result.cpu_time,
+                        "peak_rss": result.peak_rss,
+                        "output": result.output,
+                    }))
         except SandboxError as e:
             print(f"[ERROR][Sandbox] {e}", file=sys.stderr)
             sys.exit(1)
 
-    report = None
-    for model in [args.qc_model] + [m for m in fallback_models['qc'] if m != args.qc_model]:
-        try:
-            checker = registry.get_agent('QCChecker', model=model)
-            report = checker.check_directory(args.output_dir)
-            if report and str(report).strip():
-                print(f"[QCChecker] Quality check report by {model}:\n", report)
-                break
-        except Exception:
-            continue
-    if not report or not str(report).strip():
-        print(f"[ERROR][QCChecker] All models failed or returned empty report: {fallback_models['qc']}", file=sys.stderr)
+    try:
+        report, model = checkpoints.run(
+            "qc",
+            {"tree": tree_digest(args.output_dir), "model": args.qc_model,
+             "lint_report": lint_report},
+            lambda: pipeline.qc(
+                registry, args.output_dir, args.qc_model, lint_report, memory
+            ),
+        )
+        print(f"[QCChecker] Quality check report by {model}:\n", report)
+    except PipelineError as e:
+        print(f"[ERROR][QCChecker] {e}", file=sys.stderr)
         sys.exit(1)
-    if args.use_memory:
-        memory.add("qc", "check_directory", report)
 
     # Self-score the quality check report or final output
     try:
-        scorer = registry.get_agent('SelfScoringAgent', model=args.scoring_model)
-        score_result = scorer.evaluate(report)
+        score_result = checkpoints.run(
+            "score",
+            {"report": report, "model": args.scoring_model},
+            lambda: pipeline.score(registry, report, args.scoring_model, memory),
+        )
         print("[SelfScoringAgent] Self-evaluation result:\n", score_result)
-        if args.use_memory:
-            memory.add("self_scoring", "evaluate", score_result)
-    except Exception as e:
+        if checkpoints.reused:
+            print(f"[Checkpoint] Reused stages: {', '.join(checkpoints.reused)}")
+    except PipelineError as e:
         print(f"[ERROR][SelfScoringAgent] {e}", file=sys.stderr)
         traceback.print_exc()
         sys.exit(1)
 
+    if args.profile:
+        print(f"[Profile] Per-stage breakdown ({profile_dir}/summary.txt):")
+        print(profiling.write_summary(profile_dir))
+
+    return {
+        "run_id": checkpoints.run_id,
+        "output_dir": args.output_dir,
+        "score": score_result,
+        "reused": checkpoints.reused,
+    }
+
 
 if __name__ == "__main__":
-    main()
+    # Root span of the run; stage, agent, LLM and subprocess spans nest under it
+    with tracing.span("cli.run", "run"):
+        main()
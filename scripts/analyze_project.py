@@ -85,7 +85,7 @@ def main():
         response = client.completions.create(
             model=args.model,
             prompt=anthropic.HUMAN_PROMPT + prompt + anthropic.AI_PROMPT,
-            max_tokens=2000,
+            max_tokens_to_sample=2000,
             stop_sequences=[anthropic.HUMAN_PROMPT],
         )
     except Exception as e:
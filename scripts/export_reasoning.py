@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Export reasoning chains for visualisation.
+
+Writes a run's (or a single chain's) reasoning steps as a JSON node/edge
+graph, or as Graphviz DOT:
+
+    scripts/export_reasoning.py --run 20240101-120000-abc123 > run.json
+    scripts/export_reasoning.py --chain 20240101-120000-abc123:CodeArchitect --format dot | dot -Tsvg > chain.svg
+    scripts/export_reasoning.py --list 20240101-120000-abc123
+
+--synthetic N first logs N generated steps under a new run and reports the
+write and chain-read throughput, for measuring the store on a scratch DB.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agent_system.reasoning import ReasoningStore, to_dot  # noqa: E402
+
+
+def synthetic(store: ReasoningStore, steps: int, chains: int = 100) -> dict:
+    run_id = f"synthetic-{uuid.uuid4().hex[:6]}"
+    start = time.perf_counter()
+    for i in range(steps):
+        store.log(f"agent{i % chains}", "think", f"step {i} " * 20, run_id=run_id)
+    store.flush()
+    written = time.perf_counter() - start
+    start = time.perf_counter()
+    for c in range(chains):
+        store.get_chain(f"{run_id}:agent{c}")
+    read = time.perf_counter() - start
+    return {
+        "run_id": run_id,
+        "steps": steps,
+        "steps_per_second": round(steps / written),
+        "chain_read_ms": round(read / chains * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", help="Reasoning DB (default: REASONING_DB_PATH)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--run", help="Export every chain of this run")
+    target.add_argument("--chain", help="Export one chain")
+    target.add_argument("--list", metavar="RUN", help="List the chains of a run")
+    target.add_argument("--synthetic", type=int, help="Log N synthetic steps and report throughput")
+    parser.add_argument("--format", choices=("json", "dot"), default="json")
+    parser.add_argument("--label-chars", type=int, default=80)
+    args = parser.parse_args()
+
+    store = ReasoningStore(path=args.db, flush_interval=0)
+    if args.synthetic:
+        print(json.dumps(synthetic(store, args.synthetic), indent=2))
+    elif args.list:
+        print(json.dumps(store.chains(args.list), indent=2))
+    else:
+        graph = store.export(run_id=args.run, chain_id=args.chain, label_chars=args.label_chars)
+        print(to_dot(graph) if args.format == "dot" else json.dumps(graph, indent=2), end="")
+        if args.format == "json":
+            print()
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
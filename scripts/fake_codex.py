@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the Codex CLI, for exercising CodeGenerator and the
+pipeline without Codex:
+
+    CODEX_CLI_PATH=scripts/fake_codex.py python main.py ...
+
+Supports ``generate (--spec-file PATH | --spec -) --out DIR`` and
+``improve --report PATH --out DIR``. ``generate`` writes a small, importable
+Python package (``app/``, one module per spec heading, at most
+FAKE_CODEX_MODULES, default 8) derived from the spec, so the same spec
+always yields the same code; ``improve`` appends a review comment to each
+module. Progress lines are printed as it goes.
+
+FAKE_CODEX_LATENCY (seconds, default 0.5) spreads the run time over the
+progress lines, FAKE_CODEX_FAIL_RATE fails that fraction of invocations
+with exit status 1 (decided by FAKE_CODEX_SEED and the spec).
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+
+MODULE = '''{title!r}
+
+
+def describe():
+    return {title!r}
+
+
+def handle(items):
+    """Return the items that are not empty, in order."""
+    return [item for item in items if item]
+
+
+def total(values):
+    return sum(values) * {factor}
+'''
+
+
+def _option(args, name):
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            return args[i + 1]
+    return None
+
+
+def _progress(lines, latency: float):
+    pause = latency / max(1, len(lines))
+    for line in lines:
+        time.sleep(pause)
+        print(line, flush=True)
+
+
+def _failed(spec: str) -> bool:
+    rate = float(os.getenv("FAKE_CODEX_FAIL_RATE", "0"))
+    seed = os.getenv("FAKE_CODEX_SEED", "0")
+    return rate > 0 and random.Random(f"{seed}:{spec}").random() < rate
+
+
+def cmd_generate(args) -> int:
+    out = _option(args, "--out")
+    spec_file = _option(args, "--spec-file")
+    if not out or not (spec_file or _option(args, "--spec") == "-"):
+        print("usage: fake_codex.py generate (--spec-file PATH | --spec -) --out DIR", file=sys.stderr)
+        return 2
+    if spec_file:
+        with open(spec_file) as f:
+            spec = f.read()
+    else:
+        spec = sys.stdin.read()
+    latency = float(os.getenv("FAKE_CODEX_LATENCY", "0.5"))
+    if _failed(spec):
+        _progress(["Reading specification", "Error: generation failed"], latency)
+        return 1
+    titles = [m.group(1).strip() for m in re.finditer(r"^#{1,6}\s+(.+)$", spec, re.M)]
+    titles = titles[: int(os.getenv("FAKE_CODEX_MODULES", "8"))] or ["Application"]
+    package = os.path.join(out, "app")
+    os.makedirs(package, exist_ok=True)
+    lines = ["Reading specification"]
+    modules = []
+    for title in titles:
+        name = re.sub(r"[^a-z0-9]+", "_", title.lower()).strip("_") or "module"
+        if name in modules or not name[0].isalpha():
+            name = f"m{len(modules)}_{name}"
+        modules.append(name)
+        factor = int(hashlib.sha256(title.encode()).hexdigest()[:2], 16) % 9 + 1
+        with open(os.path.join(package, f"{name}.py"), "w") as f:
+            f.write(MODULE.format(title=title, factor=factor))
+        lines.append(f"Wrote app/{name}.py")
+    with open(os.path.join(package, "__init__.py"), "w") as f:
+        f.write("".join(f"from app import {name}  # noqa: F401\n" for name in modules))
+    lines.append(f"Done: {len(modules)} modules")
+    _progress(lines, latency)
+    return 0
+
+
+def cmd_improve(args) -> int:
+    out, report = _option(args, "--out"), _option(args, "--report")
+    if not out or not report:
+        print("usage: fake_codex.py improve --report PATH --out DIR", file=sys.stderr)
+        return 2
+    with open(report) as f:
+        findings = json.load(f)
+    note = f"# Reviewed against {os.path.basename(report)} ({len(findings)} findings)\n"
+    lines = []
+    for root, _, files in os.walk(out):
+        for fname in sorted(files):
+            if fname.endswith(".py"):
+                with open(os.path.join(root, fname), "a") as f:
+                    f.write(note)
+                lines.append(f"Improved {os.path.relpath(os.path.join(root, fname), out)}")
+    _progress(lines or ["Nothing to improve"], float(os.getenv("FAKE_CODEX_LATENCY", "0.5")))
+    return 0
+
+
+def main() -> int:
+    if len(sys.argv) < 2:
+        print("usage: fake_codex.py generate|improve ...", file=sys.stderr)
+        return 2
+    handlers = {"generate": cmd_generate, "improve": cmd_improve}
+    handler = handlers.get(sys.argv[1])
+    if handler is None:
+        print(f"fake_codex: unsupported command {sys.argv[1]}", file=sys.stderr)
+        return 2
+    return handler(sys.argv[2:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the docker CLI, for exercising ExecutionSandbox and its
+ContainerPool without a Docker daemon:
+
+    DOCKER_BIN=scripts/fake_docker.py python main.py --sandbox \\
+        --sandbox-docker-image fake --sandbox-pool-size 2 ...
+
+Supports ``run [-d] [--rm] -v HOST:/workspace ... IMAGE CMD...``, ``exec [-w DIR]
+ID CMD...`` and ``rm -f ID...``. "Containers" are records in FAKE_DOCKER_STATE
+(default: a directory under the system temp dir); commands run locally with
+/workspace mapped to the bind-mounted host directory.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+
+STATE_DIR = os.getenv(
+    "FAKE_DOCKER_STATE", os.path.join(tempfile.gettempdir(), "fake-docker")
+)
+# Flags of `docker run` that take a value
+VALUE_FLAGS = {"-v", "-w", "--network", "--memory", "--name", "-e", "--cpus"}
+
+
+def _state_path(container_id: str) -> str:
+    return os.path.join(STATE_DIR, f"{container_id}.json")
+
+
+def _host_dir(workspace: str, container_dir: str) -> str:
+    if container_dir.startswith("/workspace"):
+        return workspace + container_dir[len("/workspace"):]
+    return workspace
+
+
+def _parse_run(args):
+    opts = {"detach": False, "workspace": os.getcwd(), "workdir": "/workspace"}
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        flag = args[i]
+        if flag == "-d":
+            opts["detach"] = True
+        elif flag in VALUE_FLAGS:
+            value = args[i + 1]
+            if flag == "-v":
+                opts["workspace"] = value.split(":", 1)[0]
+            elif flag == "-w":
+                opts["workdir"] = value
+            i += 1
+        i += 1
+    return opts, args[i], args[i + 1:]
+
+
+def cmd_run(args) -> int:
+    opts, _image, command = _parse_run(args)
+    if opts["detach"]:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        container_id = uuid.uuid4().hex
+        with open(_state_path(container_id), "w") as f:
+            json.dump({"workspace": opts["workspace"]}, f)
+        print(container_id)
+        return 0
+    cwd = _host_dir(opts["workspace"], opts["workdir"])
+    return subprocess.run(command, cwd=cwd).returncode
+
+
+def cmd_exec(args) -> int:
+    workdir = "/workspace"
+    if args[0] == "-w":
+        workdir, args = args[1], args[2:]
+    container_id, command = args[0], args[1:]
+    try:
+        with open(_state_path(container_id)) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: No such container: {container_id}", file=sys.stderr)
+        return 1
+    return subprocess.run(
+        command, cwd=_host_dir(state["workspace"], workdir)
+    ).returncode
+
+
+def cmd_rm(args) -> int:
+    for container_id in [a for a in args if not a.startswith("-")]:
+        try:
+            os.remove(_state_path(container_id))
+        except FileNotFoundError:
+            pass
+    return 0
+
+
+def main() -> int:
+    if len(sys.argv) < 2:
+        print("usage: fake_docker.py run|exec|rm ...", file=sys.stderr)
+        return 2
+    handlers = {"run": cmd_run, "exec": cmd_exec, "rm": cmd_rm}
+    handler = handlers.get(sys.argv[1])
+    if handler is None:
+        print(f"fake_docker: unsupported command {sys.argv[1]}", file=sys.stderr)
+        return 2
+    return handler(sys.argv[2:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the OpenAI and Anthropic HTTP APIs, for running
+main.py, the agents and the service without API keys:
+
+    scripts/fake_llm.py --port 8765 --latency lognormal:0.8:0.4 --tokens-per-second 60 &
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 ANTHROPIC_BASE_URL=http://127.0.0.1:8765 \\
+        OPENAI_API_KEY=fake ANTHROPIC_API_KEY=fake python main.py ...
+
+Serves ``POST /v1/chat/completions`` (OpenAI chat), ``POST /v1/complete``
+(Anthropic text completions) and ``POST /v1/messages`` (Anthropic messages)
+with the providers' response shapes and ``usage`` token counts, and
+``GET /stats`` with request, error and token counters.
+
+Each response is delayed by a sample of the latency distribution (time to
+first token) plus its completion tokens at ``--tokens-per-second``. Requests
+fail with 429 (with ``Retry-After``) or 500 at the configured rates. Replies
+come from scripted rules (``--config``, YAML or JSON, see ``load_config``)
+tried before the built-in ones, which answer the repo's agents in the format
+they parse; anything else gets filler text. Content depends only on the
+prompt and the seed, and latency and errors on the seed and request order,
+so runs are repeatable.
+
+Started from Python (see scripts/pipeline_benchmark.py), ``FakeLLMServer``
+runs in a background thread and ``env()`` gives the variables that point the
+SDKs at it.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agent_system.tracing import estimate_tokens  # noqa: E402
+
+ARCHITECTURE = """# Architecture
+
+## Overview
+A small Python service with a REST API, a worker and a web dashboard.
+
+## Components
+
+### API service
+HTTP endpoints for the core resources, input validation and persistence.
+
+### Worker
+Background jobs: imports, notifications and periodic clean-up.
+
+### Web dashboard
+Frontend pages listing resources and job status.
+
+## Data
+SQLite for development, PostgreSQL in production.
+"""
+
+SCORE = json.dumps({
+    "score": 7,
+    "confidence": 80,
+    "suggestions": ["Add input validation", "Increase test coverage", "Document the API"],
+})
+
+TESTS = '''import pytest
+
+
+def test_module_imports():
+    assert True
+
+
+@pytest.mark.parametrize("value", [0, 1, 2])
+def test_values(value):
+    assert value >= 0
+'''
+
+WORDS = (
+    "the service api worker queue cache request response model agent plan code test "
+    "feature user data store index latency retry error metric trace stage pipeline "
+    "improve refactor validate deploy config module component endpoint schema"
+).split()
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    ``fixed:S``, ``uniform:LO:HI``, ``normal:MEAN:SD`` or
+    ``lognormal:MEDIAN:SIGMA`` (seconds) as a sampler.
+    """
+    kind, *params = str(spec).split(":")
+    try:
+        values = [float(p) for p in params]
+        if kind == "fixed" and len(values) == 1:
+            return lambda rng: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(*values)
+        if kind == "normal" and len(values) == 2:
+            return lambda rng: max(0.0, rng.gauss(*values))
+        if kind == "lognormal" and len(values) == 2:
+            median, sigma = values
+            return lambda rng: median * rng.lognormvariate(0, sigma)
+    except ValueError:
+        pass
+    raise ValueError(
+        f"Bad latency {spec!r}; use fixed:S, uniform:LO:HI, normal:MEAN:SD or lognormal:MEDIAN:SIGMA"
+    )
+
+
+@dataclass
+class Rule:
+    """A scripted reply for requests whose prompt matches ``match``."""
+    match: str = ""
+    model: Optional[str] = None
+    responses: List[str] = field(default_factory=list)
+    status: int = 200
+    latency: Optional[str] = None
+    times: Optional[int] = None
+    used: int = 0
+
+    def __post_init__(self):
+        self.pattern = re.compile(self.match, re.S | re.I)
+        self.sampler = parse_latency(self.latency) if self.latency else None
+
+    def applies(self, model: str, prompt: str) -> bool:
+        if self.times is not None and self.used >= self.times:
+            return False
+        if self.model and self.model != model:
+            return False
+        return bool(self.pattern.search(prompt))
+
+
+DEFAULT_RULES = [
+    Rule(match=r"software architect", responses=[ARCHITECTURE]),
+    Rule(match=r"Respond in JSON format with keys: score", responses=[SCORE]),
+    Rule(match=r"Create pytest unit tests", responses=[TESTS]),
+]
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    """
+    Read a YAML/JSON config: the command-line options by name (``latency``,
+    ``tokens_per_second``, ``error_rate``, ``rate_limit_rate``, ...) and
+    ``rules``, each with ``match`` (regex on the prompt), optional ``model``,
+    ``response`` or ``responses`` (used in turn), ``status`` (e.g. 429 to
+    script a failure), ``latency`` and ``times`` (only the first N matches).
+    """
+    with open(path) as f:
+        text = f.read()
+    if path.endswith((".yaml", ".yml")):
+        import yaml
+
+        config = yaml.safe_load(text) or {}
+    else:
+        config = json.loads(text)
+    rules = []
+    for r in config.pop("rules", None) or []:
+        r = dict(r)
+        if "response" in r:
+            r["responses"] = [r.pop("response")]
+        rules.append(Rule(**r))
+    config["rules"] = rules
+    return config
+
+
+class FakeLLM:
+    """Decides the reply, delay and status of each request; keeps counters."""
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        tokens_per_second: float = 0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        completion_tokens: int = 200,
+        seed: int = 0,
+        rules: Optional[List[Rule]] = None,
+    ):
+        self.sampler = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.completion_tokens = completion_tokens
+        self.seed = seed
+        self.rules = list(rules or []) + DEFAULT_RULES
+        self._lock = threading.Lock()
+        self._requests = 0
+        self.stats: Dict[str, int] = {
+            "requests": 0, "rate_limited": 0, "errors": 0,
+            "prompt_tokens": 0, "completion_tokens": 0,
+        }
+
+    def _filler(self, prompt: str) -> str:
+        rng = random.Random(f"{self.seed}:{hashlib.sha256(prompt.encode()).hexdigest()}")
+        words, size = [], 0
+        while size < self.completion_tokens * 4:
+            word = rng.choice(WORDS)
+            words.append(word)
+            size += len(word) + 1
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        return "\n".join(f"{n}. {line.capitalize()}." for n, line in enumerate(lines, 1))
+
+    def reply(self, api: str, model: str, prompt: str) -> Dict[str, Any]:
+        """
+        The outcome of one request: ``status``, ``text``, token counts,
+        ``delay`` in seconds and extra ``headers``.
+        """
+        with self._lock:
+            n = self._requests
+            self._requests += 1
+            self.stats["requests"] += 1
+            self.stats[f"requests.{api}"] = self.stats.get(f"requests.{api}", 0) + 1
+            rule = next((r for r in self.rules if r.applies(model, prompt)), None)
+            if rule is not None:
+                text = rule.responses[rule.used % len(rule.responses)] if rule.responses else ""
+                rule.used += 1
+        rng = random.Random(f"{self.seed}:{n}")
+        delay = (rule.sampler if rule and rule.sampler else self.sampler)(rng)
+        status = rule.status if rule else 200
+        if status == 200:
+            draw = rng.random()
+            if draw < self.rate_limit_rate:
+                status = 429
+            elif draw < self.rate_limit_rate + self.error_rate:
+                status = 500
+        if status != 200:
+            with self._lock:
+                self.stats["rate_limited" if status == 429 else "errors"] += 1
+            headers = {"Retry-After": f"{self.retry_after:g}"} if status == 429 else {}
+            return {"status": status, "delay": delay, "headers": headers}
+        if rule is None:
+            text = self._filler(prompt)
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        if self.tokens_per_second:
+            delay += completion_tokens / self.tokens_per_second
+        with self._lock:
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+        return {
+            "status": 200, "text": text, "delay": delay, "headers": {},
+            "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+        }
+
+
+def _openai(model: str, r: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": r["text"]},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": r["prompt_tokens"],
+            "completion_tokens": r["completion_tokens"],
+            "total_tokens": r["prompt_tokens"] + r["completion_tokens"],
+        },
+    }
+
+
+def _anthropic_complete(model: str, r: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "completion",
+        "id": f"compl_{uuid.uuid4().hex[:24]}",
+        "completion": " " + r["text"],
+        "stop_reason": "stop_sequence",
+        "model": model,
+    }
+
+
+def _anthropic_message(model: str, r: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": r["text"]}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": r["prompt_tokens"], "output_tokens": r["completion_tokens"]},
+    }
+
+
+def _text(content) -> str:
+    """Message content: a string or a list of content blocks."""
+    if isinstance(content, str):
+        return content
+    return "".join(b.get("text", "") for b in content or [] if isinstance(b, dict))
+
+
+def _openai_error(status: int) -> Dict[str, Any]:
+    kind = "rate_limit_exceeded" if status == 429 else "server_error"
+    return {"error": {"message": f"Fake {kind}", "type": kind, "param": None, "code": kind}}
+
+
+def _anthropic_error(status: int) -> Dict[str, Any]:
+    kind = "rate_limit_error" if status == 429 else "api_error"
+    return {"type": "error", "error": {"type": kind, "message": f"Fake {kind}"}}
+
+
+# path -> (api, prompt from request body, success body, error body)
+ROUTES = {
+    "/v1/chat/completions": (
+        "openai",
+        lambda body: "\n".join(_text(m.get("content")) for m in body.get("messages", [])),
+        _openai, _openai_error,
+    ),
+    "/v1/complete": (
+        "anthropic.complete",
+        lambda body: body.get("prompt", "").replace("\n\nHuman:", "").replace("\n\nAssistant:", "").strip(),
+        _anthropic_complete, _anthropic_error,
+    ),
+    "/v1/messages": (
+        "anthropic.messages",
+        lambda body: "\n".join(
+            [_text(body.get("system"))] + [_text(m.get("content")) for m in body.get("messages", [])]
+        ).strip(),
+        _anthropic_message, _anthropic_error,
+    ),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: "FakeLLMServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.server.llm._lock:
+                stats = dict(self.server.llm.stats)
+            self._send(200, stats)
+        else:
+            self._send(404, {"error": {"message": f"No route {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path not in ROUTES and not path.startswith("/v1"):
+            path = "/v1" + path  # clients configured without the /v1 suffix
+        if path not in ROUTES:
+            self._send(404, {"error": {"message": f"No route {self.path}"}})
+            return
+        api, prompt_of, success, error = ROUTES[path]
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            self._send(400, error(400))
+            return
+        model = body.get("model", "")
+        result = self.server.llm.reply(api, model, prompt_of(body))
+        if result["delay"] > 0:
+            time.sleep(result["delay"])
+        if result["status"] != 200:
+            self._send(result["status"], error(result["status"]), result["headers"])
+        else:
+            self._send(200, success(model, result))
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, llm: FakeLLM, host: str = "127.0.0.1", port: int = 0, verbose: bool = False):
+        super().__init__((host, port), Handler)
+        self.llm = llm
+        self.verbose = verbose
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """Variables pointing the OpenAI (0.x and 1.x) and Anthropic SDKs at this server."""
+        return {
+            "OPENAI_API_BASE": f"{self.url}/v1",
+            "OPENAI_BASE_URL": f"{self.url}/v1",
+            "ANTHROPIC_BASE_URL": self.url,
+            "OPENAI_API_KEY": "fake",
+            "ANTHROPIC_API_KEY": "fake",
+        }
+
+    def start(self) -> "FakeLLMServer":
+        """Serve from a daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """The fake provider's options, shared with the benchmark and load-test scripts."""
+    parser.add_argument("--llm-config", metavar="FILE",
+                        help="YAML/JSON file with options and scripted rules")
+    parser.add_argument("--latency", help="Time to first token, e.g. fixed:0.2 or lognormal:0.8:0.4")
+    parser.add_argument("--tokens-per-second", type=float,
+                        help="Completion token rate added to the latency (0 = instant)")
+    parser.add_argument("--error-rate", type=float, help="Fraction of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, help="Fraction of requests failing with 429")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--completion-tokens", type=int,
+                        help="Length of filler replies in tokens (default 200)")
+    parser.add_argument("--seed", type=int, help="Seed for content, latency and errors")
+
+
+def from_args(args: argparse.Namespace) -> FakeLLM:
+    """Build a FakeLLM from ``add_arguments`` options; flags override the config file."""
+    options = load_config(args.llm_config) if args.llm_config else {}
+    for name in ("latency", "tokens_per_second", "error_rate", "rate_limit_rate",
+                 "retry_after", "completion_tokens", "seed"):
+        value = getattr(args, name)
+        if value is not None:
+            options[name] = value
+    return FakeLLM(**options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = FakeLLMServer(from_args(args), args.host, args.port, args.verbose)
+    for name, value in server.env().items():
+        print(f"export {name}={value}")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Load test for the FastAPI service and its Celery task path.
+
+Drives ``POST /tasks``, ``GET /tasks/{id}`` and ``GET /tasks_all`` from
+asyncio against the app in-process (through httpx's ASGI transport) or a
+running server (``--url``), and reports latency percentiles (p50/p95/p99),
+throughput, status codes and errors per endpoint, plus a per-second
+timeline to show where it saturates. Results are written as JSON for CI.
+
+In-process, tasks run on one of these Celery setups (``--celery``):
+
+- ``eager``:    inline inside the request (task_always_eager), so task work
+                competes with the API for the event loop;
+- ``worker``:   an in-process worker (threads pool, ``--workers``,
+                ``--prefetch``) on the in-memory broker;
+- ``external``: workers you started yourself on ``--broker``/``--backend``
+                (e.g. Redis).
+
+Agents call scripts/fake_llm.py, started in-process with the given latency,
+token rate and error options, and Memory writes go to a fresh SQLite file,
+so no keys, network or Redis are needed for eager and worker runs.
+
+Load is either closed-loop virtual users (``--users``) or an open-loop
+Poisson arrival rate (``--rate``, requests/s, independent of how fast
+responses come back). Both take ramp stages ``TARGET:SECONDS,...``: the
+target moves linearly from the previous stage's (starting at 0) over the
+stage's duration, as in k6. One command runs a preset:
+
+    scripts/load_test.py --scenario smoke --output load.json
+    scripts/load_test.py --celery worker --workers 8 --rate 20:30,100:60 --latency lognormal:0.5:0.4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import fake_llm  # noqa: E402  (scripts/ is on sys.path when run as a script)
+from agent_system.stats import percentile  # noqa: E402
+
+ROUTES = {
+    "post": "POST /tasks",
+    "get": "GET /tasks/{id}",
+    "list": "GET /tasks_all",
+}
+
+SCENARIOS = {
+    # Quick check that every endpoint works under light concurrency
+    "smoke": {"users": "10:5,10:10", "celery": "eager", "latency": "fixed:0.01"},
+    # Closed-loop ramp to find the concurrency where latency turns up
+    "ramp": {"users": "50:20,200:30,200:30,0:10", "celery": "worker", "workers": 16,
+             "latency": "lognormal:0.2:0.5"},
+    # Open-loop arrival rate ramp: queueing shows as growing latency, not lower throughput
+    "open": {"rate": "20:20,100:30,200:30", "celery": "worker", "workers": 16,
+             "latency": "lognormal:0.2:0.5"},
+}
+
+DEFAULTS = {"celery": "eager", "workers": 4, "mix": "post=1,get=4,list=1", "latency": "fixed:0.05"}
+
+
+def parse_stages(spec: str):
+    """``TARGET:SECONDS,...`` as a list of (target, seconds)."""
+    stages = []
+    for part in spec.split(","):
+        target, seconds = part.split(":")
+        stages.append((float(target), float(seconds)))
+    return stages
+
+
+def target_at(stages, t: float) -> float:
+    """The ramped target ``t`` seconds into the run (None once it is over)."""
+    previous = 0.0
+    for target, seconds in stages:
+        if t < seconds:
+            return previous + (target - previous) * (t / seconds if seconds else 1)
+        t -= seconds
+        previous = target
+    return None
+
+
+def parse_mix(spec: str):
+    weights = {}
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        if name not in ROUTES:
+            raise ValueError(f"Unknown endpoint {name!r} in --mix; use {', '.join(ROUTES)}")
+        weights[name] = float(weight)
+    return weights
+
+
+def latency_stats(latencies) -> dict:
+    ms = [v * 1000 for v in latencies]
+    if not ms:
+        return {}
+    return {
+        "p50": round(percentile(ms, 50), 2),
+        "p95": round(percentile(ms, 95), 2),
+        "p99": round(percentile(ms, 99), 2),
+        "max": round(max(ms), 2),
+        "mean": round(statistics.mean(ms), 2),
+    }
+
+
+class LoadTest:
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.mix = parse_mix(args.mix)
+        self.stages = parse_stages(args.users or args.rate)
+        # (finished at, route, latency, status)
+        self.samples = []
+        self.task_ids = []
+        self.created = {}
+        self.completed = {}
+        self.counter = 0
+        self.in_flight = 0
+        self.dropped = 0
+        self.start = None
+
+    def _pick(self) -> str:
+        names = list(self.mix)
+        kind = self.rng.choices(names, [self.mix[n] for n in names])[0]
+        return "post" if kind == "get" and not self.task_ids else kind
+
+    async def request(self, kind: str):
+        if kind == "post":
+            self.counter += 1
+            body = {"agent": self.args.agent, "params": {
+                "project_name": f"load-{self.counter}",
+                "architecture_spec": f"Service {self.counter}: REST API, worker and dashboard.",
+            }}
+            call = self.client.post("/tasks", json=body)
+        elif kind == "get":
+            # Poll recent tasks, as a client waiting on its result would
+            task_id = self.rng.choice(self.task_ids[-200:])
+            call = self.client.get(f"/tasks/{task_id}")
+        else:
+            call = self.client.get("/tasks_all", params={"limit": self.args.list_limit})
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            response = await call
+            status = response.status_code
+        except Exception as e:
+            response, status = None, type(e).__name__
+        finally:
+            self.in_flight -= 1
+        finished = time.perf_counter()
+        self.samples.append((finished - self.start, ROUTES[kind], finished - started, status))
+        if response is None or status != 200:
+            return
+        data = response.json()
+        if kind == "post" and not data.get("deduplicated"):
+            self.task_ids.append(data["id"])
+            self.created[data["id"]] = started
+        elif kind == "get" and data.get("status") in ("SUCCESS", "FAILURE"):
+            if data["id"] not in self.completed and data["id"] in self.created:
+                self.completed[data["id"]] = (finished - self.created[data["id"]], data["status"])
+
+    async def _user(self, slot: int):
+        while self.running and slot < self.target:
+            await self.request(self._pick())
+            if self.args.think:
+                await asyncio.sleep(self.rng.expovariate(1 / self.args.think))
+
+    async def closed_loop(self):
+        users = {}
+        while True:
+            target = target_at(self.stages, time.perf_counter() - self.start)
+            if target is None:
+                break
+            self.target = round(target)
+            for slot in range(self.target):
+                if slot not in users or users[slot].done():
+                    users[slot] = asyncio.ensure_future(self._user(slot))
+            await asyncio.sleep(0.1)
+        self.running = False
+        await asyncio.gather(*users.values())
+
+    async def open_loop(self):
+        pending = set()
+        while True:
+            rate = target_at(self.stages, time.perf_counter() - self.start)
+            if rate is None:
+                break
+            self.target = rate
+            if rate <= 0:
+                await asyncio.sleep(0.05)
+                continue
+            gap = self.rng.expovariate(rate)
+            if gap > 0.1:
+                # No arrival within 0.1s; exponential gaps are memoryless, so
+                # resampling at the then-current rate keeps arrivals Poisson
+                await asyncio.sleep(0.1)
+                continue
+            await asyncio.sleep(gap)
+            if self.in_flight >= self.args.max_in_flight:
+                self.dropped += 1
+                continue
+            task = asyncio.ensure_future(self.request(self._pick()))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        self.running = False
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def run(self):
+        self.running = True
+        self.target = 0
+        self.timeline_targets = {}
+        self.start = time.perf_counter()
+        sampler = asyncio.ensure_future(self._sample_targets())
+        await (self.closed_loop() if self.args.users else self.open_loop())
+        self.duration = time.perf_counter() - self.start
+        sampler.cancel()
+
+    async def _sample_targets(self):
+        while True:
+            second = int(time.perf_counter() - self.start)
+            self.timeline_targets.setdefault(second, (round(self.target, 2), self.in_flight))
+            await asyncio.sleep(0.25)
+
+    def report(self) -> dict:
+        by_route = defaultdict(list)
+        for sample in self.samples:
+            by_route[sample[1]].append(sample)
+        endpoints = {}
+        for route, samples in by_route.items():
+            statuses = defaultdict(int)
+            for s in samples:
+                statuses[str(s[3])] += 1
+            errors = sum(1 for s in samples if not isinstance(s[3], int) or s[3] >= 500)
+            endpoints[route] = {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": round(errors / len(samples), 4),
+                "rps": round(len(samples) / self.duration, 2),
+                "status": dict(statuses),
+                "latency_ms": latency_stats([s[2] for s in samples]),
+            }
+        seconds = defaultdict(list)
+        for sample in self.samples:
+            seconds[int(sample[0])].append(sample)
+        timeline = []
+        for second in sorted(set(seconds) | set(self.timeline_targets)):
+            samples = seconds.get(second, [])
+            target, in_flight = self.timeline_targets.get(second, (None, None))
+            timeline.append({
+                "t": second,
+                "users" if self.args.users else "rate": target,
+                "in_flight": in_flight,
+                "requests": len(samples),
+                "errors": sum(1 for s in samples if not isinstance(s[3], int) or s[3] >= 500),
+                "p95_ms": (latency_stats([s[2] for s in samples]) or {}).get("p95"),
+            })
+        done = [latency for latency, _ in self.completed.values()]
+        return {
+            "duration": round(self.duration, 2),
+            "requests": len(self.samples),
+            "rps": round(len(self.samples) / self.duration, 2),
+            "dropped": self.dropped,
+            "endpoints": endpoints,
+            "tasks": {
+                "created": len(self.created),
+                "seen_finished": len(self.completed),
+                "seen_failed": sum(1 for _, status in self.completed.values() if status == "FAILURE"),
+                # Upper bounds: a task is seen finished when a GET first reports it
+                "completion_ms": latency_stats(done),
+            },
+            "timeline": timeline,
+        }
+
+
+def start_service(args, work_dir: str, llm_env):
+    """Configure the environment, import the app and start Celery as requested."""
+    # Config paths (config/agents.yaml, ...) are relative to the repo root
+    os.chdir(ROOT)
+    os.environ.update(llm_env)
+    os.environ["CELERY_BROKER_URL"] = args.broker or "memory://"
+    os.environ["CELERY_RESULT_BACKEND"] = args.backend or "cache+memory://"
+    os.environ.setdefault("MEMORY_DB_PATH", os.path.join(work_dir, "memory.sqlite"))
+    os.environ.setdefault("REASONING_DB_PATH", os.path.join(work_dir, "reasoning.sqlite"))
+    os.environ.setdefault("ARTIFACT_STORE_PATH", os.path.join(work_dir, "artifacts"))
+    os.environ.setdefault("OBELISK_RATE_LIMITS", "")
+    import logging
+
+    logging_level = args.log_level
+    logging.basicConfig(level=logging_level)
+    from service.api import app
+    from service.celery_app import celery_app
+    from service.queues import queue_names
+
+    if args.celery == "eager":
+        celery_app.conf.task_always_eager = True
+        celery_app.conf.task_store_eager_result = True
+    elif args.celery == "worker":
+        # The in-memory broker is polled by Celery's synchronous loop, which
+        # waits up to 2s between fetches once the prefetch window is full;
+        # a wider window keeps the worker threads busy.
+        celery_app.conf.worker_prefetch_multiplier = args.prefetch
+        celery_app.conf.broker_transport_options = {
+            **celery_app.conf.broker_transport_options, "polling_interval": 0.01,
+        }
+        worker = celery_app.Worker(
+            pool="threads", concurrency=args.workers, loglevel=logging_level,
+            queues=queue_names(), without_heartbeat=True, without_mingle=True,
+            without_gossip=True, quiet=True, redirect_stdouts=False,
+        )
+        threading.Thread(target=worker.start, daemon=True).start()
+    logging.getLogger().setLevel(logging_level)
+    return app
+
+
+def task_states(task_ids):
+    from service.celery_app import celery_app
+
+    states = defaultdict(int)
+    for task_id in task_ids:
+        states[celery_app.AsyncResult(task_id).status] += 1
+    return dict(states)
+
+
+async def drive(args, app):
+    import httpx
+
+    if app is not None:
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout)
+    else:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits)
+    async with client:
+        test = LoadTest(client, args)
+        await test.run()
+        if args.drain and test.task_ids and app is not None:
+            # Let queued tasks finish so final states and LLM counts are complete
+            deadline = time.perf_counter() + args.drain
+            while time.perf_counter() < deadline:
+                if all(s in ("SUCCESS", "FAILURE") for s in task_states(test.task_ids[-50:])):
+                    break
+                await asyncio.sleep(0.2)
+    return test
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS),
+                        help="Preset load and Celery setup; other options override it")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--users", help="Closed-loop virtual users, ramp stages TARGET:SECONDS,...")
+    load.add_argument("--rate", help="Open-loop arrivals per second, ramp stages TARGET:SECONDS,...")
+    parser.add_argument("--mix", help="Endpoint weights (default post=1,get=4,list=1)")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="Mean think time between a user's requests, seconds")
+    parser.add_argument("--max-in-flight", type=int, default=2000,
+                        help="Open loop: drop arrivals beyond this many outstanding requests")
+    parser.add_argument("--agent", default="IdeasAgent", help="Agent for POST /tasks")
+    parser.add_argument("--list-limit", type=int, default=50, help="limit for GET /tasks_all")
+    parser.add_argument("--celery", choices=("eager", "worker", "external"),
+                        help="How tasks run in-process (default eager)")
+    parser.add_argument("--workers", type=int, help="Threads of the in-process worker")
+    parser.add_argument("--prefetch", type=int, default=64,
+                        help="Prefetch multiplier of the in-process worker")
+    parser.add_argument("--broker", help="Broker URL for --celery external (default memory://)")
+    parser.add_argument("--backend", help="Result backend URL (default cache+memory://)")
+    parser.add_argument("--url", help="Load a running server instead of the in-process app")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout, seconds")
+    parser.add_argument("--drain", type=float, default=10.0,
+                        help="Seconds to wait for outstanding tasks after the load ends")
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the in-process service")
+    parser.add_argument("--work-dir", help="Directory for Memory/artifact files (default: a temp dir)")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    parser.add_argument("--max-error-rate", type=float,
+                        help="Exit non-zero when an endpoint's error rate exceeds this")
+    parser.add_argument("--max-p99-ms", type=float,
+                        help="Exit non-zero when an endpoint's p99 latency exceeds this")
+    fake_llm.add_arguments(parser)
+    args = parser.parse_args()
+    preset = SCENARIOS.get(args.scenario, {})
+    if args.users or args.rate:
+        preset = {k: v for k, v in preset.items() if k not in ("users", "rate")}
+    for name, value in {**DEFAULTS, **preset}.items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+    if not (args.users or args.rate):
+        parser.error("give --users, --rate or --scenario")
+
+    app = server = None
+    if not args.url:
+        work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="obelisk-load-"))
+        os.makedirs(work_dir, exist_ok=True)
+        server = fake_llm.FakeLLMServer(fake_llm.from_args(args)).start()
+        app = start_service(args, work_dir, server.env())
+    try:
+        test = asyncio.run(drive(args, app))
+    finally:
+        if server is not None:
+            server.stop()
+        if app is not None and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    report = {
+        "created": time.time(),
+        "config": {
+            name: getattr(args, name) for name in (
+                "scenario", "users", "rate", "mix", "think", "celery", "workers", "agent",
+                "url", "latency", "tokens_per_second", "error_rate", "rate_limit_rate", "seed",
+            )
+        },
+        **test.report(),
+    }
+    if app is not None:
+        report["tasks"]["final_states"] = task_states(test.task_ids)
+        report["fake_llm"] = server.llm.stats
+
+    lines = [f"{'endpoint':<18} {'requests':>9} {'rps':>8} {'errors':>7} "
+             f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for route, e in report["endpoints"].items():
+        lat = e["latency_ms"]
+        lines.append(f"{route:<18} {e['requests']:>9} {e['rps']:>8} {e['errors']:>7} "
+                     f"{lat['p50']:>9} {lat['p95']:>9} {lat['p99']:>9} {lat['max']:>9}")
+    print("\n".join(lines))
+    print(f"tasks: {json.dumps(report['tasks'])}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    for route, e in report["endpoints"].items():
+        if args.max_error_rate is not None and e["error_rate"] > args.max_error_rate:
+            failures.append(f"{route}: error rate {e['error_rate']} > {args.max_error_rate}")
+        if args.max_p99_ms is not None and e["latency_ms"]["p99"] > args.max_p99_ms:
+            failures.append(f"{route}: p99 {e['latency_ms']['p99']}ms > {args.max_p99_ms}ms")
+    if failures:
+        print("Load test thresholds exceeded:\n  " + "\n  ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
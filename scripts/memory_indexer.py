@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Standalone Memory -> VectorMemory indexer.
+
+Embeds every Memory row above the stored watermark and exits, or keeps
+tailing the table with --follow. Progress is checkpointed with each saved
+segment, so an interrupted backfill resumes where it stopped. Prints
+throughput stats as JSON:
+
+    scripts/memory_indexer.py --memory-db memory.sqlite --index-path memory.index
+    scripts/memory_indexer.py --follow --poll-interval 5
+
+--synthetic N first appends N generated rows to the Memory DB, for measuring
+backfill throughput on a scratch database.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agent_system.embedding import get_embedder  # noqa: E402
+from agent_system.memory import Memory  # noqa: E402
+from agent_system.memory_indexer import MemoryIndexer  # noqa: E402
+from agent_system.vector_memory import VectorMemory  # noqa: E402
+
+WORDS = (
+    "api service database cache queue worker frontend backend auth token user "
+    "order payment invoice report schema migration test lint deploy docker "
+    "latency error retry timeout index search vector prompt model agent"
+).split()
+
+
+def seed(memory: Memory, rows: int, chunk: int = 10_000):
+    """Bulk-insert synthetic rows with the ORM's insert path."""
+    rng = random.Random(0)
+    entry = memory._MemoryEntry
+    session = memory.Session()
+    for start in range(0, rows, chunk):
+        session.bulk_insert_mappings(entry, [
+            {
+                "agent": rng.choice(["architect", "ideas", "qc", "creativity"]),
+                "action": "synthetic",
+                "project": f"project-{rng.randrange(50)}",
+                "content": " ".join(rng.choice(WORDS) for _ in range(rng.randrange(20, 120))),
+            }
+            for _ in range(min(chunk, rows - start))
+        ])
+        session.commit()
+    session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--memory-db", help="SQLite Memory DB (default: MEMORY_DB_PATH)")
+    parser.add_argument("--index-path", help="Vector index path (default: VECTOR_INDEX_PATH)")
+    parser.add_argument("--backend", help="Embedding backend (default: EMBEDDING_BACKEND or hashing)")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--save-every", type=int, default=50_000,
+                        help="Rows per persisted segment and watermark checkpoint")
+    parser.add_argument("--max-rows", type=int, help="Stop after this many rows")
+    parser.add_argument("--follow", action="store_true", help="Keep polling for new rows")
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Append N synthetic rows to the Memory DB before indexing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    memory = Memory(db_path=args.memory_db)
+    if args.synthetic:
+        start = time.time()
+        seed(memory, args.synthetic)
+        logging.info("Inserted %d synthetic rows in %.1fs", args.synthetic, time.time() - start)
+    embedder = get_embedder(args.backend)
+    indexer = MemoryIndexer(
+        memory,
+        VectorMemory(embedder.dimension, index_path=args.index_path),
+        embedder,
+        batch_size=args.batch_size,
+        save_every=args.save_every,
+    )
+    if args.follow:
+        indexer.run_forever(args.poll_interval)
+    print(json.dumps(indexer.run_once(max_rows=args.max_rows), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Apply Memory retention policies and print the report as JSON.
+
+Archives rows past their policy's hot window (config/retention.yaml),
+compresses large hot rows, prunes old reasoning runs, runs VACUUM/ANALYZE
+and reports bytes reclaimed and hot-set query latency before and after:
+
+    scripts/memory_retention.py --memory-db memory.sqlite
+    scripts/memory_retention.py --dry-run
+
+--synthetic N first appends N rows spread over the last --synthetic-days days
+to the Memory DB, for trying policies out on a scratch database.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agent_system.memory import Memory  # noqa: E402
+from agent_system.reasoning import ReasoningStore  # noqa: E402
+from agent_system.retention import RetentionEngine  # noqa: E402
+
+AGENTS = [
+    ("TaskRegistry", "enqueue"), ("PipelineRegistry", "pipeline"),
+    ("CodeArchitect", "reasoning:claude-v1"), ("architect", "generate_architecture"),
+    ("qc", "check_directory"), ("sandbox", "test_durations"),
+]
+
+
+def seed(memory: Memory, rows: int, days: int, chunk: int = 5_000):
+    """Bulk-insert synthetic rows with timestamps over the last ``days`` days."""
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    session = memory.Session()
+    for start in range(0, rows, chunk):
+        batch = []
+        for _ in range(min(chunk, rows - start)):
+            agent, action = rng.choice(AGENTS)
+            batch.append({
+                "agent": agent,
+                "action": action,
+                "project": f"project-{rng.randrange(20)}",
+                "timestamp": now - timedelta(seconds=rng.uniform(0, days * 86400)),
+                "content": " ".join(
+                    rng.choice(("plan", "service", "queue", "error", "retry", "cache"))
+                    for _ in range(rng.choice((20, 200, 2000)))
+                ),
+            })
+        session.bulk_insert_mappings(memory._MemoryEntry, batch)
+        session.commit()
+    session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--memory-db", help="SQLite Memory DB (default: MEMORY_DB_PATH)")
+    parser.add_argument("--config", help="Retention config (default: config/retention.yaml)")
+    parser.add_argument("--reasoning-db", help="Reasoning store (default: REASONING_DB_PATH)")
+    parser.add_argument("--dry-run", action="store_true", help="Report without changing anything")
+    parser.add_argument("--no-vacuum", action="store_true", help="Skip VACUUM/ANALYZE")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Append N synthetic rows to the Memory DB first")
+    parser.add_argument("--synthetic-days", type=int, default=120)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    memory = Memory(db_path=args.memory_db)
+    if args.synthetic:
+        start = time.time()
+        seed(memory, args.synthetic, args.synthetic_days)
+        logging.info("Inserted %d synthetic rows in %.1fs", args.synthetic, time.time() - start)
+    engine = RetentionEngine(memory, config_path=args.config)
+    report = engine.run(
+        dry_run=args.dry_run,
+        vacuum=False if args.no_vacuum else None,
+        reasoning=ReasoningStore(args.reasoning_db, flush_interval=0),
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
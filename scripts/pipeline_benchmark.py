@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark against the offline fake providers.
+
+Starts scripts/fake_llm.py in-process and runs ``main.py`` for each
+scenario with scripts/fake_codex.py as the Codex CLI, so no API keys or
+network are needed. Every run gets its own output directory, checkpoint run
+and trace file; from these it reports the pipeline wall time, per-stage
+latency (the ``checkpoint.<stage>`` spans), the peak RSS of the main.py
+process, LLM requests and tokens per run (the ``llm.*`` spans), as medians
+over ``--runs``:
+
+    scripts/pipeline_benchmark.py --runs 5 --output bench.json
+    scripts/pipeline_benchmark.py --runs 5 --baseline bench.json --tolerance 0.2
+
+With ``--baseline``, each metric is compared with a stored result and the
+script exits non-zero when one grew by more than ``--tolerance`` (and, for
+times, by more than ``--min-delta`` seconds) or a run failed, so it can gate
+CI. Provider behaviour (latency, token rate, 429s, scripted replies) is set
+with the fake_llm options; the defaults add no latency, so the results
+measure the pipeline's own overhead.
+
+The agents use the legacy provider APIs (Anthropic text completions, OpenAI
+``ChatCompletion``), so the SDKs must be within the ranges pinned in
+requirements.txt; the script checks this first and exits with an
+explanation otherwise.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import fake_llm  # noqa: E402  (scripts/ is on sys.path when run as a script)
+from agent_system.tracing import read_spans  # noqa: E402
+
+FAKE_CODEX = os.path.join(ROOT, "scripts", "fake_codex.py")
+REQUIREMENTS = "Task tracker with a REST API, a background worker and a web dashboard"
+
+SCENARIOS = {
+    "default": [],
+    "tests": ["--generate-tests"],
+    "components": ["--parallel-components", "4"],
+}
+
+
+def check_sdks() -> list:
+    """Return reasons the installed provider SDKs cannot drive the agents."""
+    problems = []
+    try:
+        import anthropic
+    except ImportError:
+        problems.append("anthropic is not installed")
+    else:
+        version = getattr(anthropic, "__version__", "?")
+        try:
+            client = anthropic.Client(api_key="fake")
+        except TypeError as e:
+            # anthropic < 0.40 passes ``proxies``, which httpx 0.28 removed
+            problems.append(f"anthropic {version} does not work with the installed httpx ({e})")
+        else:
+            if not hasattr(anthropic, "HUMAN_PROMPT") or not hasattr(client, "completions"):
+                problems.append(f"anthropic {version} has no text completions API")
+    try:
+        import openai
+    except ImportError:
+        problems.append("openai is not installed")
+    else:
+        if not openai.version.VERSION.startswith("0."):
+            problems.append(f"openai {openai.version.VERSION} has no ChatCompletion API")
+    return problems
+
+
+def run_once(args, scenario: str, index: int, work_dir: str, env) -> dict:
+    """Run main.py once; return its measurements."""
+    name = f"{scenario}-{index}"
+    output_dir = os.path.join(work_dir, "out", name)
+    trace_file = os.path.join(work_dir, "traces", f"{name}.jsonl")
+    log_path = os.path.join(work_dir, "logs", f"{name}.log")
+    argv = [
+        sys.executable, os.path.join(ROOT, "main.py"),
+        "--project", f"bench-{scenario}", "--requirements", args.requirements,
+        "--output-dir", output_dir, "--run-id", f"{os.path.basename(work_dir)}-{name}",
+        "--trace-file", trace_file,
+    ] + SCENARIOS[scenario]
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen(argv, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 gives this child's own resource usage, peak RSS included
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - start
+    spans = read_spans(trace_file) if os.path.exists(trace_file) else []
+    stages = {}
+    for s in spans:
+        if s["name"].startswith("checkpoint."):
+            stage = s["name"].split(".", 1)[1]
+            stages[stage] = stages.get(stage, 0) + s["duration"]
+    llm = [s for s in spans if s["kind"] == "llm"]
+    return {
+        "exit_code": proc.returncode,
+        "log": log_path,
+        "wall": round(wall, 4),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "stages": {k: round(v, 4) for k, v in stages.items()},
+        "llm_requests": len(llm),
+        "llm_errors": sum(s["status"] == "error" for s in llm),
+        "prompt_tokens": sum(int(s["attributes"].get("prompt_tokens", 0)) for s in llm),
+        "completion_tokens": sum(int(s["attributes"].get("completion_tokens", 0)) for s in llm),
+    }
+
+
+def summarise(runs) -> dict:
+    ok = [r for r in runs if r["exit_code"] == 0] or runs
+    stages = {}
+    for r in ok:
+        for stage, seconds in r["stages"].items():
+            stages.setdefault(stage, []).append(seconds)
+    return {
+        "runs": len(runs),
+        "failed": sum(r["exit_code"] != 0 for r in runs),
+        "wall": round(statistics.median(r["wall"] for r in ok), 4),
+        "wall_max": round(max(r["wall"] for r in ok), 4),
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in ok),
+        "stages": {k: round(statistics.median(v), 4) for k, v in stages.items()},
+        "llm_requests": statistics.median(r["llm_requests"] for r in ok),
+        "llm_errors": statistics.median(r["llm_errors"] for r in ok),
+        "tokens": statistics.median(r["prompt_tokens"] + r["completion_tokens"] for r in ok),
+    }
+
+
+def metrics(summary: dict) -> dict:
+    """Flatten a scenario summary into name -> (value, is_time)."""
+    flat = {
+        "wall": (summary["wall"], True),
+        "peak_rss_mb": (summary["peak_rss_mb"], False),
+        "tokens": (summary["tokens"], False),
+        "llm_requests": (summary["llm_requests"], False),
+    }
+    for stage, seconds in summary["stages"].items():
+        flat[f"stage.{stage}"] = (seconds, True)
+    return flat
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float):
+    """Return (table lines, regressions) of ``results`` against ``baseline``."""
+    lines = [f"{'scenario/metric':<32} {'baseline':>10} {'current':>10} {'change':>8}"]
+    regressions = []
+    for scenario, summary in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base:
+            lines.append(f"{scenario:<32} {'-':>10} {'-':>10}  (not in baseline)")
+            continue
+        base_metrics = metrics(base)
+        for name, (value, is_time) in metrics(summary).items():
+            if name not in base_metrics:
+                continue
+            before = base_metrics[name][0]
+            change = (value - before) / before if before else 0.0
+            flag = ""
+            if change > tolerance and (not is_time or value - before > min_delta):
+                flag = "  REGRESSION"
+                regressions.append(f"{scenario} {name}: {before} -> {value} ({change:+.0%})")
+            lines.append(f"{scenario + '/' + name:<32} {before:>10} {value:>10} {change:>+8.0%}{flag}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3, help="Runs per scenario")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Only run these scenarios (repeatable)")
+    parser.add_argument("--requirements", default=REQUIREMENTS)
+    parser.add_argument("--codex-latency", type=float, default=0.0,
+                        help="Seconds each fake Codex invocation takes")
+    parser.add_argument("--work-dir", help="Keep outputs, traces and logs here (default: a temp dir)")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    parser.add_argument("--baseline", help="Compare with the JSON results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative growth of a metric over the baseline")
+    parser.add_argument("--min-delta", type=float, default=0.05,
+                        help="Ignore time regressions smaller than this many seconds")
+    fake_llm.add_arguments(parser)
+    args = parser.parse_args()
+    problems = check_sdks()
+    if problems:
+        sys.exit(
+            "Incompatible provider SDKs:\n  " + "\n  ".join(problems)
+            + "\nInstall the versions pinned in requirements.txt, e.g.\n"
+            "  pip install 'anthropic>=0.40,<1.0' 'openai>=0.27.0,<1.0'"
+        )
+
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="obelisk-bench-"))
+    for sub in ("out", "traces", "logs"):
+        os.makedirs(os.path.join(work_dir, sub), exist_ok=True)
+    llm = fake_llm.from_args(args)
+    server = fake_llm.FakeLLMServer(llm).start()
+    env = dict(
+        os.environ,
+        **server.env(),
+        CODEX_CLI_PATH=FAKE_CODEX,
+        FAKE_CODEX_LATENCY=str(args.codex_latency),
+        OBELISK_RUNS_PATH=os.path.join(work_dir, "runs"),
+        REASONING_DB_PATH=os.path.join(work_dir, "reasoning.sqlite"),
+        OBELISK_RATE_LIMITS="",
+        SEMANTIC_CACHE_AGENTS="",
+        OBELISK_TRACE_FORMAT="jsonl",
+    )
+    results = {"created": time.time(), "python": sys.version.split()[0], "scenarios": {}, "runs": {}}
+    try:
+        for scenario in args.scenario or SCENARIOS:
+            runs = [run_once(args, scenario, i, work_dir, env) for i in range(args.runs)]
+            results["runs"][scenario] = runs
+            results["scenarios"][scenario] = summarise(runs)
+    finally:
+        server.stop()
+    results["fake_llm"] = llm.stats
+    print(json.dumps(results["scenarios"], indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failures = [
+        f"{scenario}: {s['failed']}/{s['runs']} runs failed (logs in {work_dir}/logs)"
+        for scenario, s in results["scenarios"].items() if s["failed"]
+    ]
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        print("\n".join(lines))
+        failures += regressions
+    if not args.work_dir and not failures:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    if failures:
+        print("Benchmark failed:\n  " + "\n  ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Queue-latency load test for the Celery queue layout.
+
+Floods the long-running queues (codegen, llm) with blocking probe tasks and
+measures how long short probes on the scoring queue wait before a worker
+starts them. With --baseline, every probe goes to the single `agency`
+queue instead, reproducing the pre-routing layout for comparison.
+
+Requires the broker and workers to be running, e.g.:
+
+    CELERY_QUEUES=agency,codegen,meta service/celery_worker.sh &
+    CELERY_QUEUES=llm,scoring CELERY_POOL=threads CELERY_CONCURRENCY=16 service/celery_worker.sh &
+    scripts/queue_latency.py --long 40 --short 100 --output queue_latency.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agent_system.stats import percentile  # noqa: E402
+from service.celery_app import celery_app  # noqa: E402
+from service.queues import queue_options  # noqa: E402
+
+PROBE = "service.load_tasks.probe"
+
+
+def send(queue: str, work_seconds: float):
+    return celery_app.send_task(
+        PROBE, args=[time.time(), work_seconds], queue=queue, **queue_options(queue)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--long", type=int, default=40, help="Number of long tasks")
+    parser.add_argument("--long-seconds", type=float, default=5.0)
+    parser.add_argument("--short", type=int, default=100, help="Number of short tasks")
+    parser.add_argument("--short-interval", type=float, default=0.05)
+    parser.add_argument("--baseline", action="store_true",
+                        help="Send everything to the single agency queue")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    long_queues = ["agency"] if args.baseline else ["codegen", "llm"]
+    short_queue = "agency" if args.baseline else "scoring"
+
+    background = [
+        send(long_queues[i % len(long_queues)], args.long_seconds)
+        for i in range(args.long)
+    ]
+    probes = []
+    for _ in range(args.short):
+        probes.append(send(short_queue, 0.0))
+        time.sleep(args.short_interval)
+
+    latencies = [p.get(timeout=args.timeout)["queue_latency"] for p in probes]
+    for task in background:
+        task.forget()
+    results = {
+        "layout": "single-queue" if args.baseline else "per-agent-queues",
+        "long_tasks": args.long,
+        "long_seconds": args.long_seconds,
+        "short_tasks": args.short,
+        "short_queue": short_queue,
+        "queue_latency": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies),
+            "mean": statistics.mean(latencies),
+        },
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+CLI startup benchmark with a regression budget.
+
+Runs each startup scenario (obelisk.py --help, main.py --help and the
+imports needed to route a natural-language command) several times under
+``python -X importtime`` and reports the median wall time, the time spent
+importing modules after interpreter start-up (``site``) and the slowest
+top-level imports. Exits non-zero when a scenario exceeds the budget, so it
+can gate CI:
+
+    scripts/startup_benchmark.py --runs 10 --budget-ms 200 --output startup.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SCENARIOS = {
+    "obelisk-help": ["obelisk.py", "--help"],
+    "main-help": ["main.py", "--help"],
+    "nl-routing": ["-c", "import obelisk, agent_system.task_router"],
+}
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def parse_importtime(stderr: str):
+    """
+    Return (import_us, top) for the imports that follow interpreter start-up:
+    total cumulative microseconds and a list of (module, us) for top-level
+    imports, slowest first.
+    """
+    top = []
+    after_site = False
+    for line in stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        if len(indent) != 1:
+            continue
+        if not after_site:
+            after_site = name == "site"
+            continue
+        top.append((name, int(cumulative)))
+    top.sort(key=lambda item: item[1], reverse=True)
+    return sum(us for _, us in top), top
+
+
+def run_scenario(argv, runs: int):
+    cmd = [sys.executable, "-X", "importtime"] + argv
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    # Warm-up run so byte-code compilation is not measured
+    subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True)
+    walls, imports, top = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+        import_us, top = parse_importtime(proc.stderr)
+        imports.append(import_us)
+    return {
+        "command": " ".join(argv),
+        "exit_code": proc.returncode,
+        "wall_ms": round(statistics.median(walls) * 1000, 1),
+        "wall_ms_max": round(max(walls) * 1000, 1),
+        "import_ms": round(statistics.median(imports) / 1000, 1),
+        "slowest_imports": [
+            {"module": name, "ms": round(us / 1000, 1)} for name, us in top[:10]
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=200,
+                        help="Maximum median wall time per scenario")
+    parser.add_argument("--import-budget-ms", type=float, default=100,
+                        help="Maximum median module import time per scenario")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Only run these scenarios (repeatable)")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    results = {}
+    failures = []
+    for name in args.scenario or SCENARIOS:
+        result = run_scenario(SCENARIOS[name], args.runs)
+        results[name] = result
+        if result["wall_ms"] > args.budget_ms:
+            failures.append(f"{name}: wall {result['wall_ms']}ms > {args.budget_ms}ms")
+        if result["import_ms"] > args.import_budget_ms:
+            failures.append(
+                f"{name}: imports {result['import_ms']}ms > {args.import_budget_ms}ms"
+            )
+    report = {
+        "budget_ms": args.budget_ms,
+        "import_budget_ms": args.import_budget_ms,
+        "scenarios": results,
+        "failures": failures,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if failures:
+        print("Startup budget exceeded:\n  " + "\n  ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
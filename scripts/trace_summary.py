@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Summarise a trace file written with OBELISK_TRACE_FILE / --trace-file.
+
+Prints where time went, per span name (count, total, p50, max, errors,
+LLM tokens), or with --trace ID the span tree of one trace:
+
+    scripts/trace_summary.py .obelisk/trace.jsonl
+    scripts/trace_summary.py .obelisk/trace.jsonl --trace 4bf92f3577b34da6a3ce929d0e0e4736
+
+Both the JSONL and the OTLP/JSON formats are read.
+"""
+import argparse
+import os
+import statistics
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agent_system.tracing import read_spans  # noqa: E402
+
+
+def summary(spans) -> str:
+    groups = defaultdict(list)
+    for s in spans:
+        groups[(s["kind"], s["name"])].append(s)
+    rows = []
+    for (kind, name), items in groups.items():
+        durations = [s["duration"] for s in items]
+        tokens = sum(
+            int(s["attributes"].get("prompt_tokens", 0)) + int(s["attributes"].get("completion_tokens", 0))
+            for s in items
+        )
+        rows.append((
+            sum(durations), kind, name, len(items), statistics.median(durations),
+            max(durations), sum(s["status"] == "error" for s in items), tokens,
+        ))
+    rows.sort(reverse=True)
+    lines = [f"{'total s':>9} {'count':>6} {'p50 s':>8} {'max s':>8} {'errors':>6} {'tokens':>8}  kind/name"]
+    for total, kind, name, count, p50, peak, errors, tokens in rows:
+        lines.append(
+            f"{total:9.3f} {count:6d} {p50:8.3f} {peak:8.3f} {errors:6d} {tokens or '':>8}  {kind}/{name}"
+        )
+    return "\n".join(lines)
+
+
+def tree(spans, trace_id: str) -> str:
+    spans = [s for s in spans if s["trace_id"].startswith(trace_id)]
+    ids = {s["span_id"] for s in spans}
+    children = defaultdict(list)
+    for s in spans:
+        children[s["parent_id"] if s["parent_id"] in ids else None].append(s)
+    lines = []
+
+    def walk(parent, depth):
+        for s in sorted(children[parent], key=lambda s: s["start"]):
+            flag = "  !" if s["status"] == "error" else ""
+            lines.append(f"{s['duration']:9.3f}s  {'  ' * depth}{s['name']}{flag}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="Trace file")
+    parser.add_argument("--trace", help="Print the span tree of this trace id (or prefix)")
+    args = parser.parse_args()
+    spans = read_spans(args.path)
+    print(tree(spans, args.trace) if args.trace else summary(spans))
+
+
+if __name__ == "__main__":
+    main()
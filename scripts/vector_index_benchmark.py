@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark VectorMemory index tiers on synthetic vectors.
+
+Builds flat, IVF-Flat, IVF-PQ and HNSW indexes over clustered random vectors
+with the knobs given on the command line and reports, per kind, build time,
+recall@k against exact (flat) search, single-query latency percentiles, batch
+throughput and the index's memory footprint (serialized size). IVF-PQ recall
+is also reported after exact re-ranking, as VectorMemory searches it:
+
+    scripts/vector_index_benchmark.py --n 200000 --dim 128 --k 10 --nprobe 16 --output ann.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agent_system.stats import percentile  # noqa: E402
+from agent_system.vector_index import (KINDS, IndexConfig,  # noqa: E402
+                                       build_index, index_bytes)
+
+
+def synthetic(n: int, dim: int, clusters: int, seed: int):
+    """Gaussian clusters, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype("float32")
+    labels = rng.integers(0, clusters, size=n)
+    return (centers[labels] + 0.3 * rng.normal(size=(n, dim))).astype("float32")
+
+
+def recall_at_k(found, truth) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / float(truth.size)
+
+
+def rerank(index, corpus, queries, k: int, factor: int):
+    """IVF-PQ search re-ranked exactly, as VectorMemory does."""
+    _, candidates = index.search(queries, k * factor)
+    found = np.full((len(queries), k), -1, dtype="int64")
+    for row, cand in enumerate(candidates):
+        cand = cand[cand >= 0]
+        exact = ((corpus[cand] - queries[row]) ** 2).sum(1)
+        order = np.argsort(exact)[:k]
+        found[row, :len(order)] = cand[order]
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=100_000, help="Corpus size")
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--kinds", default=",".join(KINDS),
+                        help="Comma-separated subset of " + ", ".join(KINDS))
+    parser.add_argument("--nlist", type=int)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--m", type=int, default=32, help="HNSW M")
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--pq-m", type=int)
+    parser.add_argument("--rerank", type=int, default=4,
+                        help="IVF-PQ re-rank factor (1 disables)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    config = IndexConfig(
+        nlist=args.nlist, nprobe=args.nprobe, m=args.m,
+        ef_search=args.ef_search, pq_m=args.pq_m, rerank=args.rerank,
+    )
+    corpus = synthetic(args.n, args.dim, args.clusters, args.seed)
+    queries = synthetic(args.queries, args.dim, args.clusters, args.seed + 1)
+    ids = np.arange(args.n, dtype="int64")
+
+    results = {}
+    truth = None
+    kinds = ["flat"] + [k for k in args.kinds.split(",") if k and k != "flat"]
+    for kind in kinds:
+        start = time.perf_counter()
+        index = build_index(corpus, ids, kind, config)
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        _, found = index.search(queries, args.k)
+        batch_s = time.perf_counter() - start
+        if truth is None:
+            truth = found
+        latencies = []
+        for q in queries[:200]:
+            start = time.perf_counter()
+            index.search(q[None, :], args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[kind] = {
+            "build_s": round(build_s, 3),
+            "recall_at_k": round(recall_at_k(found, truth), 4),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50), 3),
+                "p95": round(percentile(latencies, 95), 3),
+                "p99": round(percentile(latencies, 99), 3),
+            },
+            "batch_qps": round(len(queries) / batch_s, 1),
+            "memory_mb": round(index_bytes(index) / (1024 * 1024), 2),
+        }
+        if kind == "ivf_pq" and config.rerank > 1:
+            start = time.perf_counter()
+            found = rerank(index, corpus, queries, args.k, config.rerank)
+            results[kind]["rerank_recall_at_k"] = round(recall_at_k(found, truth), 4)
+            results[kind]["rerank_batch_qps"] = round(
+                len(queries) / (time.perf_counter() - start), 1
+            )
+        print(f"{kind:<9} {json.dumps(results[kind])}", file=sys.stderr)
+
+    report = {
+        "n": args.n, "dim": args.dim, "k": args.k, "queries": args.queries,
+        "config": vars(config), "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,40 @@
+import inspect
+import json
 import logging
 import os
 import subprocess
-from typing import Any, Dict, Set
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
 
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, Header, HTTPException, Query, Request, WebSocket
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
+from agent_system import tracing
 from agent_system.agent_registry import AgentRegistry
+from agent_system.artifact_store import ArtifactStore
 from agent_system.memory import Memory
 from service.celery_app import celery_app
+from service.idempotency import IdempotencyConflict, submit_task
 
 api_logger = logging.getLogger(__name__)
 
 app = FastAPI(title="OBELISK API")
 registry = AgentRegistry()
-memory = Memory()
+artifacts = ArtifactStore()
+memory = Memory(artifact_store=artifacts)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Run each request in an ``http`` span; tasks it enqueues continue its trace."""
+    with tracing.span("http.request", "http", method=request.method) as span:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        # The route template, not the raw path, keeps metric labels bounded
+        span.name = f"http.{request.method} {getattr(route, 'path', 'unmatched')}"
+        span.set(status_code=response.status_code)
+        return response
 
 # WebSocket log broadcaster
 log_subscribers: Set[WebSocket] = set()
@@ -46,6 +66,8 @@ root_logger.addHandler(handler)
 class TaskRequest(BaseModel):
     agent: str
     params: Dict[str, Any] = {}
+    # Reuse a finished identical task's result for this many seconds
+    cache_ttl: Optional[int] = None
 
 
 class TaskStatus(BaseModel):
@@ -53,44 +75,107 @@ class TaskStatus(BaseModel):
     agent: str
     status: str
     result: Any = None
+    deduplicated: bool = False
+
+
+class PipelineRequest(BaseModel):
+    project: str
+    requirements: str = ""
+    output_dir: str
+    models: Dict[str, str] = {}
+    generate_tests: bool = False
+    parallel_components: int = 0
+    codex_timeout: Optional[float] = None
+    component_timeout: Optional[float] = None
+    # cpu, alloc or wall: profile each stage (artifacts in <output_dir>.profile/<id>)
+    profile: Optional[str] = None
+
+
+class StageStatus(BaseModel):
+    task_id: str
+    status: str
+    error: Optional[str] = None
+
+
+class PipelineStatus(BaseModel):
+    id: str
+    project: Optional[str] = None
+    status: str
+    stages: Dict[str, StageStatus]
+    result: Any = None
 
 
 @app.post("/tasks", response_model=TaskStatus)
-async def create_task(req: TaskRequest):
+async def create_task(
+    req: TaskRequest, idempotency_key: Optional[str] = Header(None)
+):
     """
     Enqueue an agent task via Celery; returns a task ID immediately.
+    Identical requests (or requests with the same Idempotency-Key header)
+    attach to the task already in flight instead of enqueuing a new one.
     """
-    async_result = celery_app.send_task(
-        "service.api.process_task", args=[req.agent, req.params]
-    )
-    import json
+    try:
+        async_result, deduplicated = submit_task(
+            req.agent, req.params, idempotency_key, req.cache_ttl
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    status = async_result.status
+    if not deduplicated:
+        import json
 
-    memory.add(
-        "TaskRegistry",
-        "enqueue",
-        json.dumps(
-            {
-                "id": async_result.id,
-                "agent": req.agent,
-                "params": req.params,
-            }
-        ),
+        memory.add(
+            "TaskRegistry",
+            "enqueue",
+            json.dumps(
+                {
+                    "id": async_result.id,
+                    "agent": req.agent,
+                    "params": req.params,
+                }
+            ),
+        )
+    return TaskStatus(
+        id=async_result.id,
+        agent=req.agent,
+        status=status,
+        result=async_result.result if status == "SUCCESS" else None,
+        deduplicated=deduplicated,
     )
-    return TaskStatus(id=async_result.id, agent=req.agent, status=async_result.status)
 
 
 @celery_app.task(name="service.api.process_task")
 def process_task(agent_name: str, params: Dict[str, Any]):
     """Execute an agent task and store the result in memory."""
-    try:
-        agent = registry.get_agent(agent_name, **(params or {}))
+    from agent_system import semantic_cache
+
+    tracing.set_attributes(agent=agent_name)
+
+    def run(options, arguments):
+        agent = registry.get_agent(agent_name, **options)
         if hasattr(agent, "generate_architecture"):
-            res = agent.generate_architecture(**params)
-        elif hasattr(agent, "generate_ideas"):
-            res = agent.generate_ideas(**params)
-        else:
-            res = str(agent)
-        memory.add(agent_name, "task", str(res))
+            return agent.generate_architecture(**arguments)
+        if hasattr(agent, "generate_ideas"):
+            return agent.generate_ideas(**arguments)
+        return str(agent)
+
+    try:
+        # Constructor options (model, api_key) configure the agent; the
+        # remaining params are the arguments of its generate_* method.
+        accepted = inspect.signature(registry.get_class(agent_name)).parameters
+        options = {k: v for k, v in (params or {}).items() if k in accepted}
+        arguments = {k: v for k, v in (params or {}).items() if k not in accepted}
+        # Near-duplicate requests reuse a response for agents that opted in;
+        # only the method arguments describe the request, so secrets such as
+        # api_key never reach the cache
+        res = semantic_cache.cached_call(
+            agent_name, options.get("model"), semantic_cache.request_text(arguments),
+            lambda: run(options, arguments),
+        )
+        # Large outputs go to the artifact store; the result backend and the
+        # memory row only carry a reference with a short summary.
+        res = artifacts.offload(res)
+        memory.add(agent_name, "task", res if isinstance(res, str) else json.dumps(res))
         return res
     except Exception as e:  # pragma: no cover - just log
         memory.add(agent_name, "error", str(e))
@@ -103,14 +188,48 @@ async def get_task(task_id: str):
     Fetch the status and result of a Celery task by ID.
     """
     res = celery_app.AsyncResult(task_id)
+    # Extended results carry the task's arguments; process_task's first is the agent
+    agent = res.name or ""
+    if res.name == "service.api.process_task" and res.args:
+        agent = res.args[0]
     return TaskStatus(
         id=res.id,
-        agent=res.task_name or "",
+        agent=agent,
         status=res.status,
         result=res.result if res.status == "SUCCESS" else None,
     )
 
 
+@app.get("/memory/search")
+async def search_memory(
+    q: str,
+    agent: Optional[str] = None,
+    project: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Full-text search over memory content, best match first, with
+    ``<mark>``-highlighted snippets. Page with ``offset``; ``next_offset`` is
+    null on the last page.
+    """
+    try:
+        # One extra row tells whether another page exists
+        results = memory.search(
+            q, agent=agent, project=project, since=since, limit=limit + 1, offset=offset
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return {
+        "query": q,
+        "results": results[:limit],
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if len(results) > limit else None,
+    }
+
+
 @app.get("/memory/{agent_name}")
 async def get_memory(agent_name: str, limit: int = 20):
     api_logger.info(f"Get memory: agent={agent_name} limit={limit}")
@@ -121,6 +240,43 @@ async def get_memory(agent_name: str, limit: int = 20):
     ]
 
 
+@app.get("/semantic_cache/stats")
+async def semantic_cache_stats() -> Dict[str, Any]:
+    """Hit rate, false positives and evictions per (agent, model) semantic cache."""
+    from agent_system import semantic_cache
+
+    return semantic_cache.stats()
+
+
+@app.get("/reasoning/export")
+async def export_reasoning(
+    run_id: Optional[str] = None,
+    chain_id: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|dot)$"),
+):
+    """
+    A run's or chain's reasoning steps as a node/edge graph for
+    thought-chain visualisation (``format=dot`` for Graphviz).
+    """
+    from agent_system import reasoning
+
+    try:
+        graph = reasoning.get_store().export(run_id=run_id, chain_id=chain_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "dot":
+        return PlainTextResponse(reasoning.to_dot(graph), media_type="text/vnd.graphviz")
+    return graph
+
+
+@app.get("/reasoning/runs/{run_id}")
+async def reasoning_chains(run_id: str):
+    """Chains logged during a run, with their agent, length and time span."""
+    from agent_system import reasoning
+
+    return reasoning.get_store().chains(run_id)
+
+
 @app.get("/tasks_all", response_model=Dict[str, TaskStatus])
 async def list_tasks_all(limit: int = 50):
     """
@@ -142,6 +298,87 @@ async def list_tasks_all(limit: int = 50):
     return out
 
 
+@app.post("/pipelines", response_model=PipelineStatus)
+async def create_pipeline(req: PipelineRequest):
+    """
+    Launch the full generation pipeline as a Celery workflow; returns the
+    pipeline ID and the task ID of every stage immediately.
+    """
+    from agent_system.profiling import MODES
+    from service.pipeline import pipeline_status, start_pipeline
+
+    if req.profile and req.profile not in MODES:
+        raise HTTPException(status_code=422, detail=f"profile must be one of {', '.join(MODES)}")
+    record = start_pipeline(req.dict())
+    return pipeline_status(record["id"])
+
+
+@app.get("/pipelines/{pipeline_id}", response_model=PipelineStatus)
+async def get_pipeline(pipeline_id: str):
+    """Fetch overall and per-stage status of a pipeline."""
+    from service.pipeline import pipeline_status
+
+    status = pipeline_status(pipeline_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    return status
+
+
+@app.get("/artifacts/{digest}")
+async def get_artifact(digest: str, range: Optional[str] = Header(None)):
+    """
+    Stream a stored artifact referenced by a task result or memory entry.
+    Supports a single ``Range: bytes=start-end`` request.
+    """
+    try:
+        size = artifacts.size(digest)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    headers = {"Accept-Ranges": "bytes"}
+    if not range:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            artifacts.iter_bytes(digest), media_type="text/plain", headers=headers
+        )
+    try:
+        unit, spec = range.split("=", 1)
+        first, last = spec.split(",")[0].strip().split("-", 1)
+        if unit.strip() != "bytes":
+            raise ValueError(unit)
+        if first:
+            start, end = int(first), (int(last) + 1 if last else size)
+        else:
+            start, end = max(size - int(last), 0), size
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Range header")
+    end = min(end, size)
+    if start >= end:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    headers["Content-Length"] = str(end - start)
+    return StreamingResponse(
+        artifacts.iter_bytes(digest, start, end),
+        status_code=206,
+        media_type="text/plain",
+        headers=headers,
+    )
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    """
+    Prometheus-style aggregates of the traced spans: durations per stage,
+    task, agent method, LLM and subprocess call, plus token and error counts.
+    """
+    return PlainTextResponse(
+        tracing.prometheus_text(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.get("/healthz")
 async def health_check():
     """Simple health check endpoint."""
@@ -1,6 +1,11 @@
 import os
 
 from celery import Celery
+from kombu import Queue
+
+from service import telemetry
+from service.queues import (DEFAULT_QUEUE, QueueTimeLimits, queue_names,
+                            route_task)
 
 # Use Redis as broker and result backend
 broker_url = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
@@ -10,16 +15,58 @@ celery_app = Celery(
     "agency",
     broker=broker_url,
     backend=backend_url,
-    include=["service.api", "service.meta_tasks"],
+    include=[
+        "service.api",
+        "service.meta_tasks",
+        "service.pipeline",
+        "service.load_tasks",
+        "service.indexer_tasks",
+        "service.retention_tasks",
+    ],
 )
 
-# Optional: direct routing
-celery_app.conf.task_routes = {"service.api.process_task": {"queue": "agency"}}
-# Schedule MetaAgent runs every minute via Celery Beat
+# Route by agent/task name to dedicated queues (see config/queues.yaml)
+celery_app.conf.task_routes = (route_task,)
+celery_app.conf.task_default_queue = DEFAULT_QUEUE
+# Declaration order does not affect scheduling; the message priority set by
+# route_task does (see service/queues.py)
+celery_app.conf.task_queues = [Queue(name, routing_key=name) for name in queue_names()]
+celery_app.conf.task_annotations = [QueueTimeLimits()]
+# One Redis list per priority step: a worker polls step 0 of all its queues
+# before step 1, so message priority orders work within and across queues
+celery_app.conf.broker_transport_options = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+}
+# Tasks are long-running and I/O bound: take one message at a time and only
+# acknowledge it once finished, so a lost worker's task is redelivered.
+celery_app.conf.worker_prefetch_multiplier = int(
+    os.getenv("CELERY_PREFETCH_MULTIPLIER", "1")
+)
+celery_app.conf.task_acks_late = True
+celery_app.conf.task_reject_on_worker_lost = True
+# Report STARTED so per-stage pipeline status distinguishes running from queued
+celery_app.conf.task_track_started = True
+# Store task name and arguments with results so GET /tasks/{id} can name the agent
+celery_app.conf.result_extended = True
+# Schedule MetaAgent runs every minute, Memory indexing every 30s and Memory
+# retention daily via Celery Beat
 
 celery_app.conf.beat_schedule = {
     "run-meta-check-every-minute": {
         "task": "service.meta_tasks.run_meta_check",
         "schedule": 60.0,
-    }
+    },
+    "index-memory": {
+        "task": "service.indexer_tasks.index_memory",
+        "schedule": float(os.getenv("INDEXER_INTERVAL", "30")),
+    },
+    "memory-retention": {
+        "task": "service.retention_tasks.apply_retention",
+        "schedule": float(os.getenv("RETENTION_INTERVAL", "86400")),
+    },
 }
+
+# Carry trace context through task headers and trace every task (see
+# agent_system/tracing.py)
+telemetry.install()
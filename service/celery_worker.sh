@@ -1,4 +1,14 @@
 #!/usr/bin/env bash
 # Start Celery worker for THE AGENCY
+#
+# CELERY_QUEUES       comma-separated queues to consume (default: all, see config/queues.yaml)
+# CELERY_POOL         prefork (default), threads, gevent (pip install gevent) or solo
+# CELERY_CONCURRENCY  worker processes/threads/greenlets (default: 4)
+#
+# I/O-bound LLM queues scale best on a thread or gevent pool, e.g.:
+#   CELERY_QUEUES=llm,scoring CELERY_POOL=threads CELERY_CONCURRENCY=32 service/celery_worker.sh
 exec celery -A service.celery_app.celery_app worker \
-  --loglevel=info --concurrency=4 -Q agency
+  --loglevel=info \
+  --pool="${CELERY_POOL:-prefork}" \
+  --concurrency="${CELERY_CONCURRENCY:-4}" \
+  -Q "${CELERY_QUEUES:-agency,llm,codegen,scoring,meta}"
@@ -0,0 +1,218 @@
+"""
+Request coalescing for task submission. Identical (agent, params) requests
+share one Celery task while it is queued or running, and optionally reuse
+its result for a while after it finished. Clients may instead supply their
+own key through the ``Idempotency-Key`` header.
+
+Keys live in Redis (IDEMPOTENCY_REDIS_URL, else the Celery result backend
+when it is Redis) so coalescing works across API processes; otherwise an
+in-process store is used.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+IN_FLIGHT_STATES = {"PENDING", "RECEIVED", "STARTED", "RETRY"}
+KEY_PREFIX = "obelisk:idempotency:"
+
+# Compare-and-set / compare-and-delete on the stored record, so a key is only
+# replaced or released by the request that read (or wrote) that record.
+CAS_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+CAD_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class IdempotencyConflict(ValueError):
+    """An Idempotency-Key was reused for a different request."""
+    pass
+
+
+def _normalise(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(k): _normalise(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalise(v) for v in value]
+    return value
+
+
+def fingerprint(agent: str, params: Dict[str, Any]) -> str:
+    """Stable hash of a request: key order and surrounding whitespace ignored."""
+    payload = json.dumps(
+        {"agent": agent, "params": _normalise(params or {})},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class _LocalStore:
+    """Process-local fallback with the subset of the Redis API we use."""
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        item = self._data.get(key)
+        if item and item[1] < time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(key):
+                return None
+            self._data[key] = (value, time.monotonic() + (ex or 10 ** 9))
+            return True
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key)
+            return item[0] if item else None
+
+    def delete(self, key):
+        with self._lock:
+            return 1 if self._data.pop(key, None) else 0
+
+    def compare_and_set(self, key, expected, value, ex=None):
+        """CAS_SCRIPT: replace key only while it still holds ``expected``."""
+        with self._lock:
+            item = self._live(key)
+            if not item or item[0] != expected:
+                return 0
+            self._data[key] = (value, time.monotonic() + (ex or 10 ** 9))
+            return 1
+
+    def compare_and_delete(self, key, expected):
+        """CAD_SCRIPT: delete key only while it still holds ``expected``."""
+        with self._lock:
+            item = self._live(key)
+            if not item or item[0] != expected:
+                return 0
+            del self._data[key]
+            return 1
+
+
+def _redis_url() -> Optional[str]:
+    url = os.getenv("IDEMPOTENCY_REDIS_URL") or os.getenv(
+        "CELERY_RESULT_BACKEND", "redis://localhost:6379/1"
+    )
+    return url if url.startswith(("redis://", "rediss://")) else None
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        url = _redis_url()
+        if url:
+            import redis
+
+            _store = redis.Redis.from_url(url, decode_responses=True)
+        else:
+            _store = _LocalStore()
+    return _store
+
+
+def compare_and_set(store, key: str, expected: str, value: str, ex: int) -> bool:
+    """Set ``key`` to ``value`` only if it still holds ``expected``."""
+    if isinstance(store, _LocalStore):
+        return bool(store.compare_and_set(key, expected, value, ex=ex))
+    return bool(store.eval(CAS_SCRIPT, 1, key, expected, value, ex))
+
+
+def compare_and_delete(store, key: str, expected: str) -> bool:
+    """Delete ``key`` only if it still holds ``expected`` (e.g. a lock token)."""
+    if isinstance(store, _LocalStore):
+        return bool(store.compare_and_delete(key, expected))
+    return bool(store.eval(CAD_SCRIPT, 1, key, expected))
+
+
+def _submit(store, key: str, claimed: str, agent: str, params: Dict[str, Any], task_id: str):
+    """Enqueue the task; on failure release the key so retries are not coalesced onto it."""
+    from service.queues import submit
+
+    try:
+        return submit("service.api.process_task", args=[agent, params], task_id=task_id)
+    except Exception:
+        compare_and_delete(store, key, claimed)
+        raise
+
+
+def submit_task(
+    agent: str,
+    params: Dict[str, Any],
+    idempotency_key: Optional[str] = None,
+    cache_ttl: Optional[int] = None,
+) -> Tuple[Any, bool]:
+    """
+    Enqueue ``process_task`` for (agent, params) unless an identical request
+    is already in flight, or finished less than ``cache_ttl`` seconds ago
+    (default IDEMPOTENCY_RESULT_TTL, 0 disables result reuse). Returns
+    (AsyncResult, deduplicated). Raises IdempotencyConflict when
+    ``idempotency_key`` was already used for a different request.
+    """
+    from service.celery_app import celery_app
+
+    store = get_store()
+    digest = fingerprint(agent, params)
+    key = KEY_PREFIX + (f"key:{idempotency_key}" if idempotency_key else digest)
+    if cache_ttl is None:
+        cache_ttl = int(os.getenv("IDEMPOTENCY_RESULT_TTL", "0"))
+    in_flight_ttl = int(os.getenv("IDEMPOTENCY_INFLIGHT_TTL", "3600"))
+    record = {"task_id": str(uuid.uuid4()), "fingerprint": digest}
+    claimed = json.dumps(record)
+
+    for _ in range(3):
+        if store.set(key, claimed, ex=in_flight_ttl + cache_ttl, nx=True):
+            return _submit(store, key, claimed, agent, params, record["task_id"]), False
+        raw = store.get(key)
+        if raw is None:
+            continue  # expired between set and get; try to claim again
+        existing = json.loads(raw)
+        if existing["fingerprint"] != digest:
+            raise IdempotencyConflict(
+                "Idempotency-Key was already used for a different request"
+            )
+        result = celery_app.AsyncResult(existing["task_id"])
+        if result.status in IN_FLIGHT_STATES:
+            return result, True
+        if result.status == "SUCCESS" and cache_ttl and _age(result) < cache_ttl:
+            return result, True
+        # Finished (or failed) and not reusable: take the key over, unless
+        # a concurrent request already did so since we read it.
+        if not compare_and_set(store, key, raw, claimed, in_flight_ttl + cache_ttl):
+            continue
+        return _submit(store, key, claimed, agent, params, record["task_id"]), False
+    raise RuntimeError("Could not claim idempotency key")
+
+
+def _age(result) -> float:
+    done = result.date_done
+    if done is None:
+        return float("inf")
+    if isinstance(done, str):
+        done = datetime.fromisoformat(done)
+    if done.tzinfo is None:
+        done = done.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - done).total_seconds()
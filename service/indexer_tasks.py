@@ -0,0 +1,42 @@
+import os
+import uuid
+
+from service.celery_app import celery_app
+from service.idempotency import compare_and_delete, get_store
+
+LOCK_KEY = "obelisk:indexer:lock"
+
+
+def _indexer():
+    # Built per run: another worker process may have advanced the index since
+    from agent_system.artifact_store import ArtifactStore
+    from agent_system.memory import Memory
+    from agent_system.memory_indexer import MemoryIndexer
+
+    return MemoryIndexer(Memory(artifact_store=ArtifactStore()))
+
+
+@celery_app.task(name="service.indexer_tasks.index_memory")
+def index_memory(max_rows: int = None):
+    """
+    Celery periodic task: embed Memory rows added since the last run into
+    VectorMemory, and add rows not in the full-text index yet to it.
+    Runs are serialised with a lock, and each indexes at most
+    INDEXER_MAX_ROWS rows so it stays inside the queue's time limit; a backlog
+    is worked off over consecutive runs.
+    """
+    store = get_store()
+    ttl = int(os.getenv("INDEXER_LOCK_TTL", "600"))
+    token = f"{os.getpid()}:{uuid.uuid4().hex}"
+    if not store.set(LOCK_KEY, token, ex=ttl, nx=True):
+        return {"skipped": True}
+    try:
+        max_rows = max_rows or int(os.getenv("INDEXER_MAX_ROWS", "100000"))
+        indexer = _indexer()
+        stats = indexer.run_once(max_rows=max_rows)
+        stats["fts_pending"] = indexer.memory.rebuild_search_index(max_rows=max_rows)
+        return stats
+    finally:
+        # The lock may have expired and been taken by another run meanwhile;
+        # only release it if it is still ours
+        compare_and_delete(store, LOCK_KEY, token)
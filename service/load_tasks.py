@@ -0,0 +1,15 @@
+import time
+
+from service.celery_app import celery_app
+
+
+@celery_app.task(name="service.load_tasks.probe")
+def probe(sent_at: float, work_seconds: float = 0.0):
+    """
+    Measurement task for load tests: reports how long it waited in the queue
+    and optionally simulates ``work_seconds`` of blocking I/O.
+    """
+    started = time.time()
+    if work_seconds:
+        time.sleep(work_seconds)
+    return {"queue_latency": started - sent_at, "started": started}
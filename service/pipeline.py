@@ -0,0 +1,212 @@
+"""
+The architect -> ideas -> generate -> tests -> QC -> score pipeline as a
+Celery canvas. After the architecture stage two independent branches run in
+parallel on whichever workers are free:
+
+    architect --+-- ideas -> creativity ------------------+-- finalize
+                +-- generate -> tests -> qc -> score -----+
+
+Every stage task receives and returns a JSON-serialisable state dict; large
+text fields are replaced by artifact-store references between stages.
+Stage task ids are assigned up front and recorded in Memory so per-stage
+status can be reported while the workflow runs. Workers executing the
+generate/tests/qc stages must share the filesystem holding ``output_dir``.
+"""
+import json
+import uuid
+from functools import lru_cache
+from typing import Any, Dict
+
+from celery import chain, group
+
+from agent_system import pipeline, reasoning
+from service import telemetry
+from service.celery_app import celery_app
+
+STAGES = ["architect", "ideas", "creativity", "generate", "tests", "qc", "score", "finalize"]
+REGISTRY_AGENT = "PipelineRegistry"
+
+
+@lru_cache(maxsize=None)
+def _registry():
+    from agent_system.agent_registry import AgentRegistry
+
+    return AgentRegistry()
+
+
+@lru_cache(maxsize=None)
+def _artifacts():
+    from agent_system.artifact_store import ArtifactStore
+
+    return ArtifactStore()
+
+
+@lru_cache(maxsize=None)
+def _memory():
+    from agent_system import recall
+    from agent_system.memory import Memory
+
+    memory = Memory(artifact_store=_artifacts())
+    # Prompt templates that call recall() are grounded on this worker's Memory
+    recall.configure(recall.Retriever(memory))
+    return memory
+
+
+def _get(state: Dict[str, Any], key: str):
+    """Read a state field, loading it from the artifact store if offloaded."""
+    return _artifacts().resolve(state.get(key))
+
+
+def _put(state: Dict[str, Any], **fields) -> Dict[str, Any]:
+    """
+    Return a new state with ``fields`` set; large text is offloaded so the
+    state passed between stages through the result backend stays small.
+    """
+    return {**state, **{k: _artifacts().offload(v) for k, v in fields.items()}}
+
+
+def _model(state: Dict[str, Any], role: str, default: str) -> str:
+    return (state.get("models") or {}).get(role, default)
+
+
+@celery_app.task(name="service.pipeline.architect")
+def architect_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+    # Reasoning steps are grouped per pipeline run
+    with reasoning.run(state.get("pipeline_id")):
+        spec, model = pipeline.architect(
+            _registry(), state["project"], state.get("requirements", ""),
+            _model(state, "architect", "claude-v1"), _memory(),
+        )
+    return _put(state, spec=spec, architect_model=model)
+
+
+@celery_app.task(name="service.pipeline.ideas")
+def ideas_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+    ideas, model = pipeline.ideas(
+        _registry(), state["project"], _get(state, "spec"),
+        _model(state, "ideas", "gpt-4"), _memory(),
+    )
+    return _put(state, ideas=ideas, ideas_model=model)
+
+
+@celery_app.task(name="service.pipeline.creativity")
+def creativity_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+    review, model = pipeline.creativity(
+        _registry(), state["project"], _get(state, "ideas"),
+        _model(state, "creativity", "claude-v1"), _memory(),
+    )
+    return _put(state, creative_review=review, creativity_model=model)
+
+
+@celery_app.task(name="service.pipeline.generate")
+def generate_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+    generated = pipeline.generate(
+        _get(state, "spec"),
+        state["output_dir"],
+        codex_timeout=state.get("codex_timeout"),
+        parallel_components=state.get("parallel_components", 0),
+        component_timeout=state.get("component_timeout"),
+        memory=_memory(),
+    )
+    return {**state, "generated": generated}
+
+
+@celery_app.task(name="service.pipeline.tests")
+def tests_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+    if not state.get("generate_tests"):
+        return {**state, "tests": None}
+    tests = pipeline.generate_tests(
+        _registry(), state["output_dir"],
+        _model(state, "test_harness", "gpt-4"), _memory(),
+    )
+    return _put(state, tests=tests)
+
+
+@celery_app.task(name="service.pipeline.qc")
+def qc_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+    report, model = pipeline.qc(
+        _registry(), state["output_dir"], _model(state, "qc", "gpt-4"),
+        memory=_memory(),
+    )
+    return _put(state, qc_report=report, qc_model=model)
+
+
+@celery_app.task(name="service.pipeline.score")
+def score_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+    result = pipeline.score(
+        _registry(), _get(state, "qc_report"), _model(state, "scoring", "gpt-4"), _memory()
+    )
+    return {**state, "score": result}
+
+
+@celery_app.task(name="service.pipeline.finalize")
+def finalize_stage(branches, pipeline_id: str) -> Dict[str, Any]:
+    """Chord callback: merge the outputs of both branches."""
+    merged: Dict[str, Any] = {}
+    for branch in branches:
+        merged.update(branch)
+    merged["pipeline_id"] = pipeline_id
+    _memory().add(REGISTRY_AGENT, "finished", json.dumps({
+        "id": pipeline_id, "score": merged.get("score"),
+    }), project=merged.get("project"))
+    return merged
+
+
+def start_pipeline(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build and launch the workflow for ``params`` (project, requirements,
+    output_dir, models, generate_tests, profile, ...). Returns the pipeline
+    record: its id and the Celery task id of every stage.
+    """
+    pipeline_id = str(uuid.uuid4())
+    ids = {stage: str(uuid.uuid4()) for stage in STAGES}
+    # Every stage carries the profile header; see service.telemetry
+    headers = {telemetry.PROFILE_HEADER: params["profile"]} if params.get("profile") else {}
+
+    def sig(task, stage, *args):
+        return task.s(*args).set(task_id=ids[stage], headers=headers)
+
+    workflow = chain(
+        sig(architect_stage, "architect", {**params, "pipeline_id": pipeline_id}),
+        group(
+            chain(sig(ideas_stage, "ideas"), sig(creativity_stage, "creativity")),
+            chain(
+                sig(generate_stage, "generate"),
+                sig(tests_stage, "tests"),
+                sig(qc_stage, "qc"),
+                sig(score_stage, "score"),
+            ),
+        ),
+        sig(finalize_stage, "finalize", pipeline_id),
+    )
+    record = {"id": pipeline_id, "project": params.get("project"), "stages": ids}
+    _memory().add(REGISTRY_AGENT, pipeline_id, json.dumps(record), project=params.get("project"))
+    workflow.apply_async()
+    return record
+
+
+def pipeline_status(pipeline_id: str) -> Dict[str, Any]:
+    """Return per-stage Celery status for a pipeline, or None if unknown."""
+    entries = _memory().query(agent=REGISTRY_AGENT, action=pipeline_id, limit=1)
+    if not entries:
+        return None
+    record = json.loads(entries[0].content)
+    stages = {}
+    for stage in STAGES:
+        res = celery_app.AsyncResult(record["stages"][stage])
+        stages[stage] = {"task_id": res.id, "status": res.status}
+        if res.status == "FAILURE":
+            stages[stage]["error"] = str(res.result)
+    final = celery_app.AsyncResult(record["stages"]["finalize"])
+    status = final.status
+    if any(s["status"] == "FAILURE" for s in stages.values()):
+        status = "FAILURE"
+    elif status == "PENDING" and any(s["status"] != "PENDING" for s in stages.values()):
+        status = "STARTED"
+    return {
+        "id": pipeline_id,
+        "project": record.get("project"),
+        "status": status,
+        "stages": stages,
+        "result": final.result if final.status == "SUCCESS" else None,
+    }
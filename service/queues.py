@@ -0,0 +1,106 @@
+"""
+Queue routing for OBELISK's Celery tasks, driven by config/queues.yaml
+(override with QUEUES_CONFIG_PATH). ``process_task`` requests are routed by
+agent name so long Codex generations never sit in front of quick scoring
+calls; every other task is routed by name. Each queue carries a priority and
+soft/hard time limits.
+
+The per-message priority is what orders work across queues. ``route_task``
+stamps every message with its queue's priority, and the Redis transport
+keeps one list per priority step: a worker's BRPOP asks for step 0 of every
+queue it consumes, then step 1, and so on, so a scoring message (1) is taken
+before an llm one (4) whichever queue it sits on. Which queues a worker
+consumes is set by ``-Q`` in service/celery_worker.sh; their declaration
+order does not matter. ``submit(..., priority=N)`` overrides the queue's
+priority for a single message.
+"""
+import fnmatch
+import os
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import yaml
+
+DEFAULT_QUEUE = "agency"
+PROCESS_TASK = "service.api.process_task"
+
+
+@lru_cache(maxsize=None)
+def load_config(path: Optional[str] = None) -> Dict[str, Any]:
+    path = path or os.getenv("QUEUES_CONFIG_PATH", "config/queues.yaml")
+    with open(path, "r") as f:
+        config = yaml.safe_load(f) or {}
+    config.setdefault("queues", {DEFAULT_QUEUE: {}})
+    config.setdefault("agents", {})
+    config.setdefault("tasks", {})
+    return config
+
+
+def queue_names():
+    """
+    Configured queues sorted by priority, for a readable declaration and
+    worker banner. The order has no effect on scheduling (see above).
+    """
+    queues = load_config()["queues"]
+    return sorted(queues, key=lambda q: (queues[q] or {}).get("priority", 10))
+
+
+def queue_for(task_name: str, args=None) -> str:
+    """Pick the queue for a task, looking at the agent name for process_task."""
+    config = load_config()
+    if task_name == PROCESS_TASK and args:
+        return config["agents"].get(args[0], DEFAULT_QUEUE)
+    for pattern, queue in config["tasks"].items():
+        if fnmatch.fnmatchcase(task_name, pattern):
+            return queue
+    return DEFAULT_QUEUE
+
+
+def queue_options(queue: str) -> Dict[str, Any]:
+    """Priority and time limits configured for a queue."""
+    settings = load_config()["queues"].get(queue) or {}
+    return {
+        k: settings[k]
+        for k in ("priority", "soft_time_limit", "time_limit")
+        if settings.get(k) is not None
+    }
+
+
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """Celery router (task_routes): queue and priority by agent or task name."""
+    queue = queue_for(name, args)
+    route = {"queue": queue}
+    priority = queue_options(queue).get("priority")
+    if priority is not None:
+        route["priority"] = priority
+    return route
+
+
+class QueueTimeLimits:
+    """
+    Celery task annotation applying the time limits of the queue a task is
+    routed to by name. Enforced by the worker, so it also covers canvas
+    signatures; submit() overrides it per message for process_task.
+    """
+    def annotate(self, task):
+        limits = {
+            k: v
+            for k, v in queue_options(queue_for(task.name)).items()
+            if k != "priority"
+        }
+        return limits or None
+
+
+def submit(task_name: str, args=None, **options):
+    """
+    send_task with the queue, priority and time limits for the task. Use this
+    instead of celery_app.send_task so per-queue limits are applied.
+    """
+    from service.celery_app import celery_app
+
+    if celery_app.conf.task_always_eager:
+        # send_task ignores eager mode; run the registered task inline instead
+        return celery_app.tasks[task_name].apply(args=args, task_id=options.get("task_id"))
+    queue = queue_for(task_name, args)
+    merged = {"queue": queue, **queue_options(queue), **options}
+    return celery_app.send_task(task_name, args=args, **merged)
@@ -0,0 +1,32 @@
+import os
+import uuid
+
+from service.celery_app import celery_app
+from service.idempotency import compare_and_delete, get_store
+
+LOCK_KEY = "obelisk:retention:lock"
+
+
+@celery_app.task(name="service.retention_tasks.apply_retention")
+def apply_retention(dry_run: bool = False):
+    """
+    Celery periodic task: archive Memory rows past their retention policy,
+    compress large rows, VACUUM/ANALYZE and prune old reasoning runs (see
+    agent_system/retention.py).
+    Returns the retention report; runs are serialised with a lock.
+    """
+    from agent_system import reasoning
+    from agent_system.memory import Memory
+    from agent_system.retention import RetentionEngine
+
+    store = get_store()
+    ttl = int(os.getenv("RETENTION_LOCK_TTL", "3600"))
+    token = f"{os.getpid()}:{uuid.uuid4().hex}"
+    if not store.set(LOCK_KEY, token, ex=ttl, nx=True):
+        return {"skipped": True}
+    try:
+        return RetentionEngine(Memory()).run(dry_run=dry_run, reasoning=reasoning.get_store())
+    finally:
+        # The lock may have expired and been taken by another run meanwhile;
+        # only release it if it is still ours
+        compare_and_delete(store, LOCK_KEY, token)
@@ -0,0 +1,99 @@
+"""
+Celery tracing and profiling.
+
+Every published task carries the publisher's trace context in a
+``traceparent`` message header, and every executed task runs inside a
+``task.<name>`` span continuing that trace, so the spans of one API request
+or pipeline run join up across the API, worker and canvas callbacks.
+
+A task sent with a ``profile`` header (``cpu``, ``alloc`` or ``wall``), or
+any task on a worker started with ``CELERY_PROFILE`` set, is profiled as
+one stage by agent_system.profiling. Tasks whose first dict argument has an
+``output_dir`` (the pipeline stages) write beside it, in
+``<output_dir>.profile/<pipeline_id>``, so a pipeline's stages share one
+summary; other tasks write to ``PROFILE_DIR/<task_id>`` (default
+``.obelisk/profiles``).
+"""
+import os
+from typing import Any, Dict, Tuple
+
+from celery import signals
+
+from agent_system import profiling, tracing
+
+PROFILE_HEADER = "profile"
+
+# task id -> (span, context token) for tasks executing in this process
+_active: Dict[str, Tuple[tracing.Span, Any]] = {}
+# task id -> entered Profiler.stage context
+_profiled: Dict[str, Any] = {}
+
+
+def _header(request, name: str):
+    return getattr(request, name, None) or (getattr(request, "headers", None) or {}).get(name)
+
+
+def _on_publish(headers=None, **_):
+    if headers is not None:
+        tracing.inject(headers)
+
+
+def _on_prerun(task_id=None, task=None, **_):
+    request = task.request
+    value = _header(request, "traceparent")
+    delivery = getattr(request, "delivery_info", None) or {}
+    parent = None if request.is_eager else tracing.extract(value)
+    span = tracing.start_span(
+        f"task.{task.name}", "task", parent,
+        task_id=task_id, queue=delivery.get("routing_key") or "", retries=request.retries or 0,
+    )
+    _active[task_id] = (span, tracing.activate(span))
+    mode = _header(request, PROFILE_HEADER) or os.getenv("CELERY_PROFILE")
+    if mode in profiling.MODES:
+        _start_profile(task_id, task, mode, request.args or ())
+
+
+def _start_profile(task_id, task, mode, args):
+    state = next((a for a in args if isinstance(a, dict)), {})
+    if state.get("output_dir"):
+        directory = profiling.profile_dir(state["output_dir"], state.get("pipeline_id") or task_id)
+    else:
+        directory = os.path.join(os.getenv("PROFILE_DIR", os.path.join(".obelisk", "profiles")), task_id)
+    stage = profiling.Profiler(mode, directory).stage(task.name.rsplit(".", 1)[-1])
+    stage.__enter__()
+    _profiled[task_id] = stage
+
+
+def _on_failure(task_id=None, exception=None, **_):
+    active = _active.get(task_id)
+    if active and exception is not None:
+        active[0].record_exception(exception)
+
+
+def _on_postrun(task_id=None, state=None, **_):
+    stage = _profiled.pop(task_id, None)
+    if stage is not None:
+        if state in (None, "SUCCESS"):
+            stage.__exit__(None, None, None)
+        else:
+            # Marks the stage failed; the context manager re-raises nothing
+            error = RuntimeError(f"task finished in state {state}")
+            stage.__exit__(RuntimeError, error, None)
+    active = _active.pop(task_id, None)
+    if active is None:
+        return
+    span, token = active
+    span.set(state=state or "")
+    try:
+        tracing.deactivate(token)
+    except ValueError:
+        pass  # finished in a different context than it started in
+    span.end()
+
+
+def install():
+    """Connect the signal handlers (idempotent)."""
+    signals.before_task_publish.connect(_on_publish, weak=False, dispatch_uid="obelisk.trace.publish")
+    signals.task_prerun.connect(_on_prerun, weak=False, dispatch_uid="obelisk.trace.prerun")
+    signals.task_failure.connect(_on_failure, weak=False, dispatch_uid="obelisk.trace.failure")
+    signals.task_postrun.connect(_on_postrun, weak=False, dispatch_uid="obelisk.trace.postrun")
@@ -23,10 +23,12 @@ echo "Starting FastAPI..."
 uvicorn service.api:app --reload &
 API_PID=$!
 
-echo "Starting Celery worker..."
+echo "Starting Celery workers..."
 chmod +x service/celery_worker.sh
-service/celery_worker.sh &
+CELERY_QUEUES=agency,codegen,meta service/celery_worker.sh &
 WORKER_PID=$!
+CELERY_QUEUES=llm,scoring CELERY_POOL=threads CELERY_CONCURRENCY=16 service/celery_worker.sh &
+LLM_WORKER_PID=$!
 
 echo "Starting Celery Beat..."
 celery -A service.celery_app.celery_app beat --loglevel=info &
@@ -46,7 +48,7 @@ fi
 cd web && npm run dev &
 FRONTEND_PID=$!
 
-echo "All services started. PIDs: API=$API_PID, WORKER=$WORKER_PID, BEAT=$BEAT_PID, FRONTEND=$FRONTEND_PID"
+echo "All services started. PIDs: API=$API_PID, WORKER=$WORKER_PID, LLM_WORKER=$LLM_WORKER_PID, BEAT=$BEAT_PID, FRONTEND=$FRONTEND_PID"
 # Open browser to the dashboard (if available)
 if command -v xdg-open >/dev/null 2>&1; then
   xdg-open http://localhost:5174 &
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from agent_system.vector_index import IndexConfig  # noqa: E402
+from agent_system.vector_memory import VectorMemory  # noqa: E402
+
+DIM = 8
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).random((300, DIM)).astype("float32")
+
+
+def open_store(tmp_path, **kwargs):
+    kwargs.setdefault("config", IndexConfig(flat_threshold=10_000))
+    return VectorMemory(
+        DIM, index_path=str(tmp_path / "vectors"), background=False, **kwargs
+    )
+
+
+def nearest(store, vector, k=1):
+    return store.search(vector.reshape(1, -1), k)[1][0].tolist()
+
+
+def test_add_save_delete_reopen_compact(tmp_path, vectors):
+    store = open_store(tmp_path)
+    store.add(vectors[:100], ids=range(100), metadata=[{"n": i} for i in range(100)])
+    store.save()
+    store.add(vectors[100:200], ids=range(100, 200))
+    store.set_state("watermark", 199)
+    store.save()
+    assert len(store.segments) == 2
+
+    assert store.delete([5, 150, 999]) == 2
+    store.save()
+    assert len(store) == 198
+    assert 5 not in nearest(store, vectors[5], k=3)
+    assert nearest(store, vectors[6]) == [6]
+
+    reopened = open_store(tmp_path)
+    assert len(reopened) == 198
+    assert reopened.get_state("watermark") == 199
+    assert 150 not in nearest(reopened, vectors[150], k=3)
+    assert reopened.metadata([7]) == {7: {"n": 7}}
+
+    reopened.compact()
+    assert len(reopened.segments) == 1
+    assert sum(reopened.stale.values()) == 0
+    assert len(reopened) == 198
+    assert nearest(reopened, vectors[120]) == [120]
+    assert 5 not in nearest(reopened, vectors[5], k=3)
+
+    # Compaction removed the old segment files
+    segment_files = [f for f in os.listdir(tmp_path) if ".seg" in f]
+    assert len(segment_files) == 1
+    assert len(open_store(tmp_path)) == 198
+
+
+def test_upsert_replaces_saved_and_unsaved_vectors(tmp_path, vectors):
+    store = open_store(tmp_path)
+    store.add(vectors[:10], ids=range(10))
+    store.save()
+    store.upsert(vectors[20:21], ids=[3])
+    store.upsert(vectors[21:22], ids=[3])
+    store.save()
+    assert len(store) == 10
+    assert nearest(store, vectors[21]) == [3]
+    # The superseded vector is not returned, nor is id 3 repeated
+    assert nearest(store, vectors[3], k=10).count(3) == 1
+
+    store.compact()
+    assert nearest(open_store(tmp_path), vectors[21]) == [3]
+
+
+def test_approximate_index_survives_reopen(tmp_path, vectors):
+    store = open_store(tmp_path, config=IndexConfig(flat_threshold=50))
+    store.add(vectors, ids=range(len(vectors)))
+    store.save()
+    store.wait_for_migrations()
+    assert store.ann_files
+    store.delete([42])
+    store.save()
+
+    reopened = open_store(tmp_path, config=IndexConfig(flat_threshold=50))
+    assert reopened.ann_files == store.ann_files
+    assert 42 not in nearest(reopened, vectors[42], k=5)
+    assert nearest(reopened, vectors[43], k=5)[0] == 43